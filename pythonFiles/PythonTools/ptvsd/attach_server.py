@@ -28,6 +28,7 @@ import socket
 import struct
 import sys
 import threading
+import time
 try:
     import thread
 except ImportError:
@@ -40,6 +41,7 @@ except ImportError:
 import ptvsd.visualstudio_py_debugger as vspd
 import ptvsd.visualstudio_py_repl as vspr
 from ptvsd.visualstudio_py_util import to_bytes, read_bytes, read_int, read_string, write_bytes, write_int, write_string
+from ptvsd.visualstudio_py_util import begin_message, end_message
 
 
 # The server (i.e. the Python app) waits on a TCP port provided. Whenever anything connects to that port,
@@ -72,6 +74,13 @@ from ptvsd.visualstudio_py_util import to_bytes, read_bytes, read_int, read_stri
 #   Attach REPL to the process. If successful, the server responds with 'ACPT', and from there on the socket
 #   is assumed to be using the normal PTVS REPL protocol. If not successful (which can happen if there is
 #   no debugger attached), the server responds with 'RJCT' and closes the connection. 
+#
+# 'PROF'
+#   Profile the process by sampling the stacks of its threads, without attaching the debugger. The client
+#   sends the sampling interval in microseconds (int64) and the duration in milliseconds (int64). After the
+#   duration, the server responds with the number of samples taken (int64) and the number of distinct stacks
+#   (int64), followed by every stack (string, in the collapsed format of SamplingProfiler) and the number of
+#   samples in which it was seen (int64), and then closes the connection.
 
 PTVS_VER = '2.2'
 DEFAULT_PORT = 5678
@@ -82,6 +91,7 @@ RJCT = to_bytes('RJCT')
 INFO = to_bytes('INFO')
 ATCH = to_bytes('ATCH')
 REPL = to_bytes('REPL')
+PROF = to_bytes('PROF')
 
 _attach_enabled = False
 _attached = threading.Event()
@@ -194,6 +204,7 @@ def enable_attach(secret, address = ('0.0.0.0', DEFAULT_PORT), certfile = None,
                 response = read_bytes(client, 4)
 
                 if response == INFO:
+                    begin_message(client)
                     try:
                         pid = os.getpid()
                     except AttributeError:
@@ -232,6 +243,7 @@ def enable_attach(secret, address = ('0.0.0.0', DEFAULT_PORT), certfile = None,
 
                     version = '%s %s.%s.%s (%s)' % (impl, major, minor, micro, os_and_arch)
                     write_string(client, version)
+                    end_message(client)
 
                     # Don't just drop the connection - let the debugger close it after it finishes reading.
                     client.recv(1)
@@ -242,6 +254,7 @@ def enable_attach(secret, address = ('0.0.0.0', DEFAULT_PORT), certfile = None,
                         debug_options.add('RedirectOutput')
 
                     if vspd.DETACHED:
+                        begin_message(client)
                         write_bytes(client, ACPT)
                         try:
                             pid = os.getpid()
@@ -253,6 +266,7 @@ def enable_attach(secret, address = ('0.0.0.0', DEFAULT_PORT), certfile = None,
                         write_int(client, major)
                         write_int(client, minor)
                         write_int(client, micro)
+                        end_message(client)
 
                         vspd.attach_process_from_socket(client, debug_options, report = True)
                         vspd.mark_all_threads_for_break(vspd.STEPPING_ATTACH_BREAK)
@@ -269,6 +283,14 @@ def enable_attach(secret, address = ('0.0.0.0', DEFAULT_PORT), certfile = None,
                     else:
                         write_bytes(client, RJCT)
 
+                elif response == PROF:
+                    interval = read_int(client) / 1000000.0
+                    duration = read_int(client) / 1000.0
+                    profile_thread = threading.Thread(target = _send_profile, args = (client, interval, duration))
+                    profile_thread.setDaemon(True)
+                    profile_thread.start()
+                    client = None
+
             except (socket.error, OSError):
                 pass
             finally:
@@ -302,6 +324,29 @@ def enable_attach(secret, address = ('0.0.0.0', DEFAULT_PORT), certfile = None,
 settrace = enable_attach
 
 
+def _send_profile(client, interval, duration):
+    profiler = vspd.SamplingProfiler(interval)
+    profiler.start()
+    try:
+        time.sleep(duration)
+    finally:
+        profiler.stop()
+
+    try:
+        stacks = profiler.get_collapsed_stacks()
+        begin_message(client)
+        write_int(client, profiler.sample_count)
+        write_int(client, len(stacks))
+        for stack, count in stacks.items():
+            write_string(client, stack)
+            write_int(client, count)
+        end_message(client)
+    except (socket.error, OSError):
+        pass
+    finally:
+        client.close()
+
+
 def wait_for_attach(timeout = None):
     """If a PTVS remote debugger is attached, returns immediately. Otherwise,
     blocks until a remote debugger attaches to this process, or until the
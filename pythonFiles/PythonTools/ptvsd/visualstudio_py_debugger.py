@@ -37,6 +37,7 @@ import struct
 import weakref
 import traceback
 import types
+import time
 import bisect
 from os import path
 import ntpath
@@ -64,6 +65,8 @@ read_string = _vspu.read_string
 write_bytes = _vspu.write_bytes
 write_int = _vspu.write_int
 write_string = _vspu.write_string
+begin_message = _vspu.begin_message
+end_message = _vspu.end_message
 safe_repr = _vspu.SafeRepr()
 
 try:
@@ -123,6 +126,16 @@ DJANGO_DEBUG = False
 RICH_EXCEPTIONS = False
 IGNORE_DJANGO_TEMPLATE_WARNINGS = False
 
+# With LazyFrameVariables in the debug options, frame lists are sent without variables and the
+# variables of a frame are requested in pages (see command_get_frame_variables).
+LAZY_FRAME_VARIABLES = False
+
+# Formatting the variables of a stop (or of a requested page) stops after this many seconds or
+# once this many characters were produced, the remaining values are sent as REPR_SKIPPED.
+REPR_TIME_BUDGET = 1.0
+REPR_SIZE_BUDGET = 1024 * 1024
+REPR_SKIPPED = '<not evaluated, expand or evaluate to see the value>'
+
 # Py3k compat - alias unicode to str
 try:
     unicode
@@ -139,9 +152,28 @@ class SynthesizedValue(object):
     def __len__(self):
         return self.len_value
 
+class ChangeCountingList(list):
+    """A list that counts its changes in generation, so that results derived from it (see
+    check_code_caches) are recomputed even when an item is replaced in place."""
+    generation = 0
+
+def _counting_list_method(name):
+    method = getattr(list, name)
+    def counting_method(self, *args):
+        self.generation += 1
+        return method(self, *args)
+    counting_method.__name__ = name
+    return counting_method
+
+for _name in ('append', 'extend', 'insert', 'remove', 'pop', 'sort', 'reverse', 'clear',
+              '__setitem__', '__delitem__', '__iadd__', '__imul__', '__setslice__', '__delslice__'):
+    if hasattr(list, _name):
+        setattr(ChangeCountingList, _name, _counting_list_method(_name))
+del _name
+
 # Specifies list of files not to debug. Can be extended by other modules
 # (the REPL does this for $attach support and not stepping into the REPL).
-DONT_DEBUG = [path.normcase(__file__), path.normcase(_vspu.__file__)]
+DONT_DEBUG = ChangeCountingList([path.normcase(__file__), path.normcase(_vspu.__file__)])
 if sys.version_info >= (3, 3):
     DONT_DEBUG.append(path.normcase('<frozen importlib._bootstrap>'))
 if sys.version_info >= (3, 5):
@@ -163,6 +195,13 @@ if sys.version_info >= (3, 5):
 # {10: {('main.py', 1): ..., ('module.py', 3): ...}, 20: {('main.py', 2): ... }}
 BREAKPOINTS = {}
 
+# The breakpoints of BREAKPOINTS indexed by the co_filename of the code that hits them, built on
+# demand by get_file_break_points. Values are dicts of line number to lists of (breakpoint_id,
+# BreakpointInfo) tuples, e.g. for the example above and a module loaded from '/src/main.py':
+# {'/src/main.py': {10: [(1, ...)], 20: [(2, ...)]}}
+BREAKPOINT_INDEX = {}
+breakpoints_generation = 0
+
 # Contains information about all pending (i.e. not yet bound) breakpoints in the process.
 # Elements are BreakpointInfo objects.
 PENDING_BREAKPOINTS = set()
@@ -201,8 +240,8 @@ except:
 class BreakpointInfo(object):
     __slots__ = [
         'breakpoint_id', 'filename', 'lineno', 'condition_kind', 'condition',
-        'pass_count_kind', 'pass_count', 'is_bound', 'last_condition_value',
-        'hit_count'
+        'compiled_condition', 'pass_count_kind', 'pass_count', 'is_bound',
+        'last_condition_value', 'hit_count'
     ]
 
     # For "when changed" breakpoints, this is used as the initial value of last_condition_value,
@@ -213,14 +252,25 @@ class BreakpointInfo(object):
         self.breakpoint_id = breakpoint_id
         self.filename = filename
         self.lineno = lineno
-        self.condition_kind = condition_kind
-        self.condition = condition
+        self.set_condition(condition_kind, condition)
         self.pass_count_kind = pass_count_kind
         self.pass_count = pass_count
         self.is_bound = False
         self.last_condition_value = BreakpointInfo._DUMMY_LAST_VALUE
         self.hit_count = 0
 
+    def set_condition(self, condition_kind, condition):
+        self.condition_kind = condition_kind
+        self.condition = condition
+        # Compiled once here rather than on every hit. If it doesn't compile, the error is reported
+        # and the breakpoint is hit every time, like for errors while evaluating it.
+        self.compiled_condition = None
+        if condition_kind != BREAKPOINT_CONDITION_ALWAYS:
+            try:
+                self.compiled_condition = compile(condition, '<breakpoint condition>', 'eval')
+            except:
+                report_breakpoint_condition_error(self, sys.exc_info()[1])
+
     @staticmethod
     def find_by_id(breakpoint_id):
         for line, bp_dict in BREAKPOINTS.items():
@@ -229,13 +279,17 @@ class BreakpointInfo(object):
                     return bp
         return None
 
+# the socket connected to VS, set by attach_process_from_socket
+conn = None
+
 # lock for calling .send on the socket
 send_lock = thread.allocate_lock()
 
 class _SendLockContextManager(object):
     """context manager for send lock.  Handles both acquiring/releasing the 
        send lock as well as detaching the debugger if the remote process 
-       is disconnected"""
+       is disconnected.  What is written to conn while it's held is sent
+       as one message."""
 
     def __enter__(self):
         # mark that we're about to do socket I/O so we won't deliver
@@ -245,8 +299,17 @@ class _SendLockContextManager(object):
             cur_thread.is_sending = True
 
         send_lock.acquire()
+        self.conn = conn
+        if conn is not None:
+            begin_message(conn)
 
     def __exit__(self, exc_type, exc_value, tb):
+        try:
+            if self.conn is not None:
+                end_message(self.conn, exc_type is None)
+        except:
+            exc_type = sys.exc_info()[0]
+        self.conn = None
         send_lock.release()
         
         # start sending debug events again
@@ -354,6 +417,7 @@ else:
 ASBR = to_bytes('ASBR')
 SETL = to_bytes('SETL')
 THRF = to_bytes('THRF')
+THRD = to_bytes('THRD')
 DETC = to_bytes('DETC')
 NEWT = to_bytes('NEWT')
 EXTT = to_bytes('EXTT')
@@ -371,6 +435,7 @@ LOAD = to_bytes('LOAD')
 EXCE = to_bytes('EXCE')
 EXCR = to_bytes('EXCR')
 CHLD = to_bytes('CHLD')
+FRMV = to_bytes('FRMV')
 OUTP = to_bytes('OUTP')
 REQH = to_bytes('REQH')
 LAST = to_bytes('LAST')
@@ -569,8 +634,32 @@ if hasattr(sys, 'base_prefix'):
 if hasattr(sys, 'real_prefix'):
     PREFIXES.append(path.normcase(sys.real_prefix))
 
+# Caches the results of should_debug_code and should_trace_code by code object. They are cleared
+# when DEBUG_STDLIB or DONT_DEBUG change, SHOULD_TRACE_CACHE also by break_points_changed.
+SHOULD_DEBUG_CACHE = {}
+SHOULD_TRACE_CACHE = {}
+_code_cache_key = None
+
+def check_code_caches():
+    global _code_cache_key
+    key = (DEBUG_STDLIB, DONT_DEBUG.generation)
+    if key != _code_cache_key:
+        SHOULD_DEBUG_CACHE.clear()
+        SHOULD_TRACE_CACHE.clear()
+        _code_cache_key = key
+
 def should_debug_code(code):
-    if not code or not code.co_filename:
+    if not code:
+        return False
+    check_code_caches()
+    try:
+        return SHOULD_DEBUG_CACHE[code]
+    except KeyError:
+        res = SHOULD_DEBUG_CACHE[code] = _should_debug_code(code)
+        return res
+
+def _should_debug_code(code):
+    if not code.co_filename:
         return False
 
     filename = path.normcase(code.co_filename)
@@ -589,6 +678,71 @@ def should_debug_code(code):
 
     return True
 
+def should_trace_code(code):
+    """Returns True if frames of code need line, return and exception events, i.e. if the code
+    is debugged or there are breakpoints in its file. Nothing ever stops in the other frames."""
+    check_code_caches()
+    try:
+        return SHOULD_TRACE_CACHE[code]
+    except KeyError:
+        generation = breakpoints_generation
+        res = should_debug_code(code) or bool(get_file_break_points(code.co_filename))
+        if generation == breakpoints_generation:
+            SHOULD_TRACE_CACHE[code] = res
+        return res
+
+def get_file_break_points(filename):
+    """Returns the breakpoints hit by code from filename, see BREAKPOINT_INDEX."""
+    try:
+        return BREAKPOINT_INDEX[filename]
+    except KeyError:
+        pass
+
+    # BREAKPOINTS is changed on the debugger thread, don't keep a result that might be outdated.
+    generation = breakpoints_generation
+    res = {}
+    for lineno, bps in list(BREAKPOINTS.items()):
+        for (bp_filename, bp_id), bp in list(bps.items()):
+            if bp_filename != filename:
+                # When the breakpoint is bound, the filename is updated to match co_filename of
+                # the module to which it was bound, so only exact matches are considered hits.
+                if bp.is_bound:
+                    continue
+                # Otherwise, use relaxed path check that tries to handle differences between
+                # local and remote filesystems for remote scenarios:
+                if not breakpoint_path_match(bp_filename, filename):
+                    continue
+            res.setdefault(lineno, []).append((bp_id, bp))
+    if generation == breakpoints_generation:
+        BREAKPOINT_INDEX[filename] = res
+    return res
+
+def break_points_changed():
+    global breakpoints_generation
+    breakpoints_generation += 1
+    BREAKPOINT_INDEX.clear()
+    SHOULD_TRACE_CACHE.clear()
+
+def trace_running_frames(threads = None):
+    """Turns tracing on for the running frames that were entered before a breakpoint was added to
+    their file (see should_trace_code). With threads, on all running frames of those threads, so
+    that a break requested for them completes whatever code they are running."""
+    if not hasattr(sys, '_current_frames'):
+        return
+    THREADS_LOCK.acquire()
+    try:
+        for tid, frame in sys._current_frames().items():
+            cur_thread = THREADS.get(tid)
+            if cur_thread is None:
+                continue
+            trace_all = threads is not None and cur_thread in threads
+            while frame is not None:
+                if frame.f_trace is None and (trace_all or should_trace_code(frame.f_code)):
+                    frame.f_trace = cur_thread.trace_func
+                frame = frame.f_back
+    finally:
+        THREADS_LOCK.release()
+
 attach_lock = thread.allocate()
 attach_sent_break = False
 
@@ -821,6 +975,13 @@ class Thread(object):
         self.reported_process_loaded = False
         self.django_stepping = None
         self.is_sending = False
+        # id(obj) -> (obj, repr) of the variables sent while the thread is stopped
+        self.repr_cache = None
+        # frame -> variables of the frames whose variables are requested in pages while the
+        # thread is stopped (see frame_variables_locally)
+        self.frame_variables = None
+        # (conn, thread name, frames) last sent by send_frame_list
+        self.sent_frames = None
 
         # stackless changes
         if stackless is not None:
@@ -1030,6 +1191,21 @@ class Thread(object):
             # work around IronPython bug - http://ironpython.codeplex.com/workitem/30127
             self.handle_line(frame, arg)
 
+        try:
+            trace_frame = self.prev_trace_func is not None or should_trace_code(frame.f_code)
+        except (TypeError, AttributeError):
+            # Late in interpreter shutdown the module globals are set to None, the ones starting
+            # with an underscore first. Using them then fails, keep tracing the frame.
+            if _should_debug_code is not None:
+                raise
+            trace_frame = True
+        if not trace_frame:
+            # Don't trace the rest of the frame, calls from it are still traced. If a breakpoint
+            # is added to its file later or a break is requested, trace_running_frames turns
+            # tracing back on.
+            self.pop_frame()
+            return None
+
         # forward call to previous trace function, if any, saving old trace func for when we return
         old_trace_func = self.prev_trace_func
         if old_trace_func is not None:
@@ -1083,25 +1259,13 @@ class Thread(object):
             # handle breakpoints
             hit_bp_id = None
             if BREAKPOINTS and handle_breakpoints:
-                bp = BREAKPOINTS.get(frame.f_lineno)
-                if bp is not None:
-                    for (filename, bp_id), bp in bp.items():
-                        if filename != frame.f_code.co_filename:
-                            # When the breakpoint is bound, the filename is updated to match co_filename of
-                            # the module to which it was bound, so only exact matches are considered hits.
-                            if bp.is_bound:
-                                continue
-                            # Otherwise, use relaxed path check that tries to handle differences between 
-                            # local and remote filesystems for remote scenarios:
-                            if not breakpoint_path_match(filename, frame.f_code.co_filename):
-                                continue
-
-                        # If we got here, filename and line number both match.
-
+                bps = get_file_break_points(frame.f_code.co_filename).get(frame.f_lineno)
+                if bps is not None:
+                    for bp_id, bp in bps:
                         # Check condition to see if we actually hit this breakpoint.
-                        if bp.condition_kind != BREAKPOINT_CONDITION_ALWAYS:
+                        if bp.compiled_condition is not None:
                             try:
-                                res = eval(bp.condition, frame.f_globals, frame.f_locals)
+                                res = eval(bp.compiled_condition, frame.f_globals, frame.f_locals)
                                 if bp.condition_kind == BREAKPOINT_CONDITION_WHEN_CHANGED:
                                     last_val = bp.last_condition_value
                                     bp.last_condition_value = res
@@ -1161,6 +1325,10 @@ class Thread(object):
         return self.trace_func
     
     def handle_return(self, frame, arg):
+        if sys.platform != 'cli':
+            # The frame might have been traced only after it was entered (see trace_running_frames),
+            # so the current frame is not necessarily the one returning.
+            self.cur_frame = frame
         self.pop_frame()
 
         if not DETACHED:
@@ -1279,6 +1447,11 @@ class Thread(object):
         assert not self._is_blocked
         #assert self.id == thread.get_ident(), 'wrong thread identity' + str(self.id) + ' ' + str(thread.get_ident())    # we should only ever block ourselves
         
+        # nothing runs while we're blocked, so the reprs of the variables only
+        # need to be computed once (until an evaluation changes them)
+        self.repr_cache = {}
+        self.frame_variables = {}
+
         # send thread frames before we block
         self.enum_thread_frames_locally()
         
@@ -1306,6 +1479,8 @@ class Thread(object):
         assert self._is_blocked
         self._is_blocked = False
         self._block_starting_lock.release()
+        self.repr_cache = None
+        self.frame_variables = None
 
     def unblock(self):
         """unblocks the current thread allowing it to continue to run"""
@@ -1385,17 +1560,25 @@ class Thread(object):
             code = self.compile(text, cur_frame)
             res = eval(code, cur_frame.f_globals, self.get_locals(cur_frame, frame_kind))
             self.locals_to_fast(cur_frame)
+            self.repr_cache = {}
+            self.frame_variables = {}
             # Report any updated variable values first
             self.enum_thread_frames_locally()
             report_execution_result(execution_id, res, repr_kind)
         except:
+            self.repr_cache = {}
+            self.frame_variables = {}
             # Report any updated variable values first
             self.enum_thread_frames_locally()
             report_execution_exception(execution_id, sys.exc_info())
 
     def run_locally_no_report(self, text, cur_frame, frame_kind):
         code = self.compile(text, cur_frame)
-        res = eval(code, cur_frame.f_globals, self.get_locals(cur_frame, frame_kind))
+        try:
+            res = eval(code, cur_frame.f_globals, self.get_locals(cur_frame, frame_kind))
+        finally:
+            self.repr_cache = {}
+            self.frame_variables = {}
         self.locals_to_fast(cur_frame)
         sys.displayhook(res)
 
@@ -1486,7 +1669,7 @@ class Thread(object):
                     # Skip this item if we can't process it.
                     pass
 
-            report_children(execution_id, children)
+            report_children(execution_id, children, ReprBudget(self.repr_cache))
 
         except:
             report_children(execution_id, [])
@@ -1494,6 +1677,7 @@ class Thread(object):
     def get_frame_list(self):
         frames = []
         cur_frame = self.cur_frame
+        budget = ReprBudget(self.repr_cache)
         
         while should_send_frame(cur_frame):
             # calculate the ending line number
@@ -1512,36 +1696,15 @@ class Thread(object):
                     else:
                         lineno += ord(line_incr)
 
-            frame_locals = cur_frame.f_locals
-            var_names = cur_frame.f_code.co_varnames
-
             source_obj = None
             if DJANGO_DEBUG:
                 source_obj = get_django_frame_source(cur_frame)
-                if source_obj is not None:
-                    frame_locals = self.get_locals(cur_frame, FRAME_KIND_DJANGO)
-                    var_names = frame_locals
 
-            if source_obj is not None:
-                process_globals_in_functions = False
-            elif frame_locals is cur_frame.f_globals:
-                var_names = frame_locals
-                process_globals_in_functions = False
+            if LAZY_FRAME_VARIABLES:
+                vars = []
             else:
-                process_globals_in_functions = True
-
-            # collect frame locals
-            vars = []
-            treated = set()
-            self.collect_variables(vars, frame_locals, var_names, treated)
-            if process_globals_in_functions:
-                # collect closed over variables used locally (frame_locals not already treated based on var_names)
-                self.collect_variables(vars, frame_locals, frame_locals, treated)
-                # collect globals used locally, skipping undefined found in builtins
-                f_globals = cur_frame.f_globals
-                if f_globals: # ensure globals to work with (IPy may have None for cur_frame.f_globals for frames within stdlib)
-                    self.collect_variables(vars, f_globals, cur_frame.f_code.co_names, treated, skip_unknown = True)
-            
+                vars = describe_variables(self.get_frame_variables(cur_frame, source_obj), budget)
+
             frame_info = None
 
             if source_obj is not None:
@@ -1588,6 +1751,35 @@ class Thread(object):
                         
         return frames
 
+    def get_frame_variables(self, cur_frame, source_obj = None):
+        """Returns (name, value, type name) for the locals of the frame, followed by the variables
+        and globals it uses."""
+        frame_locals = cur_frame.f_locals
+        var_names = cur_frame.f_code.co_varnames
+
+        if source_obj is not None:
+            frame_locals = self.get_locals(cur_frame, FRAME_KIND_DJANGO)
+            var_names = frame_locals
+            process_globals_in_functions = False
+        elif frame_locals is cur_frame.f_globals:
+            var_names = frame_locals
+            process_globals_in_functions = False
+        else:
+            process_globals_in_functions = True
+
+        # collect frame locals
+        vars = []
+        treated = set()
+        self.collect_variables(vars, frame_locals, var_names, treated)
+        if process_globals_in_functions:
+            # collect closed over variables used locally (frame_locals not already treated based on var_names)
+            self.collect_variables(vars, frame_locals, frame_locals, treated)
+            # collect globals used locally, skipping undefined found in builtins
+            f_globals = cur_frame.f_globals
+            if f_globals: # ensure globals to work with (IPy may have None for cur_frame.f_globals for frames within stdlib)
+                self.collect_variables(vars, f_globals, cur_frame.f_code.co_names, treated, skip_unknown = True)
+        return vars
+
     def collect_variables(self, vars, objects, names, treated, skip_unknown = False):
         for name in names:
             if name not in treated:
@@ -1605,11 +1797,23 @@ class Thread(object):
                         continue
                     obj = SynthesizedValue('<undefined>', len_value=0)
                     type_name = 'unknown'
-                vars.append((name, type(obj), safe_repr(obj), safe_hex_repr(obj), type_name, get_object_len(obj)))
+                vars.append((name, obj, type_name))
                 treated.add(name)
 
     def send_frame_list(self, frames, thread_name = None):
         with _SendLockCtx:
+            # the frames of threads that didn't move since the last stop only
+            # need the variables that changed
+            sent = self.sent_frames
+            if sent is not None and sent[0] is conn and thread_name in (None, sent[1]):
+                self.sent_frames = (conn, sent[1], frames)
+                changes = get_frame_list_changes(sent[2], frames)
+                if changes is not None:
+                    self.send_frame_list_changes(changes)
+                    return
+            else:
+                self.sent_frames = (conn, thread_name, frames)
+
             write_bytes(conn, THRF)
             write_int(conn, self.id)
             write_string(conn, thread_name)
@@ -1636,6 +1840,47 @@ class Thread(object):
                     write_string(conn, name)
                     write_object(conn, type_obj, safe_repr_obj, hex_repr_obj, type_name, obj_len)
 
+    def send_frame_list_changes(self, changes):
+        write_bytes(conn, THRD)
+        write_int(conn, self.id)
+        write_int(conn, len(changes))
+        for frame_changes in changes:
+            write_int(conn, len(frame_changes))
+            for index, (name, type_obj, safe_repr_obj, hex_repr_obj, type_name, obj_len) in frame_changes:
+                write_int(conn, index)
+                write_string(conn, name)
+                write_object(conn, type_obj, safe_repr_obj, hex_repr_obj, type_name, obj_len)
+
+    def frame_variables_on_thread(self, cur_frame, execution_id, frame_kind, start, count):
+        self._block_starting_lock.acquire()
+        if not self._is_working and self._is_blocked:
+            self.schedule_work(lambda : self.frame_variables_locally(cur_frame, execution_id, frame_kind, start, count))
+            self._block_starting_lock.release()
+        else:
+            self._block_starting_lock.release()
+            report_frame_variables(execution_id, 0, 0, [])
+
+    def frame_variables_locally(self, cur_frame, execution_id, frame_kind, start, count):
+        try:
+            source_obj = None
+            if DJANGO_DEBUG:
+                source_obj = get_django_frame_source(cur_frame)
+            if frame_kind == FRAME_KIND_DJANGO:
+                argcount = 0
+            else:
+                argcount = cur_frame.f_code.co_argcount
+            # The variables are collected once per stop, later pages are sliced from them. Every
+            # page gets its own repr budget.
+            try:
+                variables = self.frame_variables[cur_frame]
+            except KeyError:
+                variables = self.get_frame_variables(cur_frame, source_obj)
+                self.frame_variables[cur_frame] = variables
+            page = describe_variables(variables[start:start + count], ReprBudget(self.repr_cache))
+            report_frame_variables(execution_id, len(variables), argcount, page)
+        except:
+            report_frame_variables(execution_id, 0, 0, [])
+
     def enum_thread_frames_locally(self):
         global _threading
         if _threading is None:
@@ -1664,6 +1909,8 @@ def add_break_point(bp):
     if cur_bp is None:
         cur_bp = BREAKPOINTS[bp.lineno] = dict()
     cur_bp[(bp.filename, bp.breakpoint_id)] = bp
+    break_points_changed()
+    trace_running_frames()
 
 def try_bind_break_point(mod_filename, module, bp):
     if module.filename.lower() == path.abspath(bp.filename).lower():
@@ -1676,11 +1923,15 @@ def try_bind_break_point(mod_filename, module, bp):
 
 def mark_all_threads_for_break(stepping = STEPPING_BREAK, skip_thread = None):
     THREADS_LOCK.acquire()
+    marked = []
     for thread in THREADS.values():
         if thread is skip_thread:
             continue
         thread.stepping = stepping
+        marked.append(thread)
     THREADS_LOCK.release()
+    # The threads might be running frames that aren't traced (see Thread.handle_call).
+    trace_running_frames(marked)
 
 class DebuggerLoop(object):
 
@@ -1708,6 +1959,7 @@ class DebuggerLoop(object):
             to_bytes('ares') : self.command_auto_resume,
             to_bytes('exec') : self.command_execute_code,
             to_bytes('chld') : self.command_enum_children,
+            to_bytes('frmv') : self.command_get_frame_variables,
             to_bytes('setl') : self.command_set_lineno,
             to_bytes('detc') : self.command_detach,
             to_bytes('clst') : self.command_clear_stepping,
@@ -1796,8 +2048,7 @@ class DebuggerLoop(object):
         
         bp = BreakpointInfo.find_by_id(breakpoint_id)
         if bp is not None:
-            bp.condition_kind = kind
-            bp.condition = condition
+            bp.set_condition(kind, condition)
 
     def command_set_breakpoint_pass_count(self):
         breakpoint_id = read_int(self.conn)
@@ -1841,6 +2092,7 @@ class DebuggerLoop(object):
                     del cur_bp[file, id]
                     if not cur_bp:
                         del BREAKPOINTS[line_no]
+                    break_points_changed()
                     break
 
     def command_remove_django_breakpoint(self):
@@ -2024,6 +2276,21 @@ class DebuggerLoop(object):
         thread, cur_frame = self.get_thread_and_frame(tid, fid, frame_kind)
         if thread is not None and cur_frame is not None:
             thread.enum_child_on_thread(text, cur_frame, eid, frame_kind)
+
+    def command_get_frame_variables(self):
+        # send a page of the variables of the specified frame
+        tid = read_int(self.conn) # thread id
+        fid = read_int(self.conn) # frame id
+        eid = read_int(self.conn) # execution id
+        frame_kind = read_int(self.conn) # frame kind
+        start = read_int(self.conn) # index of the first variable
+        count = read_int(self.conn) # maximum number of variables
+
+        thread, cur_frame = self.get_thread_and_frame(tid, fid, frame_kind)
+        if thread is not None and cur_frame is not None:
+            thread.frame_variables_on_thread(cur_frame, eid, frame_kind, start, count)
+        else:
+            report_frame_variables(eid, 0, 0, [])
     
     def get_thread_and_frame(self, tid, fid, frame_kind):
         thread = get_thread_from_id(tid)
@@ -2172,6 +2439,15 @@ def report_breakpoint_failed(id):
         write_bytes(conn, BRKF)
         write_int(conn, id)
 
+def report_breakpoint_condition_error(bp, exc):
+    if DETACHED:
+        return
+    with _SendLockCtx:
+        write_bytes(conn, OUTP)
+        write_int(conn, thread.get_ident())
+        write_string(conn, 'The condition of the breakpoint at %s:%s is not valid, it always breaks: %s\n' %
+                     (bp.filename, bp.lineno, get_exception_name(type(exc)) + ': ' + str(exc)))
+
 def report_breakpoint_hit(id, tid):    
     with _SendLockCtx:
         write_bytes(conn, BRKH)
@@ -2209,6 +2485,59 @@ def get_object_len(obj):
     except:
         return None
 
+class ReprBudget(object):
+    """Limits the time and the size of the reprs of the variables sent at once.
+
+    Reprs are looked up in and added to cache (see Thread.repr_cache) if it is
+    not None, cached reprs are free. Only the time spent in repr counts.
+    """
+    def __init__(self, cache = None):
+        self.time = REPR_TIME_BUDGET
+        self.size = REPR_SIZE_BUDGET
+        self.cache = cache
+
+    def repr(self, obj):
+        cache = self.cache
+        if cache is not None:
+            cached = cache.get(id(obj))
+            if cached is not None and cached[0] is obj:
+                return cached[1]
+        if self.size <= 0 or self.time <= 0:
+            return REPR_SKIPPED
+        start = time.time()
+        res = safe_repr(obj)
+        self.time -= time.time() - start
+        self.size -= len(res)
+        if cache is not None:
+            # keep obj alive so that its id isn't reused
+            cache[id(obj)] = (obj, res)
+        return res
+
+def describe_variables(variables, budget):
+    """Turns (name, value, type name) into what send_frame_list and report_frame_variables send."""
+    return [(name, type(obj), budget.repr(obj), safe_hex_repr(obj), type_name, get_object_len(obj)) for name, obj, type_name in variables]
+
+def get_frame_list_changes(old_frames, new_frames):
+    """Returns the [(index, variable)] that changed in each frame, or None if
+    the frames themselves or the names of their variables changed."""
+    if len(old_frames) != len(new_frames):
+        return None
+    changes = []
+    for old_frame, new_frame in zip(old_frames, new_frames):
+        if old_frame[:6] != new_frame[:6] or old_frame[7:] != new_frame[7:]:
+            return None
+        old_vars, new_vars = old_frame[6], new_frame[6]
+        if len(old_vars) != len(new_vars):
+            return None
+        frame_changes = []
+        for index, (old_var, new_var) in enumerate(zip(old_vars, new_vars)):
+            if old_var[0] != new_var[0]:
+                return None
+            if old_var[1] is not new_var[1] or old_var[2:] != new_var[2:]:
+                frame_changes.append((index, new_var))
+        changes.append(frame_changes)
+    return changes
+
 def report_execution_result(execution_id, result, repr_kind = PYTHON_EVALUATION_RESULT_REPR_KIND_NORMAL):
     if repr_kind == PYTHON_EVALUATION_RESULT_REPR_KIND_NORMAL:
         flags = 0
@@ -2237,8 +2566,10 @@ def report_execution_result(execution_id, result, repr_kind = PYTHON_EVALUATION_
         write_int(conn, execution_id)
         write_object(conn, res_type, obj_repr, hex_repr, type_name, obj_len, flags)
 
-def report_children(execution_id, children):
-    children = [(name, expression, flags, safe_repr(result), safe_hex_repr(result), type(result), type(result).__name__, get_object_len(result)) for name, expression, result, flags in children]
+def report_children(execution_id, children, budget = None):
+    if budget is None:
+        budget = ReprBudget()
+    children = [(name, expression, flags, budget.repr(result), safe_hex_repr(result), type(result), type(result).__name__, get_object_len(result)) for name, expression, result, flags in children]
     with _SendLockCtx:
         write_bytes(conn, CHLD)
         write_int(conn, execution_id)
@@ -2248,6 +2579,17 @@ def report_children(execution_id, children):
             write_string(conn, expression)
             write_object(conn, res_type, obj_repr, hex_repr, type_name, obj_len, flags)
 
+def report_frame_variables(execution_id, total, argcount, variables):
+    with _SendLockCtx:
+        write_bytes(conn, FRMV)
+        write_int(conn, execution_id)
+        write_int(conn, total)
+        write_int(conn, argcount)
+        write_int(conn, len(variables))
+        for name, type_obj, safe_repr_obj, hex_repr_obj, type_name, obj_len in variables:
+            write_string(conn, name)
+            write_object(conn, type_obj, safe_repr_obj, hex_repr_obj, type_name, obj_len)
+
 def get_code_filename(code):
     return path.abspath(code.co_filename)
 
@@ -2322,7 +2664,7 @@ def attach_process(port_num, debug_id, debug_options, currentPid, report = False
 
 def attach_process_from_socket(sock, debug_options, report = False, block = False):
     global conn, attach_sent_break, DETACHED, DEBUG_STDLIB, BREAK_ON_SYSTEMEXIT_ZERO, DJANGO_DEBUG
-    global RICH_EXCEPTIONS
+    global RICH_EXCEPTIONS, LAZY_FRAME_VARIABLES
 
     BREAK_ON_SYSTEMEXIT_ZERO = 'BreakOnSystemExitZero' in debug_options
     DJANGO_DEBUG = 'DjangoDebugging' in debug_options
@@ -2339,6 +2681,7 @@ def attach_process_from_socket(sock, debug_options, report = False, block = Fals
     wait_on_abnormal_exit = 'WaitOnAbnormalExit' in debug_options
 
     RICH_EXCEPTIONS = 'RichExceptions' in debug_options
+    LAZY_FRAME_VARIABLES = 'LazyFrameVariables' in debug_options
 
     def _excepthook(exc_type, exc_value, exc_tb):
         # Display the exception and wait on exit
@@ -2438,6 +2781,7 @@ def detach_threads():
         THREADS_LOCK.release()
         
     BREAKPOINTS.clear()
+    break_points_changed()
 
 def new_thread(tid = None, set_break = False, frame = None):
     # called during attach w/ a thread ID provided.
@@ -2588,6 +2932,87 @@ def print_exception(exc_type, exc_value, exc_tb):
     for out in traceback.format_exception_only(exc_type, exc_value):
         sys.stdout.write(out)
 
+class SamplingProfiler(object):
+    """Samples the stacks of all threads every interval seconds with sys._current_frames(), without
+    tracing them. The samples are counted by collapsed stack, i.e. the thread name followed by the
+    frames from the outermost one, separated by semicolons, as read by flamegraph.pl."""
+
+    def __init__(self, interval = 0.005):
+        self.interval = interval
+        self.sample_count = 0
+        # (thread name, (id(code), ...)) -> number of samples
+        self.stacks = {}
+        # id(code) -> (code, label), the code is kept so that the id is not reused
+        self.labels = {}
+        self._stopped = True
+        self._done_lock = thread.allocate_lock()
+        self._thread_id = None
+
+    def start(self):
+        if self._stopped:
+            self._stopped = False
+            self._done_lock.acquire()
+            _start_new_thread(self._run, ())
+
+    def stop(self):
+        """stops sampling and waits for the sample in progress"""
+        if not self._stopped:
+            self._stopped = True
+            self._done_lock.acquire()
+            self._done_lock.release()
+
+    def _run(self):
+        self._thread_id = thread.get_ident()
+        try:
+            while not self._stopped:
+                self.sample()
+                time.sleep(self.interval)
+        finally:
+            self._done_lock.release()
+
+    def sample(self):
+        thread_names = {}
+        threading = sys.modules.get('threading')
+        if threading is not None:
+            for tid, t in list(getattr(threading, '_active', {}).items()):
+                thread_names[tid] = getattr(t, 'name', None)
+
+        labels = self.labels
+        for tid, frame in sys._current_frames().items():
+            if tid == self._thread_id or tid == debugger_thread_id:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                code_id = id(code)
+                if code_id not in labels:
+                    filename = path.basename(code.co_filename).replace(';', ',')
+                    labels[code_id] = (code, '%s (%s:%s)' % (code.co_name, filename, code.co_firstlineno))
+                stack.append(code_id)
+                frame = frame.f_back
+            stack.reverse()
+            key = (thread_names.get(tid) or 'Thread %d' % tid, tuple(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.sample_count += 1
+
+    def get_collapsed_stacks(self):
+        """returns a dict of collapsed stack to its number of samples"""
+        labels = self.labels
+        res = {}
+        for (thread_name, stack), count in list(self.stacks.items()):
+            key = ';'.join([thread_name.replace(';', ',')] + [labels[code_id][1] for code_id in stack])
+            res[key] = res.get(key, 0) + count
+        return res
+
+    def write(self, filename):
+        """writes the samples in the collapsed stack format, one stack and its count per line"""
+        f = open(filename, 'w')
+        try:
+            for stack, count in sorted(self.get_collapsed_stacks().items()):
+                f.write('%s %d\n' % (stack, count))
+        finally:
+            f.close()
+
 def parse_debug_options(s):
     return set([opt.strip() for opt in s.split(',')])
 
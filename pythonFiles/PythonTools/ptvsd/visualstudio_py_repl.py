@@ -63,6 +63,8 @@ read_string = _vspu.read_string
 write_bytes = _vspu.write_bytes
 write_int = _vspu.write_int
 write_string = _vspu.write_string
+begin_message = _vspu.begin_message
+end_message = _vspu.end_message
 
 try:
     unicode
@@ -86,15 +88,26 @@ def _debug_write(out):
 
 
 class SafeSendLock(object):
-    """a lock which ensures we're released if we take a KeyboardInterrupt exception acquiring it"""
-    def __init__(self):
+    """a lock which ensures we're released if we take a KeyboardInterrupt exception acquiring it.
+    What is written to owner.conn while it's held is sent as one message."""
+    def __init__(self, owner = None):
         self.lock = thread.allocate_lock()
+        self.owner = owner
+        self.conn = None
 
     def __enter__(self):
         self.acquire()
+        if self.owner is not None and self.owner.conn is not None:
+            self.conn = self.owner.conn
+            begin_message(self.conn)
 
     def __exit__(self, exc_type, exc_value, tb):
-        self.release()
+        conn, self.conn = self.conn, None
+        try:
+            if conn is not None:
+                end_message(conn, exc_type is None)
+        finally:
+            self.release()
 
     def acquire(self):
         try:
@@ -175,7 +188,7 @@ actual inspection and introspection."""
     def __init__(self, *args, **kwargs):
         import threading
         self.conn = None
-        self.send_lock = SafeSendLock()
+        self.send_lock = SafeSendLock(self)
         self.input_event = threading.Lock()
         self.input_event.acquire()  # lock starts acquired (we use it like a manual reset event)
         self.input_string = None
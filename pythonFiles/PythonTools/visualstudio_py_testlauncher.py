@@ -22,7 +22,10 @@ import sys
 import json
 import unittest
 import socket
+import struct
 import traceback
+from array import array
+from dis import findlinestarts
 from types import CodeType, FunctionType
 import signal
 try:
@@ -103,6 +106,8 @@ class _IpcChannel(object):
         self.callback = callback
         self.lock = thread.allocate_lock()
         self._closed = False
+        # index of the worker process (see --workers) added to all events
+        self.worker = None
         # start the testing reader thread loop
         self.test_thread_id = thread.start_new_thread(self.readSocket, ())
 
@@ -121,6 +126,8 @@ class _IpcChannel(object):
         pass
 
     def send_event(self, name, **args):
+        if self.worker is not None:
+            args['worker'] = self.worker
         with self.lock:
             body = {'type': 'event', 'seq': self.seq, 'event':name, 'body':args}
             self.seq += 1
@@ -184,6 +191,264 @@ class VsTestResult(unittest.TextTestResult):
                 test = test.id()
             )
 
+class _LineCoverage(object):
+    """collects the lines executed by the code objects for which should_collect(code) is true.
+
+    Each code object has an array with a flag for each of its lines, its trace function only
+    sets the flag of the line being executed."""
+
+    def __init__(self, should_collect):
+        self.should_collect = should_collect
+        # id(code) -> (code, trace function or None)
+        self._tracers = {}
+        # filename -> [(first line, line numbers, flags)]
+        self._files = {}
+
+    def start(self):
+        import threading
+        threading.settrace(self._trace)
+        sys.settrace(self._trace)
+
+    def stop(self):
+        import threading
+        sys.settrace(None)
+        threading.settrace(None)
+
+    def _trace(self, frame, event, arg):
+        code = frame.f_code
+        try:
+            return self._tracers[id(code)][1]
+        except KeyError:
+            pass
+        # frozen modules like <frozen posixpath> have no source file to report
+        if not code.co_filename.startswith('<') and self.should_collect(code):
+            return self._add_code(code)
+        self._tracers[id(code)] = (code, None)
+        return None
+
+    def _add_code(self, code):
+        # the code nested in code is added as well, so that functions that never run count as missed
+        first = code.co_firstlineno
+        # newer Pythons start module code with an instruction on line 0 and have instructions without a line
+        lines = [lineno for _, lineno in findlinestarts(code) if lineno is not None and lineno >= first]
+        flags = array('B', [0]) * (max(lines + [first]) - first + 1)
+        self._files.setdefault(code.co_filename, []).append((first, lines, flags))
+
+        def trace_line(frame, event, arg):
+            if event == 'line' and frame.f_lineno >= first:
+                flags[frame.f_lineno - first] = 1
+            return trace_line
+        self._tracers[id(code)] = (code, trace_line)
+
+        for const in code.co_consts:
+            if isinstance(const, CodeType) and id(const) not in self._tracers:
+                self._add_code(const)
+        return trace_line
+
+    def get_data(self):
+        """returns {filename: (set of lines, set of executed lines)}"""
+        data = {}
+        for filename, codes in list(self._files.items()):
+            lines, executed = data.setdefault(filename, (set(), set()))
+            for first, code_lines, flags in codes:
+                lines.update(code_lines)
+                executed.update(line for line in code_lines if flags[line - first])
+        return data
+
+    def save(self, filename):
+        """writes the collected lines to filename, merged with the lines already in the file"""
+        data = self.get_data()
+        if os.path.exists(filename):
+            try:
+                merge_line_coverage(data, read_line_coverage(filename))
+            except (IOError, ValueError, struct.error):
+                pass
+        write_line_coverage(filename, data)
+
+# A line coverage file starts with the magic, followed by an entry for each source file:
+#   name length, line count (little endian 32 bit), UTF-8 name, line numbers (32 bit each),
+#   executed flags (a bit for each line, least significant bit first)
+LINE_COVERAGE_MAGIC = 'PTVSLineCoverage1'.encode('ascii')
+
+def write_line_coverage(filename, data):
+    with open(filename, 'wb') as f:
+        f.write(LINE_COVERAGE_MAGIC)
+        for source, (lines, executed) in sorted(data.items()):
+            name = source
+            if not isinstance(name, bytes):
+                name = name.encode('utf-8')
+            lines = sorted(lines)
+            flags = bytearray((len(lines) + 7) // 8)
+            for i, line in enumerate(lines):
+                if line in executed:
+                    flags[i >> 3] |= 1 << (i & 7)
+            f.write(struct.pack('<II', len(name), len(lines)))
+            f.write(name)
+            f.write(struct.pack('<%dI' % len(lines), *lines))
+            f.write(bytes(flags))
+
+def read_line_coverage(filename):
+    """returns {filename: (set of lines, set of executed lines)} read from a line coverage file"""
+    with open(filename, 'rb') as f:
+        content = f.read()
+    if not content.startswith(LINE_COVERAGE_MAGIC):
+        raise ValueError('%s is not a line coverage file' % filename)
+
+    data = {}
+    pos = len(LINE_COVERAGE_MAGIC)
+    while pos < len(content):
+        name_len, count = struct.unpack_from('<II', content, pos)
+        pos += 8
+        source = content[pos:pos + name_len].decode('utf-8')
+        pos += name_len
+        lines = struct.unpack_from('<%dI' % count, content, pos)
+        pos += 4 * count
+        flags = bytearray(content[pos:pos + (count + 7) // 8])
+        pos += len(flags)
+        executed = set(line for i, line in enumerate(lines) if flags[i >> 3] & (1 << (i & 7)))
+        merge_line_coverage(data, {source: (set(lines), executed)})
+    return data
+
+def merge_line_coverage(data, other):
+    """adds the lines of other to data, both are {filename: (set of lines, set of executed lines)}"""
+    for source, (lines, executed) in other.items():
+        cur_lines, cur_executed = data.setdefault(source, (set(), set()))
+        cur_lines.update(lines)
+        cur_executed.update(executed)
+    return data
+
+def format_line_coverage(data):
+    result = []
+    total_lines = total_executed = 0
+    for source in sorted(data):
+        lines, executed = data[source]
+        total_lines += len(lines)
+        total_executed += len(executed)
+        result.append(_format_line_coverage_row(source, len(lines), len(executed)))
+    result.append(_format_line_coverage_row('TOTAL', total_lines, total_executed))
+    return '\n'.join(result) + '\n'
+
+def _format_line_coverage_row(name, lines, executed):
+    percent = 100.0 * executed / lines if lines else 100.0
+    return '%s %d/%d %.0f%%' % (name, executed, lines, percent)
+
+def _get_test_shard(tests, index, count):
+    """returns the tests of the test classes that go to worker index of count"""
+    classes = []
+    class_tests = {}
+    def add(test):
+        if isinstance(test, unittest.TestSuite):
+            for child in test:
+                add(child)
+            return
+        key = (type(test).__module__, type(test).__name__)
+        if key not in class_tests:
+            classes.append(key)
+            class_tests[key] = []
+        class_tests[key].append(test)
+    add(tests)
+
+    shard = unittest.TestSuite()
+    for i, key in enumerate(classes):
+        if i % count == index:
+            shard.addTests(class_tests[key])
+    return shard
+
+def _get_worker_coverage_file(filename, index):
+    return '%s.worker%d' % (filename, index)
+
+def _run_workers(opts, argv):
+    """runs the tests in opts.workers processes, which send their events to us to pass on to _channel.
+    Returns whether all the tests passed."""
+    import select
+    import subprocess
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(opts.workers)
+    port = listener.getsockname()[1]
+
+    workers = []
+    conns = {} # socket -> received data
+    try:
+        for index in range(opts.workers):
+            # later options replace the earlier ones
+            args = [sys.executable, os.path.abspath(__file__)] + argv + ['--worker-index', str(index), '--result-port', str(port)]
+            if opts.coverage:
+                args += ['--coverage', _get_worker_coverage_file(opts.coverage, index)]
+            workers.append(subprocess.Popen(args, close_fds=True))
+
+        while True:
+            done = all(worker.poll() is not None for worker in workers)
+            readable = select.select([listener] + list(conns), [], [], 0 if done else 0.1)[0]
+            if done and not readable:
+                break
+            for sock in readable:
+                if sock is listener:
+                    conn, _ = listener.accept()
+                    conns[conn] = ''.encode('ascii')
+                    continue
+                data = sock.recv(4096)
+                if not data:
+                    sock.close()
+                    del conns[sock]
+                    continue
+                conns[sock] = _forward_worker_events(conns[sock] + data)
+    finally:
+        for worker in workers:
+            if worker.poll() is None:
+                worker.terminate()
+                worker.wait()
+        for conn in conns:
+            conn.close()
+        listener.close()
+
+    if opts.coverage:
+        _combine_worker_coverage(opts.coverage, [_get_worker_coverage_file(opts.coverage, index) for index in range(opts.workers)])
+    return all(worker.returncode == 0 for worker in workers)
+
+def _forward_worker_events(data):
+    """sends the complete events in data received from a worker on through _channel, returns the rest of data"""
+    while True:
+        header_end = data.find('\n\n'.encode('ascii'))
+        if header_end < 0:
+            return data
+        length = int(data[len('Content-Length: '):header_end])
+        start = header_end + 2
+        if len(data) < start + length:
+            return data
+        message = json.loads(data[start:start + length].decode('utf8'))
+        data = data[start + length:]
+        # we send the done event once all workers are done
+        if message['event'] != 'done' and _channel is not None:
+            _channel.send_event(message['event'], **dict((str(key), value) for key, value in message['body'].items()))
+
+def _combine_worker_coverage(filename, worker_files):
+    worker_files = [f for f in worker_files if os.path.exists(f)]
+    try:
+        import coverage
+    except ImportError:
+        data = {}
+        for f in [filename] + worker_files:
+            try:
+                merge_line_coverage(data, read_line_coverage(f))
+            except (IOError, ValueError, struct.error):
+                pass
+        write_line_coverage(filename, data)
+    else:
+        try:
+            cov = coverage.coverage(filename)
+            cov.load()
+            cov.combine(worker_files)
+            cov.save()
+            cov.xml_report(outfile = filename + '.xml', omit=__file__)
+        except:
+            pass
+    for f in worker_files + [f + '.xml' for f in worker_files]:
+        try:
+            os.remove(f)
+        except OSError:
+            pass
+
 def stopTests():
     try:
         os.kill(os.getpid(), signal.SIGUSR1)
@@ -203,7 +468,7 @@ def main():
     import os
     import sys
     import unittest
-    from optparse import OptionParser
+    from optparse import OptionParser, SUPPRESS_HELP
     global _channel
 
     parser = OptionParser(prog = 'visualstudio_py_testlauncher', usage = 'Usage: %prog [<option>] <test names>... ')
@@ -212,6 +477,7 @@ def main():
     parser.add_option('-t', '--test', type='str', dest='tests', action='append', help='specifies a test to run')
     parser.add_option('--testFile', type='str', help='Fully qualitified path to file name')
     parser.add_option('-c', '--coverage', type='str', help='enable code coverage and specify filename')
+    parser.add_option('--merge-coverage', type='str', help='merge the line coverage files given as arguments into the specified file and print a summary')
     parser.add_option('-r', '--result-port', type='int', help='connect to port on localhost and send test results')
     parser.add_option('--us', type='str', help='Directory to start discovery')
     parser.add_option('--up', type='str', help='Pattern to match test files (''test*.py'' default)')
@@ -219,10 +485,28 @@ def main():
     parser.add_option('--uvInt', '--verboseInt', type='int', help='Verbose output (0 none, 1 (no -v) simple, 2 (-v) full)')
     parser.add_option('--uf', '--failfast', type='str', help='Stop on first failure')
     parser.add_option('--uc', '--catch', type='str', help='Catch control-C and display results')
-    (opts, _) = parser.parse_args()
+    parser.add_option('--workers', type='int', help='run the tests in this many processes, split by test class')
+    parser.add_option('--worker-index', type='int', help=SUPPRESS_HELP)
+    (opts, args) = parser.parse_args()
+
+    if opts.merge_coverage:
+        data = {}
+        for filename in args:
+            merge_line_coverage(data, read_line_coverage(filename))
+        write_line_coverage(opts.merge_coverage, data)
+        sys.stdout.write(format_line_coverage(data))
+        return
 
     if opts.debug:
         from ptvsd.visualstudio_py_debugger import DONT_DEBUG, DEBUG_ENTRYPOINTS, get_code
+    elif opts.coverage:
+        try:
+            import coverage
+        except ImportError:
+            # the built-in line coverage (used without the coverage package) collects the code that would be debugged,
+            # ptvsd has to be imported before sys.path[0] is replaced
+            from ptvsd.visualstudio_py_debugger import DONT_DEBUG, should_debug_code
+            DONT_DEBUG.append(os.path.normcase(__file__))
     
     sys.path[0] = os.getcwd()
     if opts.result_port:
@@ -234,6 +518,7 @@ def main():
             except:
                 pass
         _channel = _IpcChannel(socket.create_connection(('127.0.0.1', opts.result_port)), stopTests)
+        _channel.worker = opts.worker_index
         sys.stdout = _TestOutput(sys.stdout, is_stdout = True)
         sys.stderr = _TestOutput(sys.stderr, is_stdout = False)
 
@@ -262,15 +547,28 @@ def main():
             sleep(0.1)
 
     cov = None
+    line_cov = None
     try:
+        if opts.workers is not None and opts.workers > 1 and opts.worker_index is None and not opts.debug and not opts.mixed_mode:
+            success = _run_workers(opts, sys.argv[1:])
+            if _channel is not None:
+                _channel.close()
+            sys.exit(not success)
+
         if opts.coverage:
             try:
                 import coverage
-                cov = coverage.coverage(opts.coverage)
-                cov.load()
-                cov.start()
-            except:
-                pass
+            except ImportError:
+                if not opts.debug:
+                    line_cov = _LineCoverage(should_debug_code)
+                    line_cov.start()
+            else:
+                try:
+                    cov = coverage.coverage(opts.coverage)
+                    cov.load()
+                    cov.start()
+                except:
+                    pass
         if opts.tests is None and opts.testFile is None:
             if opts.us is None:
                 opts.us = '.'
@@ -313,6 +611,8 @@ def main():
                     message = 'Failed to identify the test',
                     test = ''
                 )
+        if opts.worker_index is not None and tests is not None:
+            tests = _get_test_shard(tests, opts.worker_index, opts.workers)
         if opts.uvInt is None:
             opts.uvInt = 0        
         if opts.uf is not None:
@@ -328,6 +628,9 @@ def main():
             cov.stop()
             cov.save()
             cov.xml_report(outfile = opts.coverage + '.xml', omit=__file__)
+        if line_cov is not None:
+            line_cov.stop()
+            line_cov.save(opts.coverage)
         if _channel is not None:
             _channel.send_event(
                 name='done'
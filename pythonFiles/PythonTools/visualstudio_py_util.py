@@ -23,9 +23,11 @@ __version__ = "3.0.0.0"
 # main thread. This will cause issues when the thread goes away after attach completes.
 
 import imp
+import itertools
 import os
 import sys
 import struct
+import time
 
 # Import encodings early to avoid import on the debugger thread, which may cause deadlock
 from encodings import utf_8, ascii
@@ -131,18 +133,51 @@ ASCII_PREFIX = to_bytes('A')
 NONE_PREFIX = to_bytes('N')
 
 
+# The messages being written, by connection (see begin_message).
+_messages = {}
+
+
+def begin_message(conn):
+    """buffers what is written to conn until end_message, so that a message is sent with a single
+    call instead of one for every prefix, length and payload. The caller serializes the writes."""
+    _messages[conn] = bytearray()
+
+
+def end_message(conn, send = True):
+    message = _messages.pop(conn, None)
+    if message and send:
+        conn.sendall(message)
+
+
 def read_bytes(conn, count):
-    b = to_bytes('')
-    while len(b) < count:
-        received_data = conn.recv(count - len(b))
-        if received_data is None:
+    recv_into = getattr(conn, 'recv_into', None)
+    if recv_into is None:
+        b = to_bytes('')
+        while len(b) < count:
+            received_data = conn.recv(count - len(b))
+            if not received_data:
+                break
+            b += received_data
+        return b
+
+    b = bytearray(count)
+    view = memoryview(b)
+    received = 0
+    while received < count:
+        received_count = recv_into(view[received:], count - received)
+        if not received_count:
+            # The peer closed the connection. b can't be resized while view exists.
             break
-        b += received_data
-    return b
+        received += received_count
+    return view[:received].tobytes()
 
 
 def write_bytes(conn, b):
-    conn.sendall(b)
+    message = _messages.get(conn)
+    if message is None:
+        conn.sendall(b)
+    else:
+        message += b
 
 
 def read_int(conn):
@@ -158,11 +193,7 @@ def read_string(conn):
     strlen = read_int(conn)
     if not strlen:
         return ''
-    res = to_bytes('')
-    while len(res) < strlen:
-        res = res + conn.recv(strlen - len(res))
-
-    res = utf_8.decode(res)[0]
+    res = utf_8.decode(read_bytes(conn, strlen))[0]
     if sys.version_info[0] == 2 and sys.platform != 'cli':
         # Py 2.x, we want an ASCII string if possible
         try:
@@ -236,10 +267,32 @@ class SafeRepr(object):
     # different limits.
     maxother_outer = 2 ** 16
     maxother_inner = 30
+
+    # The repr is cut off with '...' once it gets longer than maxtotal
+    # characters, or once producing it took longer than maxtime seconds.
+    maxtotal = 2 ** 17
+    maxtime = 0.5
+
+    # Dicts with more keys than this are shown in iteration order instead of
+    # sorting all of their keys.
+    maxsorted_keys = 1000
+
+    # numpy arrays and pandas objects with more elements than this are shown
+    # as their type, shape and dtype (or columns) instead of their repr.
+    maxarray = 256
     
     def __call__(self, obj):
         try:
-            return ''.join(self._repr(obj, 0))
+            parts = []
+            size = 0
+            deadline = time.time() + self.maxtime
+            for part in self._repr(obj, 0):
+                if size > self.maxtotal or time.time() > deadline:
+                    parts.append('...')
+                    break
+                parts.append(part)
+                size += len(part)
+            return ''.join(parts)
         except:
             try:
                 return 'An exception was raised: %r' % sys.exc_info()[1]
@@ -273,6 +326,13 @@ class SafeRepr(object):
             if isinstance(obj, t) and has_obj_repr(t):
                 return self._repr_str(obj, level)
 
+        if isinstance(obj, bytearray) and has_obj_repr(bytearray):
+            return self._repr_str(obj, level)
+
+        array_info = self._get_array_info(obj)
+        if array_info is not None:
+            return self._repr_array(obj, level, array_info)
+
         if self._is_long_iter(obj):
             return self._repr_long_iter(obj)
         
@@ -375,10 +435,14 @@ class SafeRepr(object):
         count = self.maxcollection[level]
         yield_comma = False
         
-        try:
-            sorted_keys = sorted(obj)
-        except Exception:
-            sorted_keys = list(obj)
+        if len(obj) > self.maxsorted_keys:
+            # Only the first keys are shown, don't sort all of them.
+            sorted_keys = list(itertools.islice(obj, count))
+        else:
+            try:
+                sorted_keys = sorted(obj)
+            except Exception:
+                sorted_keys = list(obj)
         
         for key in sorted_keys:
             if yield_comma:
@@ -408,7 +472,58 @@ class SafeRepr(object):
         yield suffix
 
     def _repr_str(self, obj, level):
-        return self._repr_obj(obj, level, self.maxstring_inner, self.maxstring_outer)
+        limit = self.maxstring_inner if level > 0 else self.maxstring_outer
+        if len(obj) <= limit:
+            return self._repr_obj(obj, level, self.maxstring_inner, self.maxstring_outer)
+        return self._repr_long_str(obj, limit)
+
+    def _repr_long_str(self, obj, limit):
+        # The repr of a string is at least as long as the string, so only the
+        # parts that end up in the result are passed to repr().
+        left_count, right_count = max(1, int(2 * limit / 3)), max(1, int(limit / 3))
+        try:
+            left = repr(obj[:left_count])[:left_count]
+            right = repr(obj[-right_count:])[-right_count:]
+        except:
+            left = right = None
+        if left is None:
+            for p in self._repr_obj(obj, 0, limit, limit):
+                yield p
+            return
+        yield left
+        yield '...'
+        yield right
+
+    def _get_array_info(self, obj):
+        '''Returns the shape of large numpy arrays and pandas objects, or None.'''
+        try:
+            module = type(obj).__module__.partition('.')[0]
+            if module not in ('numpy', 'pandas'):
+                return None
+            shape = tuple(obj.shape)
+            size = 1
+            for n in shape:
+                size *= n
+            if size <= self.maxarray:
+                return None
+            return shape
+        except:
+            return None
+
+    def _repr_array(self, obj, level, shape):
+        yield '<' + type(obj).__name__ + ', shape = ' + repr(shape)
+        columns = getattr(obj, 'columns', None)
+        if columns is not None:
+            # pandas DataFrame, only the header is shown.
+            yield ', columns = '
+            for p in self._repr_iter(columns, level + 1, '[', ']'):
+                yield p
+        else:
+            try:
+                yield ', dtype = ' + str(obj.dtype)
+            except:
+                pass
+        yield '>'
 
     def _repr_other(self, obj, level):
         return self._repr_obj(obj, level, self.maxother_inner, self.maxother_outer)
@@ -451,6 +566,9 @@ class SafeRepr(object):
         else:
             tests.append((self.maxstring_outer + 4, self.maxstring_inner + 4 + 2, unicode('A') * (self.maxstring_outer + 10)))
         
+        tests.append((self.maxstring_outer + 3, self.maxstring_inner + 3 + 2, '\n' * (self.maxstring_outer + 10)))
+        tests.append((self.maxstring_outer + 3, self.maxstring_inner + 3 + 2, bytearray(self.maxstring_outer + 10)))
+
         for limit1, limit2, value in tests:
             assert len(self(value)) <= limit1 <= len(repr(value)), (len(self(value)), limit1, len(repr(value)), value)
             assert len(self([value])) <= limit2 <= len(repr([value])), (len(self([value])), limit2, len(repr([value])), self([value]))
@@ -616,7 +734,26 @@ class SafeRepr(object):
         #print('len(SafeRepr()(dcoll)) = ' + str(len(text)) + ', len(repr(coll)) = ' + str(len(text_repr)))
         assert len(text) < 8192
 
-        # Test numpy types - they should all use their native reprs, even arrays exceeding limits
+        # Test that long strings keep the start and the end of their repr
+        value = 'a' * self.maxstring_outer + '\t' + 'b' * self.maxstring_outer
+        text = repr(value)
+        left_count, right_count = int(2 * self.maxstring_outer / 3), int(self.maxstring_outer / 3)
+        test(value, text[:left_count] + '...' + text[-right_count:])
+
+        # Test that large dicts show their first keys without sorting them
+        d2 = dict((i, None) for i in range(self.maxsorted_keys + 1))
+        assert self(d2).endswith(', ...}')
+
+        # Test the total size budget
+        old_maxtotal = self.maxtotal
+        self.maxtotal = 10
+        try:
+            test(list(range(10)), '[0, 1, 2, 3...')
+        finally:
+            self.maxtotal = old_maxtotal
+
+        # Test numpy types - they should all use their native reprs, except for arrays with
+        # more than maxarray elements
         try:
             import numpy as np
         except ImportError:
@@ -625,6 +762,7 @@ class SafeRepr(object):
             test(np.int32(123), repr(np.int32(123)))
             test(np.float64(123.456), repr(np.float64(123.456)))
             test(np.zeros(self.maxcollection[0] + 1), repr(np.zeros(self.maxcollection[0] + 1)));
+            test(np.zeros((self.maxarray, 2)), '<ndarray, shape = (%s, 2), dtype = float64>' % self.maxarray)
 
 if __name__ == '__main__':
     print('Running tests...')
@@ -1,8 +1,12 @@
 import os
 import io
+import time
 import re
 import sys
 import json
+import heapq
+import threading
+import collections
 import traceback
 import platform
 
@@ -23,6 +27,430 @@ class RedirectStdout(object):
         os.dup2(self.oldstdout_fno, 1)
         os.close(self.oldstdout_fno)
 
+class RequestScheduler(object):
+    """Queue of pending requests shared by the reader and the worker thread.
+
+    A newer request for the same document and lookup supersedes the queued
+    one, which is answered with an empty result instead of being executed.
+    Interactive lookups (completions, signatures) are served before slow
+    ones (usages, names), so responses are sent out of order by id.
+    """
+    priorities = {
+        'completions': 0,
+        'arguments': 0,
+        'methods': 0,
+        'tooltip': 1,
+        'definitions': 1,
+        'usages': 2,
+        'names': 2,
+    }
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._queue = []
+        self._pending = {}
+        self._counter = 0
+        self._closed = False
+        self._idle = threading.Event()
+        self._idle.set()
+        self._idle_since = 0
+
+    def put(self, request):
+        lookup = request.get('lookup', 'completions')
+        key = (request.get('path', ''), lookup)
+        with self._condition:
+            superseded = self._pending.get(key)
+            if superseded is not None:
+                superseded[-1] = True
+            self._counter += 1
+            entry = [self.priorities.get(lookup, 0), self._counter, request, False]
+            self._pending[key] = entry
+            heapq.heappush(self._queue, entry)
+            self._idle.clear()
+            self._condition.notify()
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+    def task_done(self):
+        """Called by the worker once the response of a request is written."""
+        with self._condition:
+            if not self._queue:
+                self._idle_since = time.time()
+                self._idle.set()
+
+    def wait_until_idle(self, quiet_period=0):
+        """Blocks while requests are queued or being processed.
+
+        Args:
+            quiet_period: Seconds without requests to wait for in addition,
+                requests tend to come in bursts while typing.
+        """
+        while True:
+            self._idle.wait()
+            remaining = self._idle_since + quiet_period - time.time()
+            if remaining <= 0 and self._idle.is_set():
+                return
+            time.sleep(max(remaining, 0.01))
+
+    def get(self):
+        """Blocks until a request is available.
+
+        Returns:
+            Tuple with the request and whether it was superseded, or
+            (None, False) once the input is closed and the queue drained.
+        """
+        with self._condition:
+            while not self._queue and not self._closed:
+                self._condition.wait()
+            if not self._queue:
+                return None, False
+            entry = heapq.heappop(self._queue)
+            request, superseded = entry[2], entry[3]
+            key = (request.get('path', ''), request.get('lookup', 'completions'))
+            if self._pending.get(key) is entry:
+                del self._pending[key]
+            return request, superseded
+
+
+class DocumentBuffers(object):
+    """Sources of the documents as of the last request read for them.
+
+    Instead of the whole source, a request may send the edits made to the
+    document since the previous request, like the content changes of a
+    VSCode document: {'range': {'start': {'line', 'character'}, 'end': ...},
+    'text'}. They are applied as the requests are read, superseded requests
+    and the order in which requests are served don't matter.
+
+    Requests with a source or edits carry the 'version' of the document, the
+    edits are made to the source of the 'baseVersion'.
+    """
+    def __init__(self):
+        # path -> (source, lines or None, version)
+        self._documents = {}
+
+    def resolve(self, request):
+        """Adds the source to a request with edits.
+
+        The edits (as positions used by parso) are kept in the request as
+        'parsoEdits'. If the edits weren't made to the source of the document
+        that is known, the request is marked with 'outdatedSource' and has to
+        be sent again with the whole source.
+        """
+        path = request.get('path', '')
+        edits = request.get('edits')
+        if edits is None:
+            if path and request.get('source') is not None:
+                self._documents[path] = (request['source'], None, request.get('version'))
+            return request
+
+        source, lines, version = self._documents.pop(path, (None, None, None))
+        if source is None or version is None or version != request.get('baseVersion'):
+            request['outdatedSource'] = True
+            return request
+        if lines is None:
+            lines = parso.split_lines(source, keepends=True)
+        parso_edits = []
+        try:
+            for edit in edits:
+                # The positions of an edit refer to the document after the
+                # previous edits.
+                parso_edit = (self._get_position(lines, edit['range']['start']),
+                              self._get_position(lines, edit['range']['end']),
+                              edit['text'])
+                lines = parso.utils.apply_edits(lines, [parso_edit])[0]
+                parso_edits.append(parso_edit)
+        except (KeyError, TypeError, ValueError):
+            sys.stderr.write('Cannot apply the edits to %s:\n%s\n'
+                             % (path, traceback.format_exc()))
+            sys.stderr.flush()
+            request['outdatedSource'] = True
+            return request
+        request['source'] = ''.join(lines)
+        request['parsoEdits'] = parso_edits
+        self._documents[path] = (request['source'], lines, request.get('version'))
+        return request
+
+    def _get_position(self, lines, position):
+        """Converts a VSCode position to a position used by parso.
+
+        VSCode counts the characters of a line in UTF-16 code units, parso
+        in code points. Characters outside of the basic multilingual plane
+        (e.g. emojis) are two code units.
+        """
+        line = position['line']
+        character = position['character']
+        if sys.maxunicode == 0xFFFF or not 0 <= line < len(lines):
+            # Unicode strings of narrow Python builds are UTF-16 already.
+            return line + 1, character
+        units = 0
+        for column, char in enumerate(lines[line]):
+            if units >= character:
+                return line + 1, column
+            units += 2 if ord(char) > 0xFFFF else 1
+        return line + 1, len(lines[line]) + character - units
+
+
+class WorkspaceIndexer(object):
+    """Parses the files of the workspace on a background thread.
+
+    The files of the project come first, then the modules they import and
+    finally everything else on sys.path. The first two are kept in the in
+    memory parser cache while it is less than half full, the rest only goes
+    to the file system cache. Preloaded modules are parsed the same way,
+    together with the modules they import. Before every file the indexer
+    waits until no request is queued or being processed. The file is then
+    parsed while holding the lock the worker holds for a request, so a
+    request that comes in meanwhile waits for one file at most.
+    """
+    skipped_directories = ('.git', '.hg', '.svn', '.tox', '__pycache__', 'node_modules')
+    quiet_period = 0.5
+
+    def __init__(self, scheduler, grammar, lock):
+        self._scheduler = scheduler
+        self._grammar = grammar
+        self._lock = lock
+        self._condition = threading.Condition()
+        self._pending = None
+        self._preload = []
+        self._generation = 0
+        self._indexed_projects = set()
+        self._thread = None
+
+    def preload(self, modules):
+        """Queues modules to be parsed before they are imported."""
+        with self._condition:
+            self._preload.extend((m, list(sys.path)) for m in modules if m)
+            self._condition.notify()
+        self._start()
+
+    def index(self, project_path, sys_path):
+        """Starts indexing a project, unless it is or was already indexed."""
+        with self._condition:
+            if project_path in self._indexed_projects:
+                return
+            self._indexed_projects.add(project_path)
+            # Stop indexing the previous project.
+            self._generation += 1
+            self._pending = (self._generation, project_path, list(sys_path))
+            self._condition.notify()
+        self._start()
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._preload:
+                    self._condition.wait()
+                if self._preload:
+                    preload, work = self._preload.pop(0), None
+                else:
+                    preload, work, self._pending = None, self._pending, None
+            try:
+                if preload is not None:
+                    self._preload_module(*preload)
+                else:
+                    self._index(*work)
+            except Exception:
+                sys.stderr.write(traceback.format_exc() + '\n')
+                sys.stderr.flush()
+
+    def _preload_module(self, module, sys_path):
+        """Parses the files of a module and of the modules it imports."""
+        paths = list(self._find_module_files(module, sys_path))
+        if not paths:
+            # A compiled module, loading it is a single call to the subprocess.
+            self._scheduler.wait_until_idle(self.quiet_period)
+            with self._lock:
+                jedi.preload_module(module)
+            return
+        seen = set(paths)
+        imported = []
+        for path in paths:
+            imported.extend(self._parse(path, keep=True))
+        for name in imported:
+            for path in self._find_module_files(name, sys_path):
+                if path not in seen:
+                    seen.add(path)
+                    self._parse(path, keep=True)
+
+    def _is_current(self, generation):
+        return generation == self._generation
+
+    def _index(self, generation, project_path, sys_path):
+        imported = collections.deque()
+        seen = set()
+        if jedi.settings.symbol_index:
+            index = jedi.evaluate.symbol_index.get_symbol_index(project_path)
+        else:
+            index = None
+
+        for path in self._walk(project_path):
+            if not self._is_current(generation):
+                return
+            seen.add(path)
+            if index is not None:
+                index.refresh([path], save=False)
+            imported.extend(self._parse(path, keep=True))
+        if index is not None:
+            index.save()
+
+        while imported:
+            if not self._is_current(generation):
+                return
+            for path in self._find_module_files(imported.popleft(), sys_path):
+                if path not in seen:
+                    seen.add(path)
+                    imported.extend(self._parse(path, keep=True))
+
+        project_prefix = os.path.join(os.path.abspath(project_path), '')
+        for directory in sys_path:
+            if os.path.join(os.path.abspath(directory), '').startswith(project_prefix):
+                # Already indexed with the project.
+                continue
+            for path in self._walk(directory):
+                if not self._is_current(generation):
+                    return
+                if path not in seen:
+                    self._parse(path, keep=False)
+
+    def _walk(self, directory):
+        for root, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if d not in self.skipped_directories)
+            for file_name in sorted(files):
+                if file_name.endswith('.py'):
+                    yield os.path.join(root, file_name)
+
+    def _parse(self, path, keep):
+        """Returns the imports of path if its module is in the in memory cache."""
+        self._scheduler.wait_until_idle(self.quiet_period)
+        with self._lock:
+            hashed = self._grammar._hashed
+            cache = parso.cache.parser_cache.setdefault(hashed, {})
+            try:
+                # Files in the cache were possibly parsed for a request and
+                # must not be reparsed here, requests update them when needed.
+                return self._get_imports(cache[path].node)
+            except KeyError:
+                pass
+
+            max_modules = parso.cache.cache_max_modules
+            keep = keep and (max_modules is None or len(cache) < max_modules // 2)
+            if not keep and parso.cache.is_module_cached(
+                    hashed, path, cache_path=jedi.settings.cache_directory):
+                return []
+            try:
+                module = self._grammar.parse(
+                    path=path, cache=True,
+                    cache_path=jedi.settings.cache_directory)
+            except Exception:
+                # Unreadable files, encoding problems, etc.
+                return []
+            if not keep:
+                cache.pop(path, None)
+                return []
+            return self._get_imports(module)
+
+    def _get_imports(self, module):
+        """Returns the dotted names of the absolute imports of a module."""
+        names = []
+        for import_ in module.iter_imports():
+            if import_.level:
+                # Relative imports are in the project, which is parsed anyway.
+                continue
+            for dotted in import_.get_paths():
+                names.append('.'.join(name.value for name in dotted))
+        return names
+
+    def _find_module_files(self, dotted_name, sys_path):
+        parts = dotted_name.split('.')
+        for i in range(1, len(parts) + 1):
+            for directory in sys_path:
+                path = os.path.join(directory, *parts[:i])
+                init_path = os.path.join(path, '__init__.py')
+                if os.path.isfile(init_path):
+                    yield init_path
+                    break
+                if os.path.isfile(path + '.py'):
+                    yield path + '.py'
+                    break
+
+
+class JediSession(object):
+    """Keeps a single jedi evaluator alive between requests.
+
+    Everything jedi inferred about modules that did not change stays cached.
+    Modules are invalidated one by one, when their file on disk is modified
+    or when the buffer sent by VSCode differs from the previous request.
+    """
+    def __init__(self, environment):
+        self.environment = environment
+        self._key = None
+        self._evaluator = None
+        self._module_mtimes = {}
+        self._buffer_hashes = {}
+
+    def _get_mtime(self, path):
+        try:
+            return os.path.getmtime(path)
+        except (OSError, TypeError):
+            return None
+
+    def get_evaluator(self, path, source):
+        """Returns a warm evaluator for the file at path.
+
+        A new evaluator is created whenever the project or sys.path changes
+        or the subprocess of the previous one crashed.
+        """
+        project = jedi.api.project.get_default_project(
+            os.path.dirname(path) if path else os.getcwd())
+        project._sys_path = list(sys.path)
+        key = (project._path, tuple(sys.path))
+        if key != self._key or self._evaluator.compiled_subprocess.is_crashed:
+            self._key = key
+            self._evaluator = jedi.evaluate.Evaluator(
+                project, environment=self.environment,
+                script_path=os.path.abspath(path) if path else None)
+            self._module_mtimes = {}
+            self._buffer_hashes = {}
+
+        stale = [p for p, mtime in self._module_mtimes.items()
+                 if self._get_mtime(p) != mtime]
+        if path:
+            path = os.path.abspath(path)
+            buffer_hash = hash(source)
+            if self._buffer_hashes.get(path, buffer_hash) != buffer_hash:
+                stale.append(path)
+            self._buffer_hashes[path] = buffer_hash
+        for p in stale:
+            self._module_mtimes.pop(p, None)
+        self._evaluator.invalidate_modules(stale)
+        return self._evaluator
+
+    def record_module_mtimes(self):
+        """Remembers the mtimes of the modules loaded by the last request."""
+        if self._evaluator is None:
+            return
+        for path in self._evaluator.module_cache.iterate_paths():
+            if path and path not in self._module_mtimes:
+                self._module_mtimes[path] = self._get_mtime(path)
+
+    def index_source(self, path, source):
+        """Feeds the buffer of a file to the symbol index of its project."""
+        if not jedi.settings.symbol_index or not path or source is None:
+            return
+        project = jedi.api.project.get_default_project(os.path.dirname(path))
+        index = jedi.evaluate.symbol_index.get_symbol_index(project._path)
+        index.update_source(os.path.abspath(path), source)
+
+
 class JediCompletion(object):
     basic_types = {
         'module': 'import',
@@ -34,6 +462,8 @@ class JediCompletion(object):
     def __init__(self):
         self.default_sys_path = sys.path
         self.environment = jedi.api.environment.Environment(sys.prefix, sys.executable)
+        self.session = JediSession(self.environment)
+        self.buffers = DocumentBuffers()
         self._input = io.open(sys.stdin.fileno(), encoding='utf-8')
         if (os.path.sep == '/') and (platform.uname()[2].find('Microsoft') > -1):
             # WSL; does not support UNC paths
@@ -518,8 +948,14 @@ class JediCompletion(object):
         self.use_snippets = config.get('useSnippets')
         self.show_doc_strings = config.get('showDescriptions', True)
         self.fuzzy_matcher = config.get('fuzzyMatcher', False)
+        self.persistent_evaluator = config.get('persistentEvaluator', True)
         jedi.settings.case_insensitive_completion = config.get(
             'caseInsensitiveCompletion', True)
+        jedi.settings.compiled_introspection_cache = config.get(
+            'compiledIntrospectionCache', True)
+        jedi.settings.symbol_index = config.get('symbolIndex', True)
+        parso.cache.content_addressed_cache = config.get('contentAddressedCache', True)
+        self.background_indexing = config.get('backgroundIndexing', False)
         for path in config.get('extraPaths', []):
             if path and path not in sys.path:
                 sys.path.insert(0, path)
@@ -544,10 +980,8 @@ class JediCompletion(object):
                 request['path'] = newPath
 
     def _process_request(self, request):
-        """Accept serialized request from VSCode and write response.
+        """Accept deserialized request from VSCode and write response.
         """
-        request = self._deserialize(request)
-
         self._set_request_config(request.get('config', {}))
 
         self._normalize_request_path(request)
@@ -555,6 +989,12 @@ class JediCompletion(object):
         if len(path) > 0 and path not in sys.path:
             sys.path.insert(0, path)
         lookup = request.get('lookup', 'completions')
+        self._parse_edits(request)
+
+        if lookup in ('names', 'usages'):
+            # Usages in other files are searched in the symbol index, make
+            # sure it knows about the unsaved changes of this file.
+            self.session.index_source(request.get('path', ''), request.get('source', None))
 
         if lookup == 'names':
             return self._serialize_definitions(
@@ -564,10 +1004,45 @@ class JediCompletion(object):
                     all_scopes=True),
                 request['id'])
 
+        try:
+            return self._process_evaluator_request(request, lookup)
+        except jedi.InternalError:
+            # The subprocess that analyzes compiled modules crashed (e.g. an
+            # extension module segfaulted), retry once with a new one.
+            sys.stderr.write(traceback.format_exc() + '\n')
+            sys.stderr.flush()
+            return self._process_evaluator_request(request, lookup)
+
+    def _process_evaluator_request(self, request, lookup):
+        if self.persistent_evaluator:
+            try:
+                return self._process_script_request(request, lookup, self.session.get_evaluator(
+                    request.get('path', ''), request.get('source', None)))
+            finally:
+                self.session.record_module_mtimes()
+        return self._process_script_request(request, lookup)
+
+    def _parse_edits(self, request):
+        """Applies the edits of a request to the module in parso's cache.
+
+        The module jedi parses is then the same and parso doesn't have to
+        diff the whole source to find out what changed. If the cached module
+        isn't the one the edits were made to, parso diffs the source anyway.
+        """
+        edits = request.get('parsoEdits')
+        if not edits or not request.get('path'):
+            return
+        self.environment.get_grammar().parse(
+            request['source'], path=os.path.abspath(request['path']),
+            diff_cache=True, cache_path=jedi.settings.cache_directory,
+            edits=edits)
+
+    def _process_script_request(self, request, lookup, evaluator=None):
         script = jedi.Script(
             source=request.get('source', None), line=request['line'] + 1,
             column=request['column'], path=request.get('path', ''),
-            sys_path=sys.path, environment=self.environment)
+            sys_path=sys.path, environment=self.environment,
+            _evaluator=evaluator)
 
         if lookup == 'definitions':
             defs = self._get_definitionsx(script.goto_assignments(follow_imports=True), request['id'])
@@ -607,20 +1082,63 @@ class JediCompletion(object):
         sys.stdout.write(response + '\n')
         sys.stdout.flush()
 
-    def watch(self):
-        while True:
-            try:
+    def _read_requests(self, scheduler):
+        """Reads requests from the standard input on a dedicated thread."""
+        try:
+            while True:
                 rq = self._input.readline()
                 if len(rq) == 0:
                     # Reached EOF - indication our parent process is gone.
+                    return
+                try:
+                    scheduler.put(self.buffers.resolve(self._deserialize(rq)))
+                except Exception:
+                    sys.stderr.write(traceback.format_exc() + '\n')
+                    sys.stderr.flush()
+        finally:
+            scheduler.close()
+
+    def _index_workspace(self, indexer, request):
+        """Starts indexing the project of a request in the background."""
+        if not self.background_indexing or not request.get('path'):
+            return
+        project = jedi.api.project.get_default_project(
+            os.path.dirname(request['path']))
+        indexer.index(project._path, sys.path)
+
+    def watch(self, modules_to_preload=()):
+        scheduler = RequestScheduler()
+        # Held while jedi or parso are used, the indexer runs on its own thread.
+        lock = threading.Lock()
+        indexer = WorkspaceIndexer(scheduler, self.environment.get_grammar(), lock)
+        indexer.preload(modules_to_preload)
+        reader = threading.Thread(target=self._read_requests, args=(scheduler,))
+        reader.daemon = True
+        reader.start()
+        while True:
+            try:
+                request, superseded = scheduler.get()
+                if request is None:
                     sys.stderr.write('Received EOF from the standard input,exiting' + '\n')
                     sys.stderr.flush()
                     return
-                with RedirectStdout():
-                    response = self._process_request(rq)
+                if request.get('outdatedSource'):
+                    # The client sends the request again with the whole source.
+                    response = json.dumps({'id': request['id'], 'results': [],
+                                           'resendSource': True})
+                elif superseded:
+                    response = json.dumps({'id': request['id'], 'results': []})
+                else:
+                    with lock, RedirectStdout():
+                        response = self._process_request(request)
+                        self._index_workspace(indexer, request)
+                        # Writes what was found out about compiled modules.
+                        jedi.evaluate.compiled.subprocess.cache.save_caches()
                 self._write_response(response)
+                scheduler.task_done()
 
             except Exception:
+                scheduler.task_done()
                 sys.stderr.write(traceback.format_exc() + '\n')
                 sys.stderr.flush()
 
@@ -641,11 +1159,11 @@ if __name__ == '__main__':
 
     sys.path.insert(0, jediPath)
     import jedi
+    import parso.cache
+    import parso.utils
     if jediPreview:
         jedi.settings.cache_directory = os.path.join(
             jedi.settings.cache_directory, cachePrefix + jedi.__version__.replace('.', ''))
     # remove jedi from path after we import it so it will not be completed
     sys.path.pop(0)
-    if len(modulesToLoad) > 0:
-        jedi.preload_module(*modulesToLoad.split(','))
-    JediCompletion().watch()
+    JediCompletion().watch(modulesToLoad.split(','))
@@ -83,7 +83,8 @@ class Script(object):
     :type sys_path: Environment
     """
     def __init__(self, source=None, line=None, column=None, path=None,
-                 encoding='utf-8', sys_path=None, environment=None):
+                 encoding='utf-8', sys_path=None, environment=None,
+                 _evaluator=None):
         self._orig_path = path
         # An empty path (also empty string) should always result in no path.
         self.path = os.path.abspath(path) if path else None
@@ -99,17 +100,23 @@ class Script(object):
         if sys_path is not None and not is_py3:
             sys_path = list(map(force_unicode, sys_path))
 
-        # Load the Python grammar of the current interpreter.
-        project = get_default_project(
-            os.path.dirname(self.path)if path else os.getcwd()
-        )
-        # TODO deprecate and remove sys_path from the Script API.
-        if sys_path is not None:
-            project._sys_path = sys_path
-        self._evaluator = Evaluator(
-            project, environment=environment, script_path=self.path
-        )
-        self._project = project
+        if _evaluator is None:
+            # Load the Python grammar of the current interpreter.
+            project = get_default_project(
+                os.path.dirname(self.path)if path else os.getcwd()
+            )
+            # TODO deprecate and remove sys_path from the Script API.
+            if sys_path is not None:
+                project._sys_path = sys_path
+            self._evaluator = Evaluator(
+                project, environment=environment, script_path=self.path
+            )
+        else:
+            # A long-lived evaluator whose caches are kept warm (and
+            # invalidated) by the caller, see ``Evaluator.invalidate_modules``.
+            self._evaluator = _evaluator
+            self._evaluator.prepare_for_script(self.path)
+        self._project = self._evaluator.project
         debug.speed('init')
         self._module_node, source = self._evaluator.parse_and_get_code(
             code=source,
@@ -16,7 +16,7 @@ from distutils.spawn import find_executable
 from jedi._compatibility import GeneralizedPopen
 from jedi.cache import memoize_method, time_cache
 from jedi.evaluate.compiled.subprocess import get_subprocess, \
-    EvaluatorSameProcess, EvaluatorSubprocess
+    get_pooled_subprocess, EvaluatorSameProcess, EvaluatorSubprocess
 
 import parso
 
@@ -95,7 +95,7 @@ class Environment(_BaseEnvironment):
         return '<%s: %s in %s>' % (self.__class__.__name__, version, self.path)
 
     def get_evaluator_subprocess(self, evaluator):
-        return EvaluatorSubprocess(evaluator, self._get_subprocess())
+        return EvaluatorSubprocess(evaluator, get_pooled_subprocess(self.executable))
 
     def _get_subprocess(self):
         return get_subprocess(self.executable)
@@ -63,9 +63,13 @@ only *evaluates* what needs to be *evaluated*. All the statements and modules
 that are not used are just being ignored.
 """
 
+import os
+
 from parso.python import tree
 import parso
 from parso import python_bytes_to_unicode
+import parso.cache
+from parso.tree import NodeOrLeaf
 
 from jedi import debug
 from jedi import parser_utils
@@ -105,6 +109,10 @@ class Evaluator(object):
         self.is_analysis = False
         self.project = project
         self.access_cache = {}
+        # module node -> (path, import keys), see register_module
+        self._module_imports = {}
+        # import key -> module nodes with that key, see _get_import_keys
+        self._importers = {}
 
         self.reset_recursion_limitations()
         self.allow_different_encoding = True
@@ -118,6 +126,106 @@ class Evaluator(object):
         self.recursion_detector = recursion.RecursionDetector()
         self.execution_recursion_detector = recursion.ExecutionRecursionDetector(self)
 
+    def prepare_for_script(self, script_path):
+        """
+        Makes a long-lived evaluator ready for the next ``Script``. All the
+        per request state is reset, while the caches stay warm.
+        """
+        if script_path != self.script_path:
+            self.script_path = script_path
+            # The sys path of a project depends on the script path.
+            self._forget_memoized(lambda part: part is self.project)
+        self.inferred_element_counts = {}
+        self.analysis = []
+        self.reset_recursion_limitations()
+
+    def invalidate_modules(self, paths):
+        """
+        Forgets the modules at ``paths`` and everything that has been
+        inferred from them. Used to keep an evaluator alive across requests
+        while files on disk or editor buffers change.
+
+        Modules that import a forgotten module (directly or through other
+        modules) are not parsed again, but what was inferred in them is
+        forgotten as well, because it may come from the changed module.
+        """
+        stale_paths = set()
+        module_nodes = set()
+        for path in paths:
+            module = self.module_cache.remove_path(path)
+            if module is not None and module.tree_node is not None:
+                module_nodes.add(module.tree_node)
+            try:
+                module_nodes.add(
+                    parso.cache.parser_cache[self.grammar._hashed][path].node
+                )
+            except KeyError:
+                pass
+            if path:
+                stale_paths.add(os.path.abspath(path))
+
+        if module_nodes:
+            dependents = self._get_dependent_modules(stale_paths)
+            for module_node in module_nodes:
+                self._forget_module_imports(module_node)
+            module_nodes |= dependents
+            self._forget_memoized(
+                lambda part: _get_module_node(part) in module_nodes
+            )
+
+    def register_module(self, module_node, path):
+        """
+        Remembers what a module imports, so that invalidate_modules finds the
+        modules that depend on a changed one without looking at all of them.
+        """
+        if module_node in self._module_imports:
+            return
+        if path is not None:
+            path = os.path.abspath(path)
+        keys = _get_import_keys(module_node, path)
+        self._module_imports[module_node] = path, keys
+        for key in keys:
+            self._importers.setdefault(key, set()).add(module_node)
+
+    def _forget_module_imports(self, module_node):
+        _, keys = self._module_imports.pop(module_node, (None, ()))
+        for key in keys:
+            importers = self._importers[key]
+            importers.discard(module_node)
+            if not importers:
+                del self._importers[key]
+
+    def _get_dependent_modules(self, stale_paths):
+        """
+        Returns the module nodes that import one of the modules at
+        ``stale_paths``, directly or through each other.
+        """
+        sys_path = self.get_sys_path()
+        dependents = set()
+        seen_paths = set(stale_paths)
+        todo = list(stale_paths)
+        while todo:
+            for key in _get_module_keys(todo.pop(), sys_path):
+                for module_node in self._importers.get(key, ()):
+                    if module_node in dependents:
+                        continue
+                    dependents.add(module_node)
+                    path = self._module_imports[module_node][0]
+                    if path is not None and path not in seen_paths:
+                        seen_paths.add(path)
+                        todo.append(path)
+        return dependents
+
+    def _forget_memoized(self, is_stale):
+        for memo in self.memoize_cache.values():
+            for key, value in list(memo.items()):
+                obj, args, kwargs = key
+                parts = (obj,) + args + tuple(v for _, v in kwargs)
+                if isinstance(value, (ContextSet, list, set, tuple)):
+                    parts += tuple(value)
+                if any(is_stale(part) for part in parts):
+                    del memo[key]
+
     def get_sys_path(self):
         """Convenience function"""
         return self.project._get_sys_path(self, environment=self.environment)
@@ -384,3 +492,63 @@ class Evaluator(object):
 
     def parse(self, *args, **kwargs):
         return self.parse_and_get_code(*args, **kwargs)[0]
+
+
+def _get_import_keys(module_node, path):
+    """
+    Returns what a module imports: ``('name', dotted name)`` for every
+    prefix of an absolute import and ``('package', directory)`` for the
+    package a relative import starts from.
+    """
+    keys = set()
+    for import_ in module_node.iter_imports():
+        level = import_.level
+        if level:
+            if path is None:
+                continue
+            directory = os.path.dirname(path)
+            for _ in range(level - 1):
+                directory = os.path.dirname(directory)
+            keys.add(('package', directory))
+            continue
+        for dotted in import_.get_paths():
+            parts = [name.value for name in dotted]
+            for i in range(1, len(parts) + 1):
+                keys.add(('name', '.'.join(parts[:i])))
+    return keys
+
+
+def _get_module_keys(path, sys_path):
+    """
+    Returns the import keys (see _get_import_keys) with which a module
+    importing the module at ``path`` might get to it.
+    """
+    keys = set()
+    if path.endswith('.py'):
+        module_path = path[:-len('.py')]
+        if os.path.basename(module_path) == '__init__':
+            module_path = os.path.dirname(module_path)
+        for directory in sys_path:
+            directory = os.path.join(directory, '')
+            if module_path.startswith(directory):
+                name = module_path[len(directory):].replace(os.path.sep, '.')
+                keys.add(('name', name))
+    # Relative imports from the package of the module or any one around it.
+    directory = os.path.dirname(path)
+    while True:
+        keys.add(('package', directory))
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            break
+        directory = parent
+    return keys
+
+
+def _get_module_node(obj):
+    if isinstance(obj, NodeOrLeaf):
+        return obj.get_root_node()
+    # Looked up on the type, access handles answer every attribute lookup.
+    if getattr(type(obj), 'get_root_context', None) is None:
+        # Strings, numbers and everything else that doesn't belong to a module.
+        return None
+    return obj.get_root_context().tree_node
@@ -345,7 +345,14 @@ class CompiledObjectFilter(AbstractFilter):
     def values(self):
         from jedi.evaluate.compiled import builtin_from_name
         names = []
-        needs_type_completions, dir_infos = self._compiled_object.access_handle.get_dir_infos()
+        access_handle = self._compiled_object.access_handle
+        needs_type_completions, dir_infos = access_handle.get_dir_infos()
+        # All the names are probably going to be inferred, get everything
+        # that is needed for that in one go.
+        access_handle.prefetch_attributes([
+            name for name, (has_attribute, is_descriptor) in dir_infos.items()
+            if has_attribute and not is_descriptor
+        ])
         for name in dir_infos:
             names += self._get(
                 name,
@@ -13,13 +13,16 @@ import subprocess
 import socket
 import errno
 import weakref
+import threading
 import traceback
 from functools import partial
 
-from jedi._compatibility import queue, is_py3, force_unicode, \
+from jedi._compatibility import queue, is_py3, force_unicode, unicode, \
     pickle_dump, pickle_load, GeneralizedPopen
+from jedi import settings
 from jedi.cache import memoize_method
 from jedi.evaluate.compiled.subprocess import functions
+from jedi.evaluate.compiled.subprocess import cache
 from jedi.evaluate.compiled.access import DirectObjectAccess, AccessPath, \
     SignatureParam
 from jedi.api.exceptions import InternalError
@@ -28,20 +31,200 @@ _subprocesses = {}
 
 _MAIN_PATH = os.path.join(os.path.dirname(__file__), '__main__.py')
 
+# The access methods that are called on pretty much every member of an object
+# when completing on it, see ``AccessHandle.prefetch_attributes``.
+_PREFETCHED_METHODS = (
+    'get_api_type',
+    'is_class',
+    'ismethoddescriptor',
+    'py__doc__',
+    'get_signature_params',
+)
 
-def get_subprocess(executable):
+# The types of arguments that identify a call in the introspection cache.
+_PLAIN_TYPES = (bool, int, float, bytes, unicode, type(None))
+
+
+def get_subprocess(executable, index=0):
+    """
+    Returns the subprocess in slot ``index`` of the pool of ``executable``. A
+    subprocess that crashed (or was killed) is replaced by a new one.
+    """
+    key = executable, index
     try:
-        return _subprocesses[executable]
+        return _subprocesses[key]
     except KeyError:
-        sub = _subprocesses[executable] = _CompiledSubprocess(executable)
+        sub = _subprocesses[key] = _CompiledSubprocess(executable, index)
         return sub
 
 
+def get_pooled_subprocess(executable):
+    """
+    Returns the subprocess of the pool of ``executable`` that is used by the
+    fewest evaluators, see :attr:`jedi.settings.compiled_subprocess_pool_size`.
+    """
+    size = max(settings.compiled_subprocess_pool_size, 1)
+    return min(
+        (get_subprocess(executable, index) for index in range(size)),
+        key=lambda sub: sub.evaluator_count
+    )
+
+
 def _get_function(name):
     return getattr(functions, name)
 
 
+def _is_plain(value):
+    if isinstance(value, tuple):
+        return all(_is_plain(v) for v in value)
+    return isinstance(value, _PLAIN_TYPES)
+
+
+def _load_cached_handles(obj):
+    """
+    Loads the objects of the cached access handles in the arguments ``obj`` in
+    the subprocess if necessary. That's a call to the subprocess, so it cannot
+    happen while pickling the arguments.
+    """
+    if isinstance(obj, (tuple, list)):
+        for o in obj:
+            _load_cached_handles(o)
+    elif isinstance(obj, dict):
+        for o in obj.values():
+            _load_cached_handles(o)
+    elif isinstance(obj, CachedAccessHandle):
+        obj.id
+
+
+def _encode_handles(obj, handles):
+    """
+    Replaces the access handles in a result with ``HandleReference`` objects
+    and appends them to ``handles``.
+    """
+    if isinstance(obj, SignatureParam):
+        return SignatureParam(*_encode_handles(tuple(obj), handles))
+    elif isinstance(obj, tuple):
+        return tuple(_encode_handles(o, handles) for o in obj)
+    elif isinstance(obj, list):
+        return [_encode_handles(o, handles) for o in obj]
+    elif isinstance(obj, AccessHandle):
+        handles.append(obj)
+        return cache.HandleReference(len(handles) - 1)
+    elif isinstance(obj, AccessPath):
+        return AccessPath(_encode_handles(obj.accesses, handles))
+    return obj
+
+
+def _decode_handles(obj, get_handle):
+    if isinstance(obj, SignatureParam):
+        return SignatureParam(*_decode_handles(tuple(obj), get_handle))
+    elif isinstance(obj, tuple):
+        return tuple(_decode_handles(o, get_handle) for o in obj)
+    elif isinstance(obj, list):
+        return [_decode_handles(o, get_handle) for o in obj]
+    elif isinstance(obj, cache.HandleReference):
+        return get_handle(obj.index)
+    elif isinstance(obj, AccessPath):
+        return AccessPath(_decode_handles(obj.accesses, get_handle))
+    return obj
+
+
+def _load_cached_call(owner, call_key):
+    """
+    Returns ``(is_exception, result)`` of a call that is in the introspection
+    cache or None.
+    """
+    entry = owner._cache.get((owner._key, call_key))
+    if entry is None:
+        return None
+    is_exception, encoded = entry
+    subprocess = owner._subprocess
+    return is_exception, _decode_handles(
+        encoded,
+        lambda index: subprocess.get_cached_handle(owner, call_key, index)
+    )
+
+
+def _store_cached_call(owner, call_key, is_exception, result):
+    """
+    Writes the result of a call to the introspection cache and returns the
+    result with all access handles replaced by cached ones.
+    """
+    handles = []
+    encoded = _encode_handles(result, handles)
+    handles = [
+        owner._subprocess.get_cached_handle(owner, call_key, index, handle)
+        for index, handle in enumerate(handles)
+    ]
+    name, args, kwargs = call_key
+    if _is_plain(args) and _is_plain(tuple(value for key, value in kwargs)):
+        owner._cache.set((owner._key, call_key), (is_exception, encoded))
+    return _decode_handles(encoded, handles.__getitem__)
+
+
+def call_batch(calls):
+    """
+    Makes all the calls of access methods in ``calls`` that are not cached yet
+    with one round trip per subprocess and caches their results in the access
+    handles, as if the methods were called one by one.
+
+    The calls are ``(handle, name, args, kwargs)`` tuples. Instead of an
+    access handle, ``handle`` can be the position of an earlier call in
+    ``calls`` that returns one.
+    """
+    entries = {}
+    sent = {}
+    batches = []
+    for position, (handle, name, args, kwargs) in enumerate(calls):
+        call_key = name, tuple(args), frozenset(kwargs.items())
+        if isinstance(handle, int):
+            if handle in sent:
+                number, index = sent[handle]
+                messages = batches[number][1]
+                sent[position] = number, len(messages)
+                messages.append((functions.CallResult(index), name, args, kwargs))
+                continue
+            is_exception, handle = entries.get(handle, (True, None))
+            if is_exception or not isinstance(handle, AccessHandle):
+                continue
+
+        entry = handle._results.get(call_key)
+        if entry is None and isinstance(handle, CachedAccessHandle):
+            entry = _load_cached_call(handle, call_key)
+            if entry is not None:
+                handle._results[call_key] = entry
+        if entry is not None:
+            entries[position] = entry
+            continue
+
+        for number, (subprocess, messages) in enumerate(batches):
+            if subprocess is handle._subprocess:
+                break
+        else:
+            number, messages = len(batches), []
+            batches.append((handle._subprocess, messages))
+        sent[position] = number, len(messages)
+        messages.append((handle.id, name, args, kwargs))
+
+    results = [subprocess.call_batch(messages) for subprocess, messages in batches]
+    for position in sorted(sent):
+        number, index = sent[position]
+        handle, name, args, kwargs = calls[position]
+        entry = results[number][index]
+        if isinstance(handle, int):
+            is_exception, handle = entries[handle]
+            if is_exception or not isinstance(handle, AccessHandle):
+                entries[position] = entry
+                continue
+        call_key = name, tuple(args), frozenset(kwargs.items())
+        if isinstance(handle, CachedAccessHandle):
+            entry = entry[0], _store_cached_call(handle, call_key, *entry)
+        entries[position] = handle._results[call_key] = entry
+
+
 class _EvaluatorProcess(object):
+    is_crashed = False
+
     def __init__(self, evaluator):
         self._evaluator_weakref = weakref.ref(evaluator)
         self._evaluator_id = id(evaluator)
@@ -79,25 +262,92 @@ class EvaluatorSubprocess(_EvaluatorProcess):
         super(EvaluatorSubprocess, self).__init__(evaluator)
         self._used = False
         self._compiled_subprocess = compiled_subprocess
+        self._cached_handles = {}
+        compiled_subprocess.evaluator_count += 1
 
-    def __getattr__(self, name):
-        func = _get_function(name)
-
-        def wrapper(*args, **kwargs):
-            self._used = True
+    @property
+    def is_crashed(self):
+        """
+        All the access handles of a crashed subprocess are gone, the evaluator
+        cannot be used anymore. New evaluators get a new subprocess.
+        """
+        return self._compiled_subprocess._crashed
 
-            result = self._compiled_subprocess.run(
-                self._evaluator_weakref(),
-                func,
-                args=args,
-                kwargs=kwargs,
-            )
-            # IMO it should be possible to create a hook in pickle.load to
-            # mess with the loaded objects. However it's extremely complicated
-            # to work around this so just do it with this call. ~ dave
-            return self._convert_access_handles(result)
+    def __getattr__(self, name):
+        return partial(self._run, _get_function(name))
+
+    def _run(self, function, *args, **kwargs):
+        self._used = True
+        _load_cached_handles(args)
+        _load_cached_handles(kwargs)
+
+        result = self._compiled_subprocess.run(
+            self._evaluator_weakref(),
+            function,
+            args=args,
+            kwargs=kwargs,
+        )
+        # IMO it should be possible to create a hook in pickle.load to
+        # mess with the loaded objects. However it's extremely complicated
+        # to work around this so just do it with this call. ~ dave
+        return self._convert_access_handles(result)
+
+    def load_module(self, path=None, name=None, sys_path=None):
+        if not settings.compiled_introspection_cache:
+            return self._run(functions.load_module,
+                             path=path, name=name, sys_path=sys_path)
+
+        evaluator = self._evaluator_weakref()
+        if sys_path is None:
+            sys_path = list(evaluator.get_sys_path())
+        module_cache = cache.get_module_cache(
+            evaluator.environment, sys_path, path=path, name=name
+        )
+        if module_cache is None:
+            return self._run(functions.load_module,
+                             path=path, name=name, sys_path=sys_path)
+        return _CachedRoot(
+            self, module_cache, functions.load_module,
+            dict(path=path, name=name, sys_path=sys_path)
+        ).get_result()
+
+    def get_special_object(self, identifier):
+        if not settings.compiled_introspection_cache:
+            return self._run(functions.get_special_object, identifier)
+
+        special_cache = cache.get_special_object_cache(
+            self._evaluator_weakref().environment, identifier
+        )
+        return _CachedRoot(
+            self, special_cache, functions.get_special_object,
+            dict(identifier=identifier)
+        ).get_result()
 
-        return wrapper
+    def get_cached_handle(self, parent, call_key, index, handle=None):
+        """
+        Returns the cached access handle at position ``index`` in the result
+        of ``call_key`` on ``parent``. ``handle`` is the access handle of the
+        subprocess if the call was actually made.
+        """
+        key = parent._key, call_key, index
+        try:
+            cached_handle = self._cached_handles[key]
+        except KeyError:
+            pass
+        else:
+            if handle is not None and cached_handle._id is None:
+                cached_handle._id = handle.id
+            return cached_handle
+
+        # Even if the object is already known under a different key, a new
+        # handle is needed, otherwise a new process that only knows this key
+        # wouldn't find the results.
+        id_ = None if handle is None else handle.id
+        cached_handle = CachedAccessHandle(self, parent, call_key, index, id_)
+        if id_ is not None and not isinstance(handle, CachedAccessHandle):
+            self.set_access_handle(cached_handle)
+        self._cached_handles[key] = cached_handle
+        return cached_handle
 
     def _convert_access_handles(self, obj):
         if isinstance(obj, SignatureParam):
@@ -118,6 +368,7 @@ class EvaluatorSubprocess(_EvaluatorProcess):
         return obj
 
     def __del__(self):
+        self._compiled_subprocess.evaluator_count -= 1
         if self._used:
             self._compiled_subprocess.delete_evaluator(self._evaluator_id)
 
@@ -125,9 +376,15 @@ class EvaluatorSubprocess(_EvaluatorProcess):
 class _CompiledSubprocess(object):
     _crashed = False
 
-    def __init__(self, executable):
+    def __init__(self, executable, index=0):
         self._executable = executable
+        self._key = executable, index
+        # The number of evaluators that use this subprocess, new evaluators go
+        # to the least busy subprocess of the pool.
+        self.evaluator_count = 0
         self._evaluator_deletion_queue = queue.deque()
+        # Evaluators in different threads might share this subprocess.
+        self._lock = threading.Lock()
 
     @property
     @memoize_method
@@ -163,7 +420,7 @@ class _CompiledSubprocess(object):
     def kill(self):
         self._crashed = True
         try:
-            subprocess = _subprocesses[self._executable]
+            subprocess = _subprocesses[self._key]
         except KeyError:
             # Fine it was already removed from the cache.
             pass
@@ -171,20 +428,31 @@ class _CompiledSubprocess(object):
             # In the `!=` case there is already a new subprocess in place
             # and we don't need to do anything here anymore.
             if subprocess == self:
-                del _subprocesses[self._executable]
+                del _subprocesses[self._key]
 
         self._process.kill()
         self._process.wait()
 
     def _send(self, evaluator_id, function, args=(), kwargs={}):
-        if self._crashed:
-            raise InternalError("The subprocess %s has crashed." % self._executable)
-
         if not is_py3:
             # Python 2 compatibility
             kwargs = {force_unicode(key): value for key, value in kwargs.items()}
 
-        data = evaluator_id, function, args, kwargs
+        with self._lock:
+            is_exception, traceback, result = \
+                self._send_and_receive((evaluator_id, function, args, kwargs))
+
+        if is_exception:
+            # Replace the attribute error message with a the traceback. It's
+            # way more informative.
+            result.args = (traceback,)
+            raise result
+        return result
+
+    def _send_and_receive(self, data):
+        if self._crashed:
+            raise InternalError("The subprocess %s has crashed." % self._executable)
+
         try:
             pickle_dump(data, self._process.stdin)
         except (socket.error, IOError) as e:
@@ -199,18 +467,11 @@ class _CompiledSubprocess(object):
                                 % self._executable)
 
         try:
-            is_exception, traceback, result = pickle_load(self._process.stdout)
+            return pickle_load(self._process.stdout)
         except EOFError:
             self.kill()
             raise InternalError("The subprocess %s has crashed." % self._executable)
 
-        if is_exception:
-            # Replace the attribute error message with a the traceback. It's
-            # way more informative.
-            result.args = (traceback,)
-            raise result
-        return result
-
     def delete_evaluator(self, evaluator_id):
         """
         Currently we are not deleting evalutors instantly. They only get
@@ -296,6 +557,7 @@ class AccessHandle(object):
         self.access = access
         self._subprocess = subprocess
         self.id = id_
+        self._results = {}
 
     def add_subprocess(self, subprocess):
         self._subprocess = subprocess
@@ -312,6 +574,7 @@ class AccessHandle(object):
 
     def __setstate__(self, state):
         self.id = state
+        self._results = {}
 
     def __getattr__(self, name):
         if name in ('id', 'access') or name.startswith('_'):
@@ -331,10 +594,119 @@ class AccessHandle(object):
             return self._subprocess.get_compiled_method_return(self.id, name, *args, **kwargs)
         return self._cached_results(name, *args, **kwargs)
 
-    @memoize_method
     def _cached_results(self, name, *args, **kwargs):
-        #if type(self._subprocess) == EvaluatorSubprocess:
-            #print(name, args, kwargs,
-                #self._subprocess.get_compiled_method_return(self.id, name, *args, **kwargs)
-            #)
-        return self._subprocess.get_compiled_method_return(self.id, name, *args, **kwargs)
+        key = name, args, frozenset(kwargs.items())
+        try:
+            is_exception, result = self._results[key]
+        except KeyError:
+            result = self._subprocess.get_compiled_method_return(self.id, name, *args, **kwargs)
+            self._results[key] = False, result
+            return result
+        if is_exception:
+            raise result
+        return result
+
+    def prefetch_attributes(self, names):
+        """
+        Fetches the accesses of all the attributes in ``names`` and the results
+        of the methods that are used for completions on them with one call to
+        the subprocess. The results are cached in the handles.
+        """
+        calls = []
+        for name in names:
+            position = len(calls)
+            calls.append((self, 'getattr', (name,), {'default': None}))
+            calls += [(position, method, (), {}) for method in _PREFETCHED_METHODS]
+        call_batch(calls)
+
+
+class CachedAccessHandle(AccessHandle):
+    """
+    An access handle whose results are stored in the introspection cache. It
+    is identified by the call that returned it, so it can be created from the
+    cache without the object existing in the subprocess. The object is only
+    loaded (by repeating the call) once a result is not in the cache.
+    """
+    def __init__(self, subprocess, parent, call_key, index, id_=None):
+        self._subprocess = subprocess
+        self._parent = parent
+        self._call_key = call_key
+        self._index = index
+        self._key = parent._key, call_key, index
+        self._cache = parent._cache
+        self._id = id_
+        self._results = {}
+
+    @property
+    def id(self):
+        if self._id is None:
+            handles = []
+            _encode_handles(self._parent._call_remote(self._call_key), handles)
+            try:
+                self._id = handles[self._index].id
+            except IndexError:
+                raise InternalError("The introspection cache of %s is outdated."
+                                    % (self._cache.identifier,))
+            if self._id not in self._subprocess._handles:
+                self._subprocess.set_access_handle(self)
+        return self._id
+
+    @id.setter
+    def id(self, value):
+        # Only used when unpickling in the subprocess.
+        self._id = value
+
+    def __repr__(self):
+        return '<%s of %s>' % (self.__class__.__name__, self._key)
+
+    def _call_remote(self, call_key):
+        name, args, kwargs = call_key
+        return self._subprocess.get_compiled_method_return(
+            self.id, name, *args, **dict(kwargs)
+        )
+
+    def _cached_results(self, name, *args, **kwargs):
+        call_key = name, args, frozenset(kwargs.items())
+        try:
+            is_exception, result = self._results[call_key]
+        except KeyError:
+            entry = _load_cached_call(self, call_key)
+            if entry is None:
+                try:
+                    result = self._call_remote(call_key)
+                except InternalError:
+                    raise
+                except Exception as e:
+                    # Exceptions like AttributeErrors are results as well.
+                    is_exception, result = True, e
+                else:
+                    is_exception = False
+                result = _store_cached_call(self, call_key, is_exception, result)
+                entry = is_exception, result
+            is_exception, result = self._results[call_key] = entry
+        if is_exception:
+            raise result
+        return result
+
+
+class _CachedRoot(object):
+    """
+    The call that loads a module or special object in the subprocess, all the
+    cached access handles of an introspection cache are found from it.
+    """
+    def __init__(self, subprocess, introspection_cache, function, kwargs):
+        self._subprocess = subprocess
+        self._cache = introspection_cache
+        self._key = introspection_cache.identifier
+        self._function = function
+        self._kwargs = kwargs
+
+    def _call_remote(self, call_key):
+        return self._subprocess._run(self._function, **self._kwargs)
+
+    def get_result(self):
+        call_key = self._function.__name__, (), frozenset()
+        entry = _load_cached_call(self, call_key)
+        if entry is not None:
+            return entry[1]
+        return _store_cached_call(self, call_key, False, self._call_remote(call_key))
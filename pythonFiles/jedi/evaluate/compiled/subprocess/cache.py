@@ -0,0 +1,137 @@
+"""
+Stores the results of inspecting compiled modules on disk, so that a new
+process can answer questions about e.g. ``builtins`` or ``_socket`` without
+importing them again.
+
+There's one file per module. It's keyed by the hash of the executable of the
+environment, the name of the module and for modules that are files (``.so``
+and ``.pyd``) by the modification time and the size of that file. The
+contents are a dict of ``(handle_key, call_key) -> (is_exception, result)``,
+where access handles in the result are replaced by their position in the
+result (see ``HandleReference``).
+"""
+import os
+import pickle
+
+from jedi import settings
+from jedi import debug
+from jedi.evaluate.utils import dotted_from_fs_path
+
+_VERSION = 1
+
+_caches = {}
+
+
+class HandleReference(object):
+    """
+    Stands for the access handle with the position ``index`` in a result.
+    """
+    def __init__(self, index):
+        self.index = index
+
+    def __getstate__(self):
+        return self.index
+
+    def __setstate__(self, state):
+        self.index = state
+
+
+class IntrospectionCache(object):
+    def __init__(self, identifier, path):
+        self.identifier = identifier
+        self._path = path
+        self._results = None
+        self._changed = False
+
+    def _get_results(self):
+        if self._results is None:
+            self._results = {}
+            try:
+                with open(self._path, 'rb') as f:
+                    version, results = pickle.load(f)
+            except IOError:
+                pass
+            except Exception:
+                # Written by another version of Python or Jedi or just
+                # broken, it's rewritten on the next save.
+                debug.warning('Ignoring the introspection cache %s', self._path)
+            else:
+                if version == _VERSION:
+                    self._results = results
+        return self._results
+
+    def get(self, key):
+        return self._get_results().get(key)
+
+    def set(self, key, value):
+        self._get_results()[key] = value
+        self._changed = True
+
+    def save(self):
+        if not self._changed:
+            return
+        self._changed = False
+
+        directory = os.path.dirname(self._path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        # Write to a temporary file first, other processes might be loading it.
+        tmp_path = '%s.%s.tmp' % (self._path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            pickle.dump((_VERSION, dict(self._results)), f, pickle.HIGHEST_PROTOCOL)
+        try:
+            os.rename(tmp_path, self._path)
+        except OSError:
+            # Windows doesn't overwrite, another process was faster.
+            os.remove(tmp_path)
+
+
+def get_module_cache(environment, sys_path, path=None, name=None):
+    """
+    Returns the cache for the arguments of ``load_module`` or None if the
+    module cannot be identified.
+    """
+    if path is None:
+        dotted_name = name
+        file_name = name
+    else:
+        dotted_name = dotted_from_fs_path(path, sys_path)
+        if not dotted_name:
+            return None
+        file_name = dotted_name
+        if os.path.isabs(path):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            file_name = '%s-%s-%s' % (dotted_name, stat.st_mtime, stat.st_size)
+    if dotted_name is None:
+        return None
+    return _get_cache(environment, ('load_module', dotted_name), file_name)
+
+
+def get_special_object_cache(environment, identifier):
+    return _get_cache(environment, ('get_special_object', identifier),
+                      '__special__-' + identifier)
+
+
+def _get_cache(environment, identifier, file_name):
+    path = os.path.join(
+        settings.cache_directory,
+        'introspection',
+        environment._sha256,
+        file_name + '.pickle'
+    )
+    try:
+        return _caches[path]
+    except KeyError:
+        cache = _caches[path] = IntrospectionCache(identifier, path)
+        return cache
+
+
+def save_caches():
+    for cache in list(_caches.values()):
+        try:
+            cache.save()
+        except (IOError, OSError):
+            debug.warning('Cannot save the introspection cache %s', cache.identifier)
@@ -20,6 +20,47 @@ def get_compiled_method_return(evaluator, id, attribute, *args, **kwargs):
     return getattr(handle.access, attribute)(*args, **kwargs)
 
 
+class CallResult(object):
+    """
+    Stands for the access handle that the call at position ``index`` of a
+    batch returns, see ``call_batch``.
+    """
+    def __init__(self, index):
+        self.index = index
+
+    def __getstate__(self):
+        return self.index
+
+    def __setstate__(self, state):
+        self.index = state
+
+
+def call_batch(evaluator, calls):
+    """
+    Calls access methods for all the ``(id, attribute, args, kwargs)`` tuples
+    in ``calls`` and returns their results as ``(is_exception, result)``. The
+    id can also be a ``CallResult`` of an earlier call in the batch.
+    """
+    results = []
+    for id, attribute, args, kwargs in calls:
+        try:
+            if isinstance(id, CallResult):
+                is_exception, handle = results[id.index]
+                if is_exception:
+                    raise handle
+            else:
+                handle = evaluator.compiled_subprocess.get_access_handle(id)
+            result = getattr(handle.access, attribute)(*args, **kwargs)
+        except Exception as e:
+            if type(e).__module__ not in ('builtins', 'exceptions'):
+                # Other exceptions might not be picklable.
+                e = Exception('%s: %s' % (type(e).__name__, e))
+            results.append((True, e))
+        else:
+            results.append((False, result))
+    return results
+
+
 def get_special_object(evaluator, identifier):
     return access.get_special_object(evaluator, identifier)
 
@@ -47,6 +47,7 @@ class ModuleContext(TreeContext):
         self.tree_node = module_node
         self._path = path
         self.code_lines = code_lines
+        evaluator.register_module(module_node, path)
 
     def get_filters(self, search_global, until_position=None, origin_scope=None):
         yield MergedFilter(
@@ -25,6 +25,7 @@ from jedi.evaluate import sys_path
 from jedi.evaluate import helpers
 from jedi.evaluate import compiled
 from jedi.evaluate import analysis
+from jedi.evaluate import symbol_index
 from jedi.evaluate.utils import unite, dotted_from_fs_path
 from jedi.evaluate.cache import evaluator_method_cache
 from jedi.evaluate.filters import AbstractNameDefinition
@@ -50,6 +51,21 @@ class ModuleCache(object):
     def get_from_path(self, path):
         return self._path_cache[path]
 
+    def iterate_paths(self):
+        return list(self._path_cache.keys())
+
+    def remove_path(self, path):
+        """
+        Removes the module at ``path`` (and all the names it was cached under)
+        and returns it. Returns None if there is no such module.
+        """
+        module = self._path_cache.pop(path, None)
+        if module is not None:
+            for name, m in list(self._name_cache.items()):
+                if m is module:
+                    del self._name_cache[name]
+        return module
+
 
 # This memoization is needed, because otherwise we will infinitely loop on
 # certain imports.
@@ -517,9 +533,10 @@ def add_module_to_cache(evaluator, module_name, module, safe=False):
     evaluator.module_cache.add(module, module_name)
 
 
-def get_modules_containing_name(evaluator, modules, name):
+def get_modules_containing_name(evaluator, modules, name, search_project=False):
     """
-    Search a name in the directories of modules.
+    Search a name in the directories of modules. With ``search_project`` the
+    files of the project that are in the symbol index are searched as well.
     """
     def check_directories(paths):
         for p in paths:
@@ -563,6 +580,15 @@ def get_modules_containing_name(evaluator, modules, name):
     paths = (additional | set(check_directories(used_mod_paths))) \
             - used_mod_paths
 
+    if settings.symbol_index and evaluator.project is not None:
+        index = symbol_index.get_symbol_index(evaluator.project._path)
+        if search_project:
+            index.refresh_project()
+            paths |= index.get_paths(name) - used_mod_paths
+        # Only the files that contain the name need to be read.
+        index.refresh(paths)
+        paths = set(p for p in paths if index.contains(p, name))
+
     # Sort here to make issues less random.
     for p in sorted(paths):
         # make testing easier, sort it - same results on every interpreter
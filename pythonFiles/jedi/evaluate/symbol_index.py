@@ -0,0 +1,253 @@
+"""
+An index of the identifiers that appear in the Python files of a project.
+Searching for the usages of a name (or for calls of a function, see
+:mod:`jedi.evaluate.dynamic`) only needs to parse the files that contain it.
+
+Files are indexed by their modification time and size, a file is only read
+again once one of them changes. The index is stored in the
+:attr:`jedi.settings.cache_directory` per project. The file starts with the
+version, followed by ``(path, entry)`` records. Saving appends the entries
+that changed (``None`` for removed files), the file is only rewritten once
+most of its records are outdated.
+
+The index doesn't know anything about the grammar, everything that looks like
+an identifier (also in strings and comments) is indexed. The files that are
+found are parsed anyway.
+"""
+import os
+import re
+import time
+import hashlib
+import pickle
+import threading
+from io import BytesIO
+
+from parso import python_bytes_to_unicode
+
+from jedi import settings
+from jedi import debug
+
+_VERSION = 2
+
+_identifier_re = re.compile(r'(?!\d)\w+', re.UNICODE)
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+_skipped_directories = ('__pycache__', 'node_modules')
+
+
+def _walk(directory):
+    """
+    Yields the Python files in ``directory``, without hidden directories and
+    virtualenvs.
+    """
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = [
+            d for d in dirs
+            if not d.startswith('.') and d not in _skipped_directories
+            and not os.path.exists(os.path.join(root, d, 'pyvenv.cfg'))
+        ]
+        for file_name in files:
+            if file_name.endswith('.py'):
+                yield os.path.join(root, file_name)
+
+
+class SymbolIndex(object):
+    def __init__(self, root, cache_path):
+        self.root = root
+        self._cache_path = cache_path
+        self._lock = threading.RLock()
+        # path -> entry or None, the changes since the last save
+        self._changes = {}
+        # The number of records in the file or None if it has to be rewritten.
+        self._records = None
+        self._walked = None
+        # path -> (mtime, size, names)
+        self._files = {}
+        # name -> set of paths
+        self._paths = {}
+        self._load()
+
+    def _load(self):
+        try:
+            f = open(self._cache_path, 'rb')
+        except IOError:
+            return
+        with f:
+            try:
+                version = pickle.load(f)
+            except Exception:
+                version = None
+            if version != _VERSION:
+                debug.warning('Ignoring the symbol index %s', self._cache_path)
+                return
+            records = 0
+            while True:
+                try:
+                    path, entry = pickle.load(f)
+                except EOFError:
+                    break
+                except Exception:
+                    # An interrupted save, the files are indexed again.
+                    debug.warning('Ignoring the end of the symbol index %s',
+                                  self._cache_path)
+                    return
+                records += 1
+                self._remove(path)
+                if entry is not None:
+                    self._add(path, entry)
+        self._records = records
+
+    def _add(self, path, entry):
+        self._files[path] = entry
+        for name in entry[2]:
+            self._paths.setdefault(name, set()).add(path)
+
+    def _remove(self, path):
+        try:
+            entry = self._files.pop(path)
+        except KeyError:
+            return
+        for name in entry[2]:
+            paths = self._paths[name]
+            paths.discard(path)
+            if not paths:
+                del self._paths[name]
+
+    def _set(self, path, stat, code):
+        names = frozenset(_identifier_re.findall(code))
+        entry = stat.st_mtime, stat.st_size, names
+        with self._lock:
+            self._remove(path)
+            self._add(path, entry)
+            self._changes[path] = entry
+
+    def refresh(self, paths, save=True):
+        """
+        Indexes the files in ``paths`` that are new or have changed and
+        forgets the ones that don't exist anymore. With ``save`` the changes
+        are written to disk.
+        """
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                with self._lock:
+                    if path in self._files:
+                        self._remove(path)
+                        self._changes[path] = None
+                continue
+
+            entry = self._files.get(path)
+            if entry is not None and entry[:2] == (stat.st_mtime, stat.st_size):
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    code = python_bytes_to_unicode(f.read(), errors='replace')
+            except IOError:
+                continue
+            self._set(path, stat, code)
+        if save:
+            self.save()
+
+    def refresh_project(self):
+        """
+        Indexes the Python files of the project that are new or have changed
+        and forgets the ones that were removed. The project is only walked
+        again after :attr:`jedi.settings.symbol_index_validity`.
+        """
+        now = time.time()
+        if self._walked is not None \
+                and now - self._walked < settings.symbol_index_validity:
+            return
+        self._walked = now
+        paths = set(_walk(self.root))
+        prefix = os.path.join(self.root, '')
+        with self._lock:
+            # Files that were removed.
+            paths.update(p for p in self._files if p.startswith(prefix))
+        self.refresh(paths)
+
+    def update_source(self, path, code):
+        """
+        Indexes the (maybe unsaved) ``code`` of a file. It is read again once
+        the file on disk changes.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return
+        self._set(path, stat, code)
+
+    def contains(self, path, name):
+        entry = self._files.get(path)
+        return entry is not None and name in entry[2]
+
+    def get_paths(self, name):
+        """
+        Returns the indexed files that contain ``name``. They might have
+        changed since, see :meth:`refresh`.
+        """
+        with self._lock:
+            return set(self._paths.get(name, ()))
+
+    def save(self):
+        """
+        Writes the changes since the last save to disk.
+        """
+        with self._lock:
+            if not self._changes:
+                return
+            rewrite = self._records is None \
+                or self._records + len(self._changes) > 2 * len(self._files) + 100 \
+                or not os.path.exists(self._cache_path)
+            records = self._files if rewrite else self._changes
+            data = BytesIO()
+            if rewrite:
+                pickle.dump(_VERSION, data, pickle.HIGHEST_PROTOCOL)
+            for record in records.items():
+                pickle.dump(record, data, pickle.HIGHEST_PROTOCOL)
+            try:
+                if rewrite:
+                    self._rewrite(data.getvalue())
+                    self._records = len(records)
+                else:
+                    with open(self._cache_path, 'ab') as f:
+                        f.write(data.getvalue())
+                    self._records += len(records)
+            except (IOError, OSError):
+                # Everything is written on the next save.
+                self._records = None
+                debug.warning('Cannot save the symbol index %s', self._cache_path)
+            self._changes = {}
+
+    def _rewrite(self, data):
+        directory = os.path.dirname(self._cache_path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+        tmp_path = '%s.%s.tmp' % (self._cache_path, os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        try:
+            os.rename(tmp_path, self._cache_path)
+        except OSError:
+            # Windows doesn't overwrite, another process was faster.
+            os.remove(tmp_path)
+
+def get_symbol_index(root):
+    """
+    Returns the index of the project in the directory ``root``.
+    """
+    root = os.path.abspath(root)
+    with _indexes_lock:
+        try:
+            return _indexes[root]
+        except KeyError:
+            pass
+        hashed = hashlib.sha256(root.encode('utf-8')).hexdigest()
+        cache_path = os.path.join(
+            settings.cache_directory, 'symbol-index', hashed + '.pickle'
+        )
+        index = _indexes[root] = SymbolIndex(root, cache_path)
+        return index
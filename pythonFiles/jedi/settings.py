@@ -25,6 +25,7 @@ Filesystem cache
 
 .. autodata:: cache_directory
 .. autodata:: use_filesystem_cache
+.. autodata:: symbol_index
 
 
 Parser
@@ -43,10 +44,18 @@ Dynamic stuff
 .. autodata:: auto_import_modules
 
 
+Compiled modules
+~~~~~~~~~~~~~~~~
+
+.. autodata:: compiled_introspection_cache
+.. autodata:: compiled_subprocess_pool_size
+
+
 Caching
 ~~~~~~~
 
 .. autodata:: call_signatures_validity
+.. autodata:: symbol_index_validity
 
 
 """
@@ -83,6 +92,14 @@ use_filesystem_cache = True
 Use filesystem cache to save once parsed files with pickle.
 """
 
+symbol_index = False
+"""
+Keep an index of the names in the files of a project in
+:attr:`cache_directory`. Searching for usages then only reads the files that
+contain the name and also finds usages in the other files of the project, not
+just in the directories of the modules that are involved.
+"""
+
 if platform.system().lower() == 'windows':
     _cache_directory = os.path.join(os.getenv('APPDATA') or '~', 'Jedi',
                                     'Jedi')
@@ -152,6 +169,28 @@ This improves autocompletion for libraries that use ``setattr`` or
 ``globals()`` modifications a lot.
 """
 
+# ----------------
+# compiled modules
+# ----------------
+
+compiled_introspection_cache = False
+"""
+Store what is found out about compiled modules (e.g. ``builtins`` or
+``_socket``) in :attr:`cache_directory`. A new process then doesn't have to
+import and inspect them again. The cache of a module is invalidated when its
+file changes. What was found out is written to disk by
+``jedi.evaluate.compiled.subprocess.cache.save_caches()``, e.g. after every
+request of an editor.
+"""
+
+compiled_subprocess_pool_size = 1
+"""
+The number of subprocesses per environment that compiled modules are analyzed
+in. A new evaluator uses the subprocess that the fewest evaluators use, so
+evaluators in different threads don't have to wait for each other. A
+subprocess that crashes is replaced by a new one for the next evaluator.
+"""
+
 # ----------------
 # caching validity (time)
 # ----------------
@@ -161,3 +200,9 @@ call_signatures_validity = 3.0
 Finding function calls might be slow (0.1-0.5s). This is not acceptible for
 normal writing. Therefore cache it for a short time.
 """
+
+symbol_index_validity = 60.0
+"""
+The :attr:`symbol_index` finds new and removed files of a project by walking
+it, at most once in this many seconds.
+"""
@@ -2,6 +2,8 @@ import time
 import os
 import sys
 import hashlib
+import array
+import struct
 import gc
 import shutil
 import platform
@@ -12,13 +14,18 @@ try:
     import cPickle as pickle
 except:
     import pickle
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+from collections import OrderedDict
 
 from parso._compatibility import FileNotFoundError
 
 LOG = logging.getLogger(__name__)
 
 
-_PICKLE_VERSION = 30
+_PICKLE_VERSION = 31
 """
 Version number (integer) for file system cache.
 
@@ -45,6 +52,24 @@ we generate something similar.  See:
 http://docs.python.org/3/library/sys.html#sys.implementation
 """
 
+_TREE_FORMAT_VERSION = 1
+"""
+Version number (integer) of the compact tree format used by the content
+addressed cache, see :py:data:`content_addressed_cache`.
+"""
+
+_TREE_MAGIC = b'parso-tree'
+_TREE_HEADER = struct.Struct('<10sIIIII')
+
+content_addressed_cache = False
+"""
+If enabled, the file system cache is keyed by the sha256 of the source code
+instead of the path of the file and stored in a compact array based format
+instead of pickled trees. Identical files (e.g. after switching branches or in
+different virtualenvs) share one cache file.
+"""
+
+
 def _get_default_cache_path():
     if platform.system().lower() == 'windows':
         dir_ = os.path.join(os.getenv('LOCALAPPDATA') or '~', 'Parso', 'Parso')
@@ -64,16 +89,374 @@ On Linux, if environment variable ``$XDG_CACHE_HOME`` is set,
 ``$XDG_CACHE_HOME/parso`` is used instead of the default one.
 """
 
-parser_cache = {}
+
+class _ModuleCache(MutableMapping):
+    """
+    The modules of one grammar in :py:data:`parser_cache`, a mapping of paths
+    to cache items. Every module is also in ``_lru``.
+    """
+    def __init__(self, hashed_grammar):
+        self._hashed_grammar = hashed_grammar
+        self._items = {}
+
+    def __getitem__(self, path):
+        return self._items[path]
+
+    def __setitem__(self, path, module_cache_item):
+        global _node_total
+        if path in self._items:
+            del self[path]
+        if getattr(module_cache_item, 'node_count', None) is None:
+            module_cache_item.node_count = _count_nodes(module_cache_item.node)
+        self._items[path] = module_cache_item
+        _lru[self._hashed_grammar, path] = module_cache_item.node_count
+        _node_total += module_cache_item.node_count
+
+    def __delitem__(self, path):
+        global _node_total
+        del self._items[path]
+        _node_total -= _lru.pop((self._hashed_grammar, path))
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _ParserCache(dict):
+    """
+    A dict of hashed grammars to the :py:class:`_ModuleCache` of their
+    modules. Removing them keeps ``_lru`` up to date.
+    """
+    def __setitem__(self, hashed_grammar, modules):
+        if hashed_grammar in self:
+            del self[hashed_grammar]
+        module_cache = _ModuleCache(hashed_grammar)
+        dict.__setitem__(self, hashed_grammar, module_cache)
+        module_cache.update(modules)
+
+    def setdefault(self, hashed_grammar, default=None):
+        try:
+            return self[hashed_grammar]
+        except KeyError:
+            self[hashed_grammar] = default or {}
+            return self[hashed_grammar]
+
+    def __delitem__(self, hashed_grammar):
+        self[hashed_grammar].clear()
+        dict.__delitem__(self, hashed_grammar)
+
+    def pop(self, hashed_grammar, *default):
+        if hashed_grammar in self:
+            self[hashed_grammar].clear()
+        return dict.pop(self, hashed_grammar, *default)
+
+    def clear(self):
+        for module_cache in self.values():
+            module_cache.clear()
+        dict.clear(self)
+
+
+_lru = OrderedDict()
+"""
+``(hashed_grammar, path) -> node count`` of all the modules in
+:py:data:`parser_cache`, the least recently used first.
+"""
+
+_node_total = 0
+
+parser_cache = _ParserCache()
+
+cache_max_modules = 1500
+"""
+The maximum number of modules kept in :py:data:`parser_cache`. The least
+recently used modules are evicted first. ``None`` means no limit.
+"""
+
+cache_max_nodes = 4000000
+"""
+The maximum number of tree nodes (an approximation of the memory used) kept in
+:py:data:`parser_cache` over all modules. ``None`` means no limit. The nodes
+of a module are counted once when it's parsed or loaded, after diff parsing
+the count is scaled by the change in the number of lines.
+"""
+
+_EVICTION_RATIO = 0.9
+"""
+When a limit is hit, modules are evicted until the cache is below this
+fraction of the limit, so that evictions don't happen on every save.
+"""
+
+_statistics = dict(hits=0, misses=0, evictions=0, evicted_nodes=0)
 
 
 class _NodeCacheItem(object):
-    def __init__(self, node, lines, change_time=None):
+    def __init__(self, node, lines, change_time=None, node_count=None):
         self.node = node
         self.lines = lines
         if change_time is None:
             change_time = time.time()
         self.change_time = change_time
+        self.node_count = node_count
+
+
+def _count_nodes(node):
+    count = 0
+    todo = [node]
+    while todo:
+        node = todo.pop()
+        count += 1
+        children = getattr(node, 'children', None)
+        if children:
+            todo += children
+    return count
+
+
+def touch_module(hashed_grammar, path):
+    """
+    Marks a module in :py:data:`parser_cache` as recently used.
+    """
+    try:
+        _lru[hashed_grammar, path] = _lru.pop((hashed_grammar, path))
+    except KeyError:
+        pass
+
+
+def _set_cache_item(hashed_grammar, path, module_cache_item):
+    parser_cache.setdefault(hashed_grammar)[path] = module_cache_item
+    _evict_least_recently_used()
+
+
+def _evict_least_recently_used():
+    if (cache_max_modules is None or len(_lru) <= cache_max_modules) \
+            and (cache_max_nodes is None or _node_total <= cache_max_nodes):
+        return
+
+    max_modules = len(_lru) if cache_max_modules is None \
+        else int(cache_max_modules * _EVICTION_RATIO)
+    max_nodes = _node_total if cache_max_nodes is None \
+        else int(cache_max_nodes * _EVICTION_RATIO)
+    # Never evict the module that was just saved.
+    while len(_lru) > 1 and (len(_lru) > max_modules or _node_total > max_nodes):
+        hashed_grammar, path = next(iter(_lru))
+        nodes = _lru[hashed_grammar, path]
+        del parser_cache[hashed_grammar][path]
+        _statistics['evictions'] += 1
+        _statistics['evicted_nodes'] += nodes
+    LOG.debug('parser cache evicted down to %s modules, %s nodes',
+              len(_lru), _node_total)
+
+
+def get_cache_statistics():
+    """
+    Returns a dict with the current size of :py:data:`parser_cache` (modules
+    and nodes) and the hits, misses and evictions since the process started.
+    """
+    statistics = dict(_statistics)
+    statistics['modules'] = len(_lru)
+    statistics['nodes'] = _node_total
+    return statistics
+
+
+def _array_to_bytes(arr):
+    try:
+        return arr.tobytes()
+    except AttributeError:
+        # Python 2
+        return arr.tostring()
+
+
+def _array_from_bytes(typecode, data):
+    arr = array.array(typecode)
+    try:
+        arr.frombytes(data)
+    except AttributeError:
+        # Python 2
+        arr.fromstring(data)
+    return arr
+
+
+def _serialize_tree(module, code):
+    """
+    Flattens a tree into a table of node kinds (class and type) and arrays of
+    integers: the kind of every node/leaf in pre-order, the number of children
+    of every node and the prefix length, value length and position of every
+    leaf. The code itself is not stored, it is the key of the cache.
+
+    Returns None if the leaves don't add up to the code.
+    """
+    descriptors = {}
+    kinds = array.array('i')
+    child_counts = array.array('i')
+    leaves = array.array('i')
+    stack = [module]
+    while stack:
+        node = stack.pop()
+        key = type(node), getattr(node, 'original_type', node.type)
+        kinds.append(descriptors.setdefault(key, len(descriptors)))
+        try:
+            children = node.children
+        except AttributeError:
+            leaves.extend((len(node.prefix), len(node.value), node.line, node.column))
+        else:
+            child_counts.append(len(children))
+            stack.extend(reversed(children))
+
+    if sum(leaves[0::4]) + sum(leaves[1::4]) != len(code):
+        return None
+
+    table = sorted(descriptors.items(), key=lambda item: item[1])
+    descriptor_text = '\n'.join(
+        '%s %s %s' % (cls.__module__, cls.__name__, type_)
+        for (cls, type_), _ in table
+    ).encode('utf-8')
+    header = _TREE_HEADER.pack(
+        _TREE_MAGIC, _TREE_FORMAT_VERSION, len(descriptor_text),
+        len(kinds), len(child_counts), len(leaves)
+    )
+    return b''.join([
+        header,
+        descriptor_text,
+        _array_to_bytes(kinds),
+        _array_to_bytes(child_counts),
+        _array_to_bytes(leaves),
+    ])
+
+
+def _get_slot_names(cls):
+    return set(name for c in cls.__mro__ for name in getattr(c, '__slots__', ()))
+
+
+def _load_descriptor(line):
+    from parso import tree
+    from parso.python import tree as python_tree
+    from parso.tree import NodeOrLeaf, ErrorLeaf
+
+    # Only the modules of the tree classes, nothing else is imported or
+    # looked up because a cache file says so.
+    tree_modules = {'parso.tree': tree, 'parso.python.tree': python_tree}
+    module_name, class_name, type_ = line.split(' ')
+    try:
+        module = tree_modules[module_name]
+    except KeyError:
+        raise ValueError("%s is not a tree module" % module_name)
+    cls = getattr(module, class_name, None)
+    if not isinstance(cls, type) or not issubclass(cls, NodeOrLeaf) \
+            or cls.__module__ != module_name:
+        raise ValueError("%s.%s is not a tree class" % (module_name, class_name))
+    slots = _get_slot_names(cls)
+    is_leaf = 'value' in slots
+    if issubclass(cls, ErrorLeaf):
+        attributes = {'original_type': type_}
+    elif 'type' in slots:
+        attributes = {'type': type_}
+    else:
+        attributes = {}
+    # Slots that are not part of the tree structure (e.g. caches) are None.
+    known = set(['value', 'prefix', 'line', 'column', 'parent', 'children'])
+    for name in slots - known - set(attributes):
+        attributes[name] = None
+    return cls, is_leaf, list(attributes.items())
+
+
+def _deserialize_tree(data, code):
+    magic, version, descriptor_size, kind_count, node_count, leaf_size = \
+        _TREE_HEADER.unpack_from(data)
+    if magic != _TREE_MAGIC or version != _TREE_FORMAT_VERSION:
+        raise ValueError("Unknown tree format")
+
+    start = _TREE_HEADER.size
+    end = start + descriptor_size
+    descriptors = [
+        _load_descriptor(line)
+        for line in data[start:end].decode('utf-8').split('\n')
+    ]
+    int_size = array.array('i').itemsize
+    start, end = end, end + kind_count * int_size
+    kinds = _array_from_bytes('i', data[start:end])
+    start, end = end, end + node_count * int_size
+    child_counts = _array_from_bytes('i', data[start:end])
+    start, end = end, end + leaf_size * int_size
+    leaves = _array_from_bytes('i', data[start:end])
+
+    root = None
+    parents = []
+    missing_children = []
+    child_counts = iter(child_counts)
+    leaves = iter(leaves)
+    offset = 0
+    for kind in kinds:
+        cls, is_leaf, attributes = descriptors[kind]
+        element = cls.__new__(cls)
+        for name, value in attributes:
+            setattr(element, name, value)
+        if is_leaf:
+            value_start = offset + next(leaves)
+            element.prefix = code[offset:value_start]
+            offset = value_start + next(leaves)
+            element.value = code[value_start:offset]
+            element.line = next(leaves)
+            element.column = next(leaves)
+        else:
+            element.children = []
+
+        if parents:
+            element.parent = parents[-1]
+            parents[-1].children.append(element)
+            missing_children[-1] -= 1
+        else:
+            element.parent = None
+            root = element
+
+        if not is_leaf:
+            count = next(child_counts)
+            if count:
+                parents.append(element)
+                missing_children.append(count)
+                continue
+        while missing_children and not missing_children[-1]:
+            parents.pop()
+            missing_children.pop()
+
+    if offset != len(code):
+        raise ValueError("The tree doesn't match the code")
+    return root, len(kinds)
+
+
+def load_module_from_content(hashed_grammar, path, code, lines, cache_path=None):
+    """
+    Returns the module parsed from ``code`` if it's in the content addressed
+    cache, None otherwise.
+    """
+    cache_path = _get_content_hashed_path(hashed_grammar, code, cache_path=cache_path)
+    try:
+        with open(cache_path, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        _statistics['misses'] += 1
+        return None
+
+    try:
+        module, node_count = _deserialize_tree(data, code)
+    except Exception:
+        LOG.warning('Broken tree cache file: %s', cache_path, exc_info=True)
+        try:
+            os.remove(cache_path)
+        except OSError:
+            # Somebody else removed it already.
+            pass
+        return None
+
+    try:
+        p_time = None if path is None else os.path.getmtime(path)
+    except OSError:
+        p_time = None
+    _statistics['hits'] += 1
+    item = _NodeCacheItem(module, lines, p_time, node_count)
+    _set_cache_item(hashed_grammar, path, item)
+    LOG.debug('tree loaded: %s', path)
+    return module
 
 
 def load_module(hashed_grammar, path, cache_path=None):
@@ -88,11 +471,49 @@ def load_module(hashed_grammar, path, cache_path=None):
     try:
         module_cache_item = parser_cache[hashed_grammar][path]
         if p_time <= module_cache_item.change_time:
+            _statistics['hits'] += 1
+            touch_module(hashed_grammar, path)
             return module_cache_item.node
     except KeyError:
+        if content_addressed_cache:
+            # The code is needed to find the cached module, which is done by
+            # load_module_from_content.
+            return None
+        _statistics['misses'] += 1
         return _load_from_file_system(hashed_grammar, path, p_time, cache_path=cache_path)
 
 
+def is_module_cached(hashed_grammar, path, cache_path=None, code=None):
+    """
+    Returns whether the module of ``path`` is up to date in the memory or file
+    system cache, without loading it. The content addressed cache can only be
+    checked if the ``code`` of the module is given.
+    """
+    try:
+        p_time = os.path.getmtime(path)
+    except OSError:
+        return False
+
+    try:
+        module_cache_item = parser_cache[hashed_grammar][path]
+    except KeyError:
+        pass
+    else:
+        change_time = module_cache_item.change_time
+        return change_time is not None and p_time <= change_time
+    if content_addressed_cache:
+        if code is None:
+            # Needs the code to know.
+            return False
+        cache_file = _get_content_hashed_path(hashed_grammar, code, cache_path=cache_path)
+        return os.path.exists(cache_file)
+    try:
+        cache_path = _get_hashed_path(hashed_grammar, path, cache_path=cache_path)
+        return p_time <= os.path.getmtime(cache_path)
+    except OSError:
+        return False
+
+
 def _load_from_file_system(hashed_grammar, path, p_time, cache_path=None):
     cache_path = _get_hashed_path(hashed_grammar, path, cache_path=cache_path)
     try:
@@ -116,27 +537,58 @@ def _load_from_file_system(hashed_grammar, path, p_time, cache_path=None):
     except FileNotFoundError:
         return None
     else:
-        parser_cache.setdefault(hashed_grammar, {})[path] = module_cache_item
+        _set_cache_item(hashed_grammar, path, module_cache_item)
         LOG.debug('pickle loaded: %s', path)
         return module_cache_item.node
 
 
-def save_module(hashed_grammar, path, module, lines, pickling=True, cache_path=None):
+def save_module(hashed_grammar, path, module, lines, pickling=True,
+                cache_path=None, node_count=None):
     try:
         p_time = None if path is None else os.path.getmtime(path)
     except OSError:
         p_time = None
         pickling = False
 
-    item = _NodeCacheItem(module, lines, p_time)
-    parser_cache.setdefault(hashed_grammar, {})[path] = item
+    item = _NodeCacheItem(module, lines, p_time, node_count)
+    _set_cache_item(hashed_grammar, path, item)
     if pickling and path is not None:
         _save_to_file_system(hashed_grammar, path, item, cache_path=cache_path)
 
 
 def _save_to_file_system(hashed_grammar, path, item, cache_path=None):
-    with open(_get_hashed_path(hashed_grammar, path, cache_path=cache_path), 'wb') as f:
+    if content_addressed_cache:
+        code = ''.join(item.lines)
+        cache_file = _get_content_hashed_path(hashed_grammar, code, cache_path=cache_path)
+        if os.path.exists(cache_file):
+            return
+        data = _serialize_tree(item.node, code)
+        if data is not None:
+            tmp_path = '%s.%s.tmp' % (cache_file, os.getpid())
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            _replace_file(tmp_path, cache_file)
+        return
+
+    cache_file = _get_hashed_path(hashed_grammar, path, cache_path=cache_path)
+    # Write to a temporary file first, other processes might be loading it.
+    tmp_path = '%s.%s.tmp' % (cache_file, os.getpid())
+    with open(tmp_path, 'wb') as f:
         pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
+    _replace_file(tmp_path, cache_file)
+
+
+def _replace_file(tmp_path, path):
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Windows doesn't overwrite files.
+        try:
+            os.remove(path)
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process was faster.
+            os.remove(tmp_path)
 
 
 def clear_cache(cache_path=None):
@@ -153,10 +605,58 @@ def _get_hashed_path(hashed_grammar, path, cache_path=None):
     return os.path.join(directory, '%s-%s.pkl' % (hashed_grammar, file_hash))
 
 
+def load_grammar_tables(hashed_grammar, pgen_grammar, cache_path=None):
+    """
+    Loads the pgen tables generated by :py:func:`save_grammar_tables` into
+    ``pgen_grammar``. Returns False if there are none.
+    """
+    try:
+        pgen_grammar.load(_get_grammar_tables_path(hashed_grammar, cache_path))
+    except Exception:
+        # Not generated yet, not readable or generated by something else.
+        return False
+    return True
+
+
+def save_grammar_tables(hashed_grammar, pgen_grammar, cache_path=None):
+    """
+    Saves the pgen tables of a grammar, so that other processes don't have to
+    generate them again.
+    """
+    path = _get_grammar_tables_path(hashed_grammar, cache_path)
+    # Write to a temporary file first, other processes might be loading it.
+    tmp_path = '%s.%s.tmp' % (path, os.getpid())
+    pgen_grammar.dump(tmp_path)
+    try:
+        os.rename(tmp_path, path)
+    except OSError:
+        # Windows doesn't overwrite, another process was faster.
+        os.remove(tmp_path)
+
+
+def _get_grammar_tables_path(hashed_grammar, cache_path=None):
+    from parso import __version__
+
+    directory = _get_cache_directory_path(cache_path=cache_path)
+    return os.path.join(directory, 'grammar-%s-%s.pickle' % (__version__, hashed_grammar))
+
+
+def _get_content_hashed_path(hashed_grammar, code, cache_path=None):
+    directory = _get_cache_directory_path(cache_path=cache_path)
+
+    code_hash = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    return os.path.join(directory, '%s-%s.tree' % (hashed_grammar, code_hash))
+
+
 def _get_cache_directory_path(cache_path=None):
     if cache_path is None:
         cache_path = _default_cache_path
     directory = os.path.join(cache_path, _VERSION_TAG)
     if not os.path.exists(directory):
-        os.makedirs(directory)
+        try:
+            os.makedirs(directory)
+        except OSError:
+            # Another process might have created it in the meantime.
+            if not os.path.isdir(directory):
+                raise
     return directory
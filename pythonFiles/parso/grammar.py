@@ -1,19 +1,31 @@
 import hashlib
 import os
+import multiprocessing
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
 
 from parso._compatibility import FileNotFoundError, is_pypy
 from parso.pgen2.pgen import generate_grammar
-from parso.utils import split_lines, python_bytes_to_unicode, parse_version_string
+from parso.pgen2.grammar import Grammar as PgenGrammar
+from parso.utils import split_lines, python_bytes_to_unicode, \
+    parse_version_string, apply_edits
 from parso.python.diff import DiffParser
 from parso.python.tokenize import tokenize_lines, tokenize
 from parso.python import token
-from parso.cache import parser_cache, load_module, save_module
+from parso import cache as parso_cache
+from parso.cache import parser_cache, load_module, save_module, touch_module, \
+    load_module_from_content, load_grammar_tables, save_grammar_tables, \
+    is_module_cached
 from parso.parser import BaseParser
 from parso.python.parser import Parser as PythonParser
 from parso.python.errors import ErrorFinderConfig
 from parso.python import pep8
 
 _loaded_grammars = {}
+# The grammar of a process started by Grammar.parse_many.
+_worker_grammar = None
 
 
 class Grammar(object):
@@ -27,15 +39,39 @@ class Grammar(object):
     _token_namespace = None
     _default_normalizer_config = pep8.PEP8NormalizerConfig()
 
-    def __init__(self, text, tokenizer, parser=BaseParser, diff_parser=None):
-        self._pgen_grammar = generate_grammar(
-            text,
-            token_namespace=self._get_token_namespace()
-        )
+    def __init__(self, text, tokenizer, parser=BaseParser, diff_parser=None,
+                 precompiled=False):
+        self._hashed = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if precompiled:
+            self._pgen_grammar = self._load_pgen_grammar(text)
+        else:
+            self._pgen_grammar = generate_grammar(
+                text,
+                token_namespace=self._get_token_namespace()
+            )
         self._parser = parser
         self._tokenizer = tokenizer
         self._diff_parser = diff_parser
-        self._hashed = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _load_pgen_grammar(self, text):
+        """
+        Running pgen is one of the slowest things when starting a process,
+        therefore its tables are generated only once and saved in the cache.
+        """
+        pgen_grammar = PgenGrammar(text)
+        if load_grammar_tables(self._hashed, pgen_grammar):
+            return pgen_grammar
+
+        pgen_grammar = generate_grammar(
+            text,
+            token_namespace=self._get_token_namespace()
+        )
+        try:
+            save_grammar_tables(self._hashed, pgen_grammar)
+        except (IOError, OSError):
+            # The cache directory is probably not writable.
+            pass
+        return pgen_grammar
 
     def parse(self, code=None, **kwargs):
         """
@@ -67,6 +103,12 @@ class Grammar(object):
         :param bool cache_path: If given saves the parso cache in this
             directory. If not given, defaults to the default cache places on
             each platform.
+        :param list edits: Only together with ``diff_cache``, the changes of
+            the code since the module in the cache was parsed, see
+            :py:func:`parso.utils.apply_edits`. Without ``code`` the edits are
+            applied to the cached module, which needs to exist. With ``code``
+            they are only used if they lead to it, otherwise the code is
+            diffed as usual.
 
         :return: A subclass of :py:class:`parso.tree.NodeOrLeaf`. Typically a
             :py:class:`parso.python.tree.Module`.
@@ -75,9 +117,86 @@ class Grammar(object):
             raise TypeError("parse() got an unexpected keyword argument.")
         return self._parse(code=code, **kwargs)
 
+    def parse_many(self, paths, workers=None, cache_path=None):
+        """
+        Parses the files in ``paths`` in ``workers`` processes and saves the
+        modules in the file system cache. Files that are cached already are not
+        parsed again. This is a way to warm the cache for a lot of files, e.g.
+        all the files of a virtualenv.
+
+        :param list paths: The paths of the files to parse.
+        :param int workers: The number of processes. Defaults to the number of
+            CPUs. With one worker the files are parsed in this process.
+        :param bool cache_path: See :py:meth:`parse`.
+
+        :return: A mapping of the paths that could be read to their modules.
+            A module is only loaded from the cache (and kept in the RAM cache)
+            when it's accessed. In pypy, which doesn't save modules in the
+            file system cache, the modules stay in the RAM cache.
+        """
+        seen = set()
+        unique_paths = []
+        for path in paths:
+            if path not in seen:
+                seen.add(path)
+                unique_paths.append(path)
+        missing = [path for path in unique_paths
+                   if not is_module_cached(self._hashed, path, cache_path)]
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        workers = min(workers, len(missing))
+
+        # Nothing is pickled in pypy, the workers' modules would be lost.
+        if workers <= 1 or is_pypy:
+            results = ((path, self._cache_file(path, cache_path))
+                       for path in missing)
+            failed = set(path for path, ok in results if not ok)
+        else:
+            pool = multiprocessing.Pool(
+                workers,
+                _init_parse_worker,
+                (self, parso_cache.content_addressed_cache)
+            )
+            try:
+                results = pool.imap_unordered(
+                    _parse_in_worker,
+                    [(path, cache_path) for path in missing],
+                    chunksize=len(missing) // (workers * 4) + 1
+                )
+                failed = set(path for path, ok in results if not ok)
+                pool.close()
+            except BaseException:
+                pool.terminate()
+                raise
+            finally:
+                pool.join()
+        return _ModuleMapping(
+            self,
+            [path for path in unique_paths if path not in failed],
+            cache_path
+        )
+
+    def _cache_file(self, path, cache_path):
+        """
+        Parses the file of ``path`` into the file system cache. Returns False
+        if it cannot be read.
+        """
+        try:
+            with open(path, 'rb') as f:
+                code = python_bytes_to_unicode(f.read())
+        except (IOError, OSError, UnicodeDecodeError, LookupError):
+            # LookupError: The encoding declaration is unknown.
+            return False
+        if not is_module_cached(self._hashed, path, cache_path, code=code):
+            self._parse(code, path=path, cache=True, cache_path=cache_path)
+            if not is_pypy:
+                # The module is only needed on disk, don't keep it around.
+                parser_cache[self._hashed].pop(path, None)
+        return True
+
     def _parse(self, code=None, error_recovery=True, path=None,
                start_symbol=None, cache=False, diff_cache=False,
-               cache_path=None, start_pos=(1, 0)):
+               cache_path=None, start_pos=(1, 0), edits=None):
         """
         Wanted python3.5 * operator and keyword only arguments. Therefore just
         wrap it all.
@@ -87,6 +206,13 @@ class Grammar(object):
         if code is None and path is None:
             raise TypeError("Please provide either code or a path.")
 
+        if edits is not None:
+            if not diff_cache or path is None:
+                raise TypeError("Edits can only be applied with diff_cache "
+                                "and a path.")
+            if code is None:
+                return self._parse_edits(path, edits, cache, cache_path)
+
         if start_symbol is None:
             start_symbol = self._start_symbol
 
@@ -105,6 +231,14 @@ class Grammar(object):
         code = python_bytes_to_unicode(code)
 
         lines = split_lines(code, keepends=True)
+        if cache and path is not None and parso_cache.content_addressed_cache \
+                and path not in parser_cache.get(self._hashed, {}):
+            module_node = load_module_from_content(
+                self._hashed, path, code, lines, cache_path=cache_path
+            )
+            if module_node is not None:
+                return module_node
+
         if diff_cache:
             if self._diff_parser is None:
                 raise TypeError("You have to define a diff parser to be able "
@@ -114,22 +248,20 @@ class Grammar(object):
             except KeyError:
                 pass
             else:
-                module_node = module_cache_item.node
-                old_lines = module_cache_item.lines
-                if old_lines == lines:
-                    return module_node
-
-                new_node = self._diff_parser(
-                    self._pgen_grammar, self._tokenizer, module_node
-                ).update(
-                    old_lines=old_lines,
-                    new_lines=lines
-                )
-                save_module(self._hashed, path, new_node, lines,
-                            # Never pickle in pypy, it's slow as hell.
-                            pickling=cache and not is_pypy,
-                            cache_path=cache_path)
-                return new_node
+                opcodes = None
+                if edits is not None:
+                    try:
+                        edited_lines, opcodes = apply_edits(
+                            module_cache_item.lines, edits)
+                    except ValueError:
+                        pass
+                    else:
+                        if edited_lines != lines:
+                            # The cached module isn't what the edits were
+                            # made to.
+                            opcodes = None
+                return self._diff_parse(module_cache_item, path, lines,
+                                        opcodes, cache, cache_path)
 
         tokens = self._tokenizer(lines, start_pos)
 
@@ -147,6 +279,44 @@ class Grammar(object):
                         cache_path=cache_path)
         return root_node
 
+    def _parse_edits(self, path, edits, cache, cache_path):
+        try:
+            module_cache_item = parser_cache[self._hashed][path]
+        except KeyError:
+            raise ValueError("There's no module of %s in the diff cache to "
+                             "apply the edits to." % path)
+        lines, opcodes = apply_edits(module_cache_item.lines, edits)
+        return self._diff_parse(module_cache_item, path, lines, opcodes,
+                                cache, cache_path)
+
+    def _diff_parse(self, module_cache_item, path, lines, opcodes, cache,
+                    cache_path):
+        module_node = module_cache_item.node
+        old_lines = module_cache_item.lines
+        if old_lines == lines:
+            touch_module(self._hashed, path)
+            return module_node
+
+        new_node = self._diff_parser(
+            self._pgen_grammar, self._tokenizer, module_node
+        ).update(
+            old_lines=old_lines,
+            new_lines=lines,
+            opcodes=opcodes
+        )
+        # Counting all the nodes again would cost as much as the diff
+        # itself, so the last count is scaled by the number of lines.
+        node_count = None
+        if module_cache_item.node_count is not None:
+            node_count = module_cache_item.node_count * len(lines) \
+                // max(len(old_lines), 1)
+        save_module(self._hashed, path, new_node, lines,
+                    # Never pickle in pypy, it's slow as hell.
+                    pickling=cache and not is_pypy,
+                    cache_path=cache_path,
+                    node_count=node_count)
+        return new_node
+
     def _get_token_namespace(self):
         ns = self._token_namespace
         if ns is None:
@@ -196,14 +366,20 @@ class PythonGrammar(Grammar):
     _token_namespace = token
     _start_symbol = 'file_input'
 
-    def __init__(self, version_info, bnf_text):
+    def __init__(self, version_info, bnf_text, precompiled=False):
         super(PythonGrammar, self).__init__(
             bnf_text,
             tokenizer=self._tokenize_lines,
             parser=PythonParser,
-            diff_parser=DiffParser
+            diff_parser=DiffParser,
+            precompiled=precompiled
         )
         self.version_info = version_info
+        self._init_args = version_info, bnf_text, precompiled
+
+    def __reduce__(self):
+        # Processes that are not forked need to get their own grammar.
+        return PythonGrammar, self._init_args
 
     def _tokenize_lines(self, lines, start_pos):
         return tokenize_lines(lines, self.version_info, start_pos=start_pos)
@@ -213,6 +389,44 @@ class PythonGrammar(Grammar):
         return tokenize(code, self.version_info)
 
 
+class _ModuleMapping(Mapping):
+    """
+    The modules of :py:meth:`Grammar.parse_many`, loaded from the cache when
+    they are accessed.
+    """
+    def __init__(self, grammar, paths, cache_path):
+        self._grammar = grammar
+        self._paths = paths
+        self._path_set = set(paths)
+        self._cache_path = cache_path
+
+    def __getitem__(self, path):
+        if path not in self._path_set:
+            raise KeyError(path)
+        return self._grammar.parse(path=path, cache=True,
+                                   cache_path=self._cache_path)
+
+    def __contains__(self, path):
+        return path in self._path_set
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
+
+def _init_parse_worker(grammar, content_addressed_cache):
+    global _worker_grammar
+    _worker_grammar = grammar
+    parso_cache.content_addressed_cache = content_addressed_cache
+
+
+def _parse_in_worker(args):
+    path, cache_path = args
+    return path, _worker_grammar._cache_file(path, cache_path)
+
+
 def load_grammar(**kwargs):
     """
     Loads a :py:class:`parso.Grammar`. The default version is the current Python
@@ -224,6 +438,7 @@ def load_grammar(**kwargs):
     def load_grammar(language='python', version=None, path=None):
         if language == 'python':
             version_info = parse_version_string(version)
+            is_bundled = path is None
 
             file = path or os.path.join(
                 'python',
@@ -239,7 +454,10 @@ def load_grammar(**kwargs):
                     with open(path) as f:
                         bnf_text = f.read()
 
-                    grammar = PythonGrammar(version_info, bnf_text)
+                    # Only the grammars shipped with parso use precompiled
+                    # tables, custom grammars are always generated by pgen.
+                    grammar = PythonGrammar(version_info, bnf_text,
+                                            precompiled=is_bundled)
                     return _loaded_grammars.setdefault(path, grammar)
                 except FileNotFoundError:
                     message = "Python version %s is currently not supported." % version
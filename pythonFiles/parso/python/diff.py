@@ -6,11 +6,13 @@ It works with a simple diff in the beginning and will try to reuse old parser
 fragments.
 """
 import re
+import bisect
 import difflib
 from collections import namedtuple
 import logging
 
 from parso.utils import split_lines
+from parso.tree import BaseNode
 from parso.python.parser import Parser
 from parso.python.tree import EndMarker
 from parso.python.tokenize import (NEWLINE, PythonToken, ERROR_DEDENT,
@@ -102,8 +104,13 @@ class DiffParser(object):
 
         self._nodes_stack = _NodesStack(self._module)
 
-    def update(self, old_lines, new_lines):
+    def update(self, old_lines, new_lines, opcodes=None):
         '''
+        ``opcodes`` are the changes from the old to the new lines in the
+        format of :py:meth:`difflib.SequenceMatcher.get_opcodes`. They are
+        calculated if they are not given (e.g. by
+        :py:func:`parso.utils.apply_edits`).
+
         The algorithm works as follows:
 
         Equal:
@@ -119,16 +126,22 @@ class DiffParser(object):
         Returns the new module node.
         '''
         LOG.debug('diff parser start')
-        # Reset the used names cache so they get regenerated.
+        # The used names and the leaf index are updated at the end, if they
+        # were calculated. Reset them in the meantime, the module is going to
+        # change.
+        used_names = self._module._used_names
+        leaf_index = self._module._leaf_index
         self._module._used_names = None
+        self._module._leaf_index = None
 
         self._parser_lines_new = new_lines
 
         self._reset()
 
         line_length = len(new_lines)
-        sm = difflib.SequenceMatcher(None, old_lines, self._parser_lines_new)
-        opcodes = sm.get_opcodes()
+        if opcodes is None:
+            sm = difflib.SequenceMatcher(None, old_lines, self._parser_lines_new)
+            opcodes = sm.get_opcodes()
         LOG.debug('diff parser calculated')
         LOG.debug('diff: line_lengths old: %s, new: %s' % (len(old_lines), line_length))
 
@@ -163,6 +176,15 @@ class DiffParser(object):
                 % (last_pos, line_length, ''.join(diff))
             )
 
+        if used_names is not None or leaf_index is not None:
+            removed, added = self._nodes_stack.get_changed_leaves()
+            if used_names is not None:
+                self._module._used_names = _update_used_names(
+                    used_names, removed, added)
+            if leaf_index is not None:
+                self._module._leaf_index = _update_leaf_index(
+                    leaf_index, opcodes, removed, added, line_length)
+
         LOG.debug('diff parser end')
         return self._module
 
@@ -213,7 +235,9 @@ class DiffParser(object):
             last_until_line = self._nodes_stack.parsed_until_line
 
     def _get_old_line_stmt(self, old_line):
-        leaf = self._module.get_leaf_for_position((old_line, 0), include_prefixes=True)
+        # The leaf index of the module is not valid while it's being changed.
+        leaf = BaseNode.get_leaf_for_position(
+            self._module, (old_line, 0), include_prefixes=True)
 
         if _ends_with_newline(leaf):
             leaf = leaf.get_next_leaf()
@@ -336,6 +360,95 @@ class DiffParser(object):
             yield PythonToken(typ, string, start_pos, prefix)
 
 
+def _get_leaves(node, inserted, leaves):
+    try:
+        children = node.children
+    except AttributeError:
+        leaves.append(node)
+    else:
+        for child in children:
+            # Inserted nodes are either new nodes that are handled on their
+            # own or old nodes that are still part of the tree.
+            if id(child) not in inserted:
+                _get_leaves(child, inserted, leaves)
+
+
+def _update_used_names(used_names, removed, added):
+    """
+    Returns the used names of the changed module by only looking at the leafs
+    that were removed from and added to the old module. Copied nodes keep
+    their leafs, the positions of those are already updated.
+
+    Returns None if the removed names are not in the used names, they are
+    then calculated again when needed.
+    """
+    # Don't modify the old dict, it might still be used.
+    used_names = dict(used_names)
+    removed_ids = {}
+    for name in removed:
+        if name.type == 'name':
+            removed_ids.setdefault(name.value, set()).add(id(name))
+    for value, ids in removed_ids.items():
+        old_names = used_names.get(value, [])
+        names = [n for n in old_names if id(n) not in ids]
+        if len(old_names) - len(names) != len(ids):
+            # The old module wasn't what the used names were calculated for,
+            # probably because of wrong positions after a previous diff.
+            return None
+        if names:
+            used_names[value] = names
+        else:
+            del used_names[value]
+
+    added_names = {}
+    for name in added:
+        if name.type == 'name':
+            added_names.setdefault(name.value, []).append(name)
+    for value, names in added_names.items():
+        names = used_names.get(value, []) + names
+        names.sort(key=lambda name: name.start_pos)
+        used_names[value] = names
+    return used_names
+
+
+def _update_leaf_index(leaf_index, opcodes, removed, added, line_length):
+    """
+    Returns the leaf index (see :py:meth:`Module._get_leaf_index`) of the
+    changed module. The lines of equal blocks are taken from the old index,
+    the removed leafs are filtered and the added leafs are inserted.
+    """
+    new_index = [()] * (line_length + 1)
+    equal_blocks = []
+    for operation, i1, i2, j1, j2 in opcodes:
+        if operation == 'equal':
+            new_index[j1 + 1:j2 + 1] = leaf_index[i1 + 1:i2 + 1]
+            equal_blocks.append((i1, i2, j1 - i1))
+
+    # Removed leafs still have the position they had in the old module.
+    removed_lines = {}
+    for leaf in removed:
+        removed_lines.setdefault(leaf.line, set()).add(id(leaf))
+    block_starts = [block[0] for block in equal_blocks]
+    for line, ids in removed_lines.items():
+        i = bisect.bisect_left(block_starts, line) - 1
+        if i < 0:
+            continue
+        i1, i2, line_offset = equal_blocks[i]
+        if line <= i2:
+            line += line_offset
+            new_index[line] = [l for l in new_index[line] if id(l) not in ids]
+
+    added_lines = {}
+    for leaf in added:
+        added_lines.setdefault(leaf.line, []).append(leaf)
+    for line, leaves in added_lines.items():
+        if new_index[line]:
+            leaves = sorted(list(new_index[line]) + leaves,
+                            key=lambda leaf: leaf.start_pos)
+        new_index[line] = leaves
+    return new_index
+
+
 class _NodesStackNode(object):
     ChildrenGroup = namedtuple('ChildrenGroup', 'children line_offset last_line_offset_leaf')
 
@@ -398,6 +511,10 @@ class _NodesStack(object):
         self._module = module
         self._last_prefix = ''
         self.prefix = ''
+        # The changes of the tree, see get_changed_leaves.
+        self.added_nodes = []
+        self.removed_nodes = []
+        self.inserted_nodes = {}
 
     def is_empty(self):
         return not self._base_node.children
@@ -429,7 +546,16 @@ class _NodesStack(object):
             node = self._close_tos()
 
     def _close_tos(self):
+        tree_node = self._tos.tree_node
+        old_children = tree_node.children
         self._tos.close()
+        old_ids = set(id(node) for node in old_children)
+        new_ids = set()
+        for node in tree_node.children:
+            new_ids.add(id(node))
+            if id(node) not in old_ids:
+                self.inserted_nodes[id(node)] = node
+        self.removed_nodes += [n for n in old_children if id(n) not in new_ids]
         self._tos = self._tos.parent
         return self._tos
 
@@ -443,6 +569,7 @@ class _NodesStack(object):
         node = self._get_insertion_node(tree_nodes[0])
         assert node.tree_node.type in ('suite', 'file_input')
         node.add(tree_nodes)
+        self.added_nodes += tree_nodes
         self._update_tos(tree_nodes[-1])
 
     def _remove_endmarker(self, tree_nodes):
@@ -592,3 +719,19 @@ class _NodesStack(object):
         endmarker = EndMarker('', tuple(end_pos), self.prefix + self._last_prefix)
         endmarker.parent = self._module
         self._module.children.append(endmarker)
+        self.added_nodes.append(endmarker)
+
+    def get_changed_leaves(self):
+        """
+        Returns the leafs that were removed from the old module and the ones
+        that were added by parsing, after the stack is closed.
+        """
+        inserted = self.inserted_nodes
+        removed = []
+        for node in self.removed_nodes:
+            if id(node) not in inserted:
+                _get_leaves(node, inserted, removed)
+        added = []
+        for node in self.added_nodes:
+            _get_leaves(node, inserted, added)
+        return removed, added
@@ -163,7 +163,10 @@ def _create_token_collection(version_info):
     Single3 = r"[^'\\]*(?:(?:\\.|'(?!''))[^'\\]*)*'''"
     # Tail end of """ string.
     Double3 = r'[^"\\]*(?:(?:\\.|"(?!""))[^"\\]*)*"""'
-    Triple = group(StringPrefixWithF + "'''", StringPrefixWithF + '"""')
+    # The string prefixes are tried one after another, which is slow. Check
+    # first that a quote follows the (at most two) prefix characters.
+    StringStart = r'(?=[bBrRuUfF]{0,2}[\'"])'
+    Triple = StringStart + group(StringPrefixWithF + "'''", StringPrefixWithF + '"""')
 
     # Because of leftmost-then-longest match semantics, be sure to put the
     # longest operators first (e.g., if = came before ==, == would get
@@ -183,14 +186,14 @@ def _create_token_collection(version_info):
     Funny = group(Operator, Bracket, Special)
 
     # First (or only) line of ' or " string.
-    ContStr = group(StringPrefix + r"'[^\n'\\]*(?:\\.[^\n'\\]*)*" +
-                    group("'", r'\\\r?\n'),
-                    StringPrefix + r'"[^\n"\\]*(?:\\.[^\n"\\]*)*' +
-                    group('"', r'\\\r?\n'))
+    ContStr = StringStart + group(StringPrefix + r"'[^\n'\\]*(?:\\.[^\n'\\]*)*" +
+                                  group("'", r'\\\r?\n'),
+                                  StringPrefix + r'"[^\n"\\]*(?:\\.[^\n"\\]*)*' +
+                                  group('"', r'\\\r?\n'))
     pseudo_extra_pool = [Comment, Triple]
     all_quotes = '"', "'", '"""', "'''"
     if fstring_prefixes:
-        pseudo_extra_pool.append(FStringStart + group(*all_quotes))
+        pseudo_extra_pool.append(StringStart + FStringStart + group(*all_quotes))
 
     PseudoExtras = group(r'\\\r?\n|\Z', *pseudo_extra_pool)
     PseudoToken = group(Whitespace, capture=True) + \
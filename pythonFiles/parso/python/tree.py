@@ -381,12 +381,13 @@ class Module(Scope):
     Depending on the underlying parser this may be a full module or just a part
     of a module.
     """
-    __slots__ = ('_used_names',)
+    __slots__ = ('_used_names', '_leaf_index')
     type = 'file_input'
 
     def __init__(self, children):
         super(Module, self).__init__(children)
         self._used_names = None
+        self._leaf_index = None
 
     def _iter_future_import_names(self):
         """
@@ -440,6 +441,80 @@ class Module(Scope):
             self._used_names = dct
         return self._used_names
 
+    def _get_leaf_index(self):
+        """
+        Returns a list that contains the leafs that start on a line for every
+        line (an empty tuple if there are none). It's created on the first
+        lookup of a position and kept up to date by the diff parser.
+        """
+        if self._leaf_index is None:
+            lines = {}
+
+            def recurse(node):
+                try:
+                    children = node.children
+                except AttributeError:
+                    lines.setdefault(node.line, []).append(node)
+                else:
+                    for child in children:
+                        recurse(child)
+
+            recurse(self)
+            index = [()] * (self.end_pos[0] + 1)
+            for line, leaves in lines.items():
+                index[line] = leaves
+            self._leaf_index = index
+        return self._leaf_index
+
+    def _get_first_leaf_until(self, position):
+        """
+        Returns the first leaf that ends at or after ``position``.
+        """
+        index = self._get_leaf_index()
+        line = position[0]
+        # Leafs of previous lines might span multiple lines (e.g. strings).
+        for previous_line in range(line - 1, 0, -1):
+            leaves = index[previous_line]
+            if leaves:
+                if leaves[-1].end_pos >= position:
+                    return leaves[-1]
+                break
+
+        for leaf in index[line]:
+            if leaf.end_pos >= position:
+                return leaf
+        for next_line in range(line + 1, len(index)):
+            leaves = index[next_line]
+            if leaves:
+                return leaves[0]
+
+    def get_leaf_for_position(self, position, include_prefixes=False):
+        # Same as BaseNode.get_leaf_for_position, but doesn't need to search
+        # the tree.
+        if not ((1, 0) <= position <= self.end_pos):
+            raise ValueError('Please provide a position that exists within this node.')
+        leaf = self._get_first_leaf_until(position)
+        if not include_prefixes and position < leaf.start_pos:
+            # We're on a prefix.
+            return None
+        return leaf
+
+    def get_name_of_position(self, position):
+        # Same as PythonMixin.get_name_of_position, but doesn't need to walk
+        # the tree.
+        if not ((1, 0) <= position <= self.end_pos):
+            return None
+        leaf = self._get_first_leaf_until(position)
+        if leaf.type == 'name' and leaf.start_pos <= position:
+            return leaf
+        # The leaf might end at the position where a name starts.
+        for leaf in self._get_leaf_index()[position[0]]:
+            if leaf.start_pos > position:
+                break
+            if leaf.type == 'name' and leaf.end_pos >= position:
+                return leaf
+        return None
+
 
 class Decorator(PythonBaseNode):
     type = 'decorator'
@@ -48,6 +48,108 @@ def split_lines(string, keepends=False):
         return re.split('\n|\r\n', string)
 
 
+def apply_edits(lines, edits):
+    """
+    Applies text edits to the ``lines`` of a module, as returned by
+    ``split_lines(code, keepends=True)``. Each edit is a tuple of
+    ``(start_pos, end_pos, text)`` that replaces the code between the two
+    positions (as used in the tree) with ``text``. The edits are applied one
+    after the other, like the changes of an editor.
+
+    Returns the new lines and the opcodes that turn ``lines`` into them, in
+    the format of :py:meth:`difflib.SequenceMatcher.get_opcodes`.
+    """
+    # The new lines are a list of segments, tuples of ``(start, end)`` for
+    # lines that are still the same as ``lines[start:end]`` and lists of
+    # changed lines.
+    segments = [(0, len(lines))]
+    for start_pos, end_pos, text in edits:
+        segments = _apply_edit(lines, segments, start_pos, end_pos, text)
+
+    new_lines = []
+    opcodes = []
+    old_index = new_index = 0
+    for segment in segments:
+        if isinstance(segment, list):
+            new_lines += segment
+            continue
+        start, end = segment
+        if start == end:
+            continue
+        _add_change_opcode(opcodes, old_index, start, new_index, len(new_lines))
+        new_index = len(new_lines)
+        new_lines += lines[start:end]
+        opcodes.append(('equal', start, end, new_index, len(new_lines)))
+        old_index = end
+        new_index = len(new_lines)
+    _add_change_opcode(opcodes, old_index, len(lines), new_index, len(new_lines))
+    return new_lines, opcodes
+
+
+def _apply_edit(lines, segments, start_pos, end_pos, text):
+    start_line, start_column = start_pos
+    end_line, end_column = end_pos
+    if (end_line, end_column) < (start_line, start_column):
+        raise ValueError("The edit ends before it starts: %s, %s" % (start_pos, end_pos))
+
+    before = []
+    touched = []
+    after = []
+    # Line numbers start at 1.
+    line = 1
+    for segment in segments:
+        if isinstance(segment, list):
+            count = len(segment)
+        else:
+            count = segment[1] - segment[0]
+        next_line = line + count
+        if next_line <= start_line:
+            before.append(segment)
+        elif line > end_line:
+            after.append(segment)
+        else:
+            first = max(line, start_line) - line
+            last = min(next_line, end_line + 1) - line
+            if first > 0:
+                before.append(_slice_segment(segment, 0, first))
+            touched += _get_segment_lines(lines, _slice_segment(segment, first, last))
+            if last < count:
+                after.append(_slice_segment(segment, last, count))
+        line = next_line
+
+    if len(touched) != end_line - start_line + 1:
+        raise ValueError("The edit is outside of the code: %s, %s" % (start_pos, end_pos))
+
+    code = ''.join(touched)
+    end_offset = len(code) - len(touched[-1]) + end_column
+    changed = split_lines(code[:start_column] + text + code[end_offset:], keepends=True)
+    if after and changed[-1] == '':
+        # The last touched line ended with a newline, the next line follows.
+        changed.pop()
+    return before + [changed] + after
+
+
+def _slice_segment(segment, start, end):
+    if isinstance(segment, list):
+        return segment[start:end]
+    return segment[0] + start, segment[0] + end
+
+
+def _get_segment_lines(lines, segment):
+    if isinstance(segment, list):
+        return segment
+    return lines[segment[0]:segment[1]]
+
+
+def _add_change_opcode(opcodes, i1, i2, j1, j2):
+    if i1 < i2 and j1 < j2:
+        opcodes.append(('replace', i1, i2, j1, j2))
+    elif i1 < i2:
+        opcodes.append(('delete', i1, i2, j1, j2))
+    elif j1 < j2:
+        opcodes.append(('insert', i1, i2, j1, j2))
+
+
 def python_bytes_to_unicode(source, encoding='utf-8', errors='strict'):
     """
     Checks for unicode BOMs and PEP 263 encoding declarations. Then returns a
@@ -0,0 +1,262 @@
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+import jedi
+from jedi import settings
+from jedi.api.environment import Environment
+from jedi.evaluate import Evaluator
+from jedi.evaluate.compiled import subprocess as compiled_subprocess
+from jedi.evaluate.compiled.subprocess import cache
+
+
+def _kill(sub):
+    if not sub._crashed:
+        sub.kill()
+
+
+def _counting_evaluator(test, environment):
+    """
+    Returns an evaluator and the list of functions it sends to its subprocess.
+    """
+    # Every evaluator gets a new subprocess, like a new editor session.
+    for sub in list(compiled_subprocess._subprocesses.values()):
+        _kill(sub)
+    evaluator = Evaluator(jedi.api.project.Project(os.getcwd()),
+                          environment=environment)
+    sub = evaluator.compiled_subprocess._compiled_subprocess
+    test.addCleanup(_kill, sub)
+    calls = []
+    send = sub._send
+
+    def counting_send(*args, **kwargs):
+        calls.append(args[1])
+        return send(*args, **kwargs)
+    sub._send = counting_send
+    return evaluator, calls
+
+
+def _builtins_handle(evaluator):
+    path = evaluator.compiled_subprocess.get_special_object('BUILTINS')
+    return path.accesses[-1][1]
+
+
+class SubprocessPoolTest(unittest.TestCase):
+    def setUp(self):
+        pool_size = settings.compiled_subprocess_pool_size
+        self.addCleanup(setattr, settings, 'compiled_subprocess_pool_size', pool_size)
+        subprocesses = dict(compiled_subprocess._subprocesses)
+        compiled_subprocess._subprocesses.clear()
+        self.addCleanup(compiled_subprocess._subprocesses.update, subprocesses)
+        self.addCleanup(self._kill_subprocesses)
+        self.environment = Environment(sys.prefix, sys.executable)
+
+    def _kill_subprocesses(self):
+        for sub in list(compiled_subprocess._subprocesses.values()):
+            _kill(sub)
+
+    def _evaluator(self):
+        project = jedi.api.project.Project(os.getcwd())
+        return Evaluator(project, environment=self.environment)
+
+    def _complete(self, evaluator):
+        script = jedi.Script('"".upp', 1, 5, _evaluator=evaluator)
+        return [c.name for c in script.completions()]
+
+    def _subprocess(self, evaluator):
+        return evaluator.compiled_subprocess._compiled_subprocess
+
+    def test_least_used_subprocess(self):
+        settings.compiled_subprocess_pool_size = 2
+        first = self._evaluator()
+        second = self._evaluator()
+        self.assertIsNot(self._subprocess(first), self._subprocess(second))
+        self.assertEqual(self._complete(first), ['upper'])
+        self.assertEqual(self._complete(second), ['upper'])
+
+        sub = self._subprocess(first)
+        del first
+        self.assertIs(self._subprocess(self._evaluator()), sub)
+
+    def test_single_subprocess(self):
+        settings.compiled_subprocess_pool_size = 1
+        first = self._evaluator()
+        self.assertIs(self._subprocess(first), self._subprocess(self._evaluator()))
+
+    def test_crashed_subprocess_is_replaced(self):
+        evaluator = self._evaluator()
+        self.assertEqual(self._complete(evaluator), ['upper'])
+        crashed = self._subprocess(evaluator)
+        crashed.kill()
+        self.assertTrue(evaluator.compiled_subprocess.is_crashed)
+        self.assertRaises(jedi.InternalError, self._complete, evaluator)
+
+        evaluator = self._evaluator()
+        self.assertIsNot(self._subprocess(evaluator), crashed)
+        self.assertEqual(self._complete(evaluator), ['upper'])
+
+
+class IntrospectionCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for name, value in [('compiled_introspection_cache', True),
+                            ('cache_directory', self.directory)]:
+            self.addCleanup(setattr, settings, name, getattr(settings, name))
+            setattr(settings, name, value)
+        caches = dict(cache._caches)
+        cache._caches.clear()
+        self.addCleanup(cache._caches.update, caches)
+        self.environment = Environment(sys.prefix, sys.executable)
+
+    def _evaluator(self):
+        return _counting_evaluator(self, self.environment)
+
+    def _complete(self, evaluator):
+        script = jedi.Script('str.upp', 1, 7, _evaluator=evaluator)
+        return [c.name for c in script.completions()]
+
+    def test_cache_hit(self):
+        evaluator, calls = self._evaluator()
+        self.assertEqual(self._complete(evaluator), ['upper'])
+        uncached_calls = len(calls)
+        cache.save_caches()
+        self.assertTrue(os.listdir(os.path.join(self.directory, 'introspection')))
+
+        # Loaded from disk.
+        cache._caches.clear()
+        evaluator, calls = self._evaluator()
+        self.assertEqual(self._complete(evaluator), ['upper'])
+        self.assertLess(len(calls), uncached_calls // 2)
+
+    def test_module_file_changed(self):
+        path = os.path.join(self.directory, 'ext.so')
+        with open(path, 'w') as f:
+            f.write('1')
+        sys_path = [self.directory]
+        module_cache = cache.get_module_cache(self.environment, sys_path, path=path)
+        self.assertIs(cache.get_module_cache(self.environment, sys_path, path=path),
+                      module_cache)
+        module_cache.set('key', (False, 1))
+
+        mtime = time.time() + 10
+        os.utime(path, (mtime, mtime))
+        changed_cache = cache.get_module_cache(self.environment, sys_path, path=path)
+        self.assertIsNot(changed_cache, module_cache)
+        self.assertEqual(changed_cache.identifier, module_cache.identifier)
+        self.assertIsNone(changed_cache.get('key'))
+
+    def test_nested_cached_handle(self):
+        evaluator, calls = self._evaluator()
+        evaluator.compiled_subprocess.get_special_object('BUILTINS')
+        evaluator, calls = self._evaluator()
+        path = evaluator.compiled_subprocess.get_special_object('BUILTINS')
+        handle = path.accesses[-1][1]
+        self.assertIsInstance(handle, compiled_subprocess.CachedAccessHandle)
+        self.assertIsNone(handle._id)
+
+        # Loading the handle while the arguments are sent would dead lock.
+        thread = threading.Thread(
+            target=evaluator.compiled_subprocess.create_simple_object,
+            args=([(handle,)],)
+        )
+        thread.daemon = True
+        thread.start()
+        thread.join(30)
+        self.assertFalse(thread.is_alive())
+        self.assertIsNotNone(handle._id)
+
+    def test_call_batch(self):
+        evaluator, calls = self._evaluator()
+        handle = _builtins_handle(evaluator)
+        compiled_subprocess.call_batch([(handle, 'getattr', ('str',), {})])
+        cache.save_caches()
+
+        cache._caches.clear()
+        evaluator, calls = self._evaluator()
+        handle = _builtins_handle(evaluator)
+        self.assertIsNone(handle._id)
+        compiled_subprocess.call_batch([
+            (handle, 'getattr', ('str',), {}),
+            (0, 'get_api_type', (), {}),
+        ])
+        # The handles of builtins and str are loaded first.
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(calls[-1].__name__, 'call_batch')
+        str_handle = handle.getattr('str')
+        self.assertIsInstance(str_handle, compiled_subprocess.CachedAccessHandle)
+        self.assertEqual(str_handle.get_api_type(), 'class')
+        self.assertEqual(len(calls), 3)
+
+        cache.save_caches()
+        cache._caches.clear()
+        evaluator, calls = self._evaluator()
+        handle = _builtins_handle(evaluator)
+        compiled_subprocess.call_batch([
+            (handle, 'getattr', ('str',), {}),
+            (0, 'get_api_type', (), {}),
+        ])
+        self.assertEqual(calls, [])
+        self.assertEqual(handle.getattr('str').get_api_type(), 'class')
+
+
+class CallBatchTest(unittest.TestCase):
+    def setUp(self):
+        introspection_cache = settings.compiled_introspection_cache
+        self.addCleanup(setattr, settings, 'compiled_introspection_cache',
+                        introspection_cache)
+        settings.compiled_introspection_cache = False
+        self.evaluator, self.calls = _counting_evaluator(
+            self, Environment(sys.prefix, sys.executable))
+        self.handle = _builtins_handle(self.evaluator)
+        del self.calls[:]
+
+    def test_one_round_trip(self):
+        compiled_subprocess.call_batch([
+            (self.handle, 'getattr', ('str',), {'default': None}),
+            (0, 'get_api_type', (), {}),
+            (0, 'getattr', ('upper',), {}),
+            (2, 'is_class', (), {}),
+            (self.handle, 'getattr', ('int',), {'default': None}),
+        ])
+        self.assertEqual(len(self.calls), 1)
+
+        str_handle = self.handle.getattr('str', default=None)
+        self.assertEqual(str_handle.get_api_type(), 'class')
+        self.assertFalse(str_handle.getattr('upper').is_class())
+        self.handle.getattr('int', default=None)
+        self.assertEqual(len(self.calls), 1)
+
+        # Cached calls are not sent again.
+        compiled_subprocess.call_batch([
+            (self.handle, 'getattr', ('str',), {'default': None}),
+            (0, 'get_api_type', (), {}),
+        ])
+        self.assertEqual(len(self.calls), 1)
+
+    def test_exceptions(self):
+        compiled_subprocess.call_batch([
+            (self.handle, 'getattr', ('missing',), {}),
+            (0, 'get_api_type', (), {}),
+        ])
+        self.assertEqual(len(self.calls), 1)
+        self.assertRaises(AttributeError, self.handle.getattr, 'missing')
+        self.assertEqual(len(self.calls), 1)
+
+    def test_prefetch_attributes(self):
+        self.handle.prefetch_attributes(['str', 'int', 'missing'])
+        self.assertEqual(len(self.calls), 1)
+        for name in ('str', 'int'):
+            handle = self.handle.getattr(name, default=None)
+            self.assertTrue(handle.is_class())
+            self.assertEqual(handle.get_api_type(), 'class')
+            handle.py__doc__()
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,257 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+import jedi
+import parso
+import parso.cache
+import parso.utils
+
+import completion
+
+# completion.py imports jedi and parso when it is run as a script.
+completion.jedi = jedi
+completion.parso = parso
+
+
+def _request(id, path, lookup='completions'):
+    return {'id': id, 'path': path, 'lookup': lookup, 'source': ''}
+
+
+def _edit(start, end, text):
+    return {
+        'range': {
+            'start': {'line': start[0], 'character': start[1]},
+            'end': {'line': end[0], 'character': end[1]},
+        },
+        'text': text,
+    }
+
+
+class RequestSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = completion.RequestScheduler()
+
+    def _get_all(self):
+        self.scheduler.close()
+        requests = []
+        while True:
+            request, superseded = self.scheduler.get()
+            if request is None:
+                return requests
+            requests.append((request['id'], superseded))
+
+    def test_priority(self):
+        self.scheduler.put(_request(1, 'a.py', 'usages'))
+        self.scheduler.put(_request(2, 'b.py', 'tooltip'))
+        self.scheduler.put(_request(3, 'c.py', 'completions'))
+        self.scheduler.put(_request(4, 'd.py', 'arguments'))
+        self.scheduler.put(_request(5, 'e.py', 'names'))
+        self.assertEqual(self._get_all(),
+                         [(3, False), (4, False), (2, False), (1, False), (5, False)])
+
+    def test_superseded(self):
+        self.scheduler.put(_request(1, 'a.py'))
+        self.scheduler.put(_request(2, 'a.py', 'tooltip'))
+        self.scheduler.put(_request(3, 'b.py'))
+        self.scheduler.put(_request(4, 'a.py'))
+        self.assertEqual(self._get_all(),
+                         [(1, True), (3, False), (4, False), (2, False)])
+
+
+class _Input(object):
+    """Lines of requests, sets ``read`` once they are all read."""
+    def __init__(self, requests):
+        self._lines = [json.dumps(request) + '\n' for request in requests]
+        self.read = threading.Event()
+
+    def readline(self):
+        if self._lines:
+            return self._lines.pop(0)
+        self.read.set()
+        return ''
+
+
+class WatchTest(unittest.TestCase):
+    def setUp(self):
+        # JediCompletion reads the standard input, give it a pipe instead.
+        read_fd, write_fd = os.pipe()
+        self.addCleanup(os.close, write_fd)
+
+        class Stdin(object):
+            def fileno(self):
+                return read_fd
+        stdin, sys.stdin = sys.stdin, Stdin()
+        try:
+            self.completion = completion.JediCompletion()
+        finally:
+            sys.stdin = stdin
+        self.completion._input.close()
+        # Normally set with the config of every request.
+        self.completion.background_indexing = False
+        self.responses = []
+        self.completion._write_response = self.responses.append
+
+    def test_superseded(self):
+        self.completion._input = _Input([_request(1, 'a.py'), _request(2, 'b.py'),
+                                         _request(3, 'b.py'), _request(4, 'c.py', 'usages')])
+
+        def process_request(request):
+            # Everything else is queued while the first request is processed.
+            if request['id'] == 1:
+                self.completion._input.read.wait(10)
+            return json.dumps({'id': request['id'], 'results': ['processed']})
+        self.completion._process_request = process_request
+        self.completion.watch()
+
+        self.assertEqual([json.loads(response) for response in self.responses], [
+            {'id': 1, 'results': ['processed']},
+            {'id': 2, 'results': []},
+            {'id': 3, 'results': ['processed']},
+            {'id': 4, 'results': ['processed']},
+        ])
+
+
+class DocumentBuffersTest(unittest.TestCase):
+    def setUp(self):
+        self.buffers = completion.DocumentBuffers()
+        self.buffers.resolve({'path': 'a.py', 'source': 'import os\nos.\n', 'version': 1})
+
+    def test_edits(self):
+        request = self.buffers.resolve({
+            'path': 'a.py', 'version': 3, 'baseVersion': 1,
+            'edits': [_edit((1, 3), (1, 3), 'pa'), _edit((0, 7), (0, 9), 'sys')],
+        })
+        self.assertEqual(request['source'], 'import sys\nos.pa\n')
+        self.assertEqual(request['parsoEdits'],
+                         [((2, 3), (2, 3), 'pa'), ((1, 7), (1, 9), 'sys')])
+        self.assertNotIn('outdatedSource', request)
+
+        request = self.buffers.resolve({
+            'path': 'a.py', 'version': 4, 'baseVersion': 3,
+            'edits': [_edit((1, 5), (1, 5), 'th')],
+        })
+        self.assertEqual(request['source'], 'import sys\nos.path\n')
+
+    def test_version_mismatch(self):
+        request = self.buffers.resolve({
+            'path': 'a.py', 'version': 3, 'baseVersion': 2,
+            'edits': [_edit((1, 3), (1, 3), 'pa')],
+        })
+        self.assertTrue(request['outdatedSource'])
+        self.assertNotIn('source', request)
+
+        # Only the whole source is accepted until it is sent again.
+        request = self.buffers.resolve({
+            'path': 'a.py', 'version': 4, 'baseVersion': 1, 'edits': [],
+        })
+        self.assertTrue(request['outdatedSource'])
+        self.buffers.resolve({'path': 'a.py', 'source': 'x\n', 'version': 5})
+        request = self.buffers.resolve({
+            'path': 'a.py', 'version': 6, 'baseVersion': 5,
+            'edits': [_edit((0, 1), (0, 1), 'y')],
+        })
+        self.assertEqual(request['source'], 'xy\n')
+
+    def test_unknown_document(self):
+        request = self.buffers.resolve({
+            'path': 'b.py', 'version': 2, 'baseVersion': 1, 'edits': [],
+        })
+        self.assertTrue(request['outdatedSource'])
+
+    def test_invalid_edit(self):
+        request = self.buffers.resolve({
+            'path': 'a.py', 'version': 2, 'baseVersion': 1, 'edits': [{'text': ''}],
+        })
+        self.assertTrue(request['outdatedSource'])
+
+
+class _Scheduler(object):
+    def __init__(self, events):
+        self._events = events
+
+    def wait_until_idle(self, quiet_period=0):
+        self._events.append('wait')
+
+
+class _Lock(object):
+    def __init__(self, events):
+        self._events = events
+
+    def __enter__(self):
+        self._events.append('lock')
+
+    def __exit__(self, *args):
+        pass
+
+
+class WorkspaceIndexerTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        cache_directory = jedi.settings.cache_directory
+        jedi.settings.cache_directory = os.path.join(self.directory, 'cache')
+        self.addCleanup(setattr, jedi.settings, 'cache_directory', cache_directory)
+        self.grammar = parso.load_grammar()
+        self.addCleanup(self._clear_parser_cache)
+        self.events = []
+        self.indexer = completion.WorkspaceIndexer(
+            _Scheduler(self.events), self.grammar, _Lock(self.events))
+
+    def _clear_parser_cache(self):
+        cache = parso.cache.parser_cache.get(self.grammar._hashed, {})
+        for path in list(cache):
+            if path and path.startswith(self.directory):
+                del cache[path]
+
+    def _write(self, *parts, **kwargs):
+        path = os.path.join(self.directory, *parts)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(kwargs.get('code', ''))
+        return path
+
+    def _record_parses(self):
+        parses = []
+        parse = self.indexer._parse
+
+        def record(path, keep):
+            parses.append((path, keep))
+            return parse(path, keep)
+        self.indexer._parse = record
+        return parses
+
+    def test_preload_per_file(self):
+        init_path = self._write('lib', 'pkg', '__init__.py', code='from pkg import a\n')
+        a_path = self._write('lib', 'pkg', 'a.py', code='import os\n')
+        parses = self._record_parses()
+        self.indexer._preload_module('pkg', [os.path.join(self.directory, 'lib')])
+
+        self.assertEqual(parses, [(init_path, True), (a_path, True)])
+        # Waits for requests before every file and releases the lock after it.
+        self.assertEqual(self.events, ['wait', 'lock', 'wait', 'lock'])
+        cache = parso.cache.parser_cache[self.grammar._hashed]
+        self.assertIn(init_path, cache)
+        self.assertIn(a_path, cache)
+
+    def test_sibling_directory(self):
+        project = os.path.join(self.directory, 'proj')
+        project_path = self._write('proj', 'main.py')
+        sub_path = self._write('proj', 'sub', 'x.py')
+        sibling_path = self._write('proj2', 'y.py')
+        parses = self._record_parses()
+        self.indexer._index(
+            self.indexer._generation, project,
+            [project, os.path.join(project, 'sub'), os.path.join(self.directory, 'proj2')])
+
+        self.assertEqual(parses, [(project_path, True), (sub_path, True),
+                                  (sibling_path, False)])
+
+
+if __name__ == '__main__':
+    unittest.main()
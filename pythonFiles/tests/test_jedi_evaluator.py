@@ -0,0 +1,81 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import jedi
+from jedi.api.environment import InterpreterEnvironment
+from jedi.api.project import Project
+from jedi.evaluate import Evaluator, _get_module_node
+
+
+class InvalidateModulesTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.evaluator = Evaluator(
+            Project(self.directory, sys_path=[self.directory] + sys.path),
+            environment=InterpreterEnvironment())
+
+    def _write(self, name, code):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f:
+            f.write(code)
+        # Newer than anything parso has cached for the file.
+        mtime = time.time() + 10
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def _complete(self, code):
+        path = os.path.join(self.directory, 'main.py')
+        script = jedi.Script(code, 2, len(code.splitlines()[-1]), path,
+                             _evaluator=self.evaluator)
+        return set(c.name for c in script.completions())
+
+    def test_dependent_module(self):
+        a_path = self._write('a.py', 'x = 1\n')
+        self._write('b.py', 'from a import x\ny = x\n')
+        code = 'import b\nb.y.'
+        self.assertIn('bit_length', self._complete(code))
+
+        self._write('a.py', 'x = ""\n')
+        self.evaluator.invalidate_modules([a_path])
+        names = self._complete(code)
+        self.assertIn('upper', names)
+        self.assertNotIn('bit_length', names)
+
+    def test_unrelated_module(self):
+        a_path = self._write('a.py', 'x = 1\n')
+        self._write('b.py', 'from a import x\ny = x\n')
+        c_path = self._write('c.py', 'z = 1\n')
+        self.assertIn('bit_length', self._complete('import b, c\nc.z.'))
+        c_node = self.evaluator.module_cache.get_from_path(c_path).tree_node
+
+        def count_memoized():
+            return sum(1 for memo in self.evaluator.memoize_cache.values()
+                       for obj, args, _ in memo
+                       if any(_get_module_node(part) is c_node
+                              for part in (obj,) + args))
+
+        count = count_memoized()
+        self.assertTrue(count)
+        self.evaluator.invalidate_modules([a_path])
+        self.assertEqual(count_memoized(), count)
+
+    def test_relative_import(self):
+        os.mkdir(os.path.join(self.directory, 'pkg'))
+        self._write(os.path.join('pkg', '__init__.py'), '')
+        a_path = self._write(os.path.join('pkg', 'a.py'), 'x = 1\n')
+        self._write(os.path.join('pkg', 'b.py'), 'from .a import x\ny = x\n')
+        code = 'from pkg import b\nb.y.'
+        self.assertIn('bit_length', self._complete(code))
+
+        self._write(os.path.join('pkg', 'a.py'), 'x = ""\n')
+        self.evaluator.invalidate_modules([a_path])
+        self.assertIn('upper', self._complete(code))
+
+
+if __name__ == '__main__':
+    unittest.main()
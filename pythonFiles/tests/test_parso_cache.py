@@ -0,0 +1,219 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+import parso
+from parso import cache
+from parso._compatibility import is_pypy
+
+
+CODE = '''\
+import os
+
+
+def foo(bar):
+    """
+    A docstring.
+    """
+    return os.path.join(bar, 'baz')
+'''
+
+
+class PickleCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.path = os.path.join(self.cache_path, 'module.py')
+        with open(self.path, 'w') as f:
+            f.write(CODE)
+        self.grammar = parso.load_grammar()
+
+    def tearDown(self):
+        cache.parser_cache.clear()
+        shutil.rmtree(self.cache_path)
+
+    def _round_trip(self, module):
+        self.assertTrue(cache.is_module_cached(self.grammar._hashed, self.path,
+                                               cache_path=self.cache_path))
+        cache.parser_cache.clear()
+        loaded = cache.load_module(self.grammar._hashed, self.path,
+                                   cache_path=self.cache_path)
+        self.assertIsNot(loaded, module)
+        self.assertEqual(loaded.get_code(), CODE)
+        return loaded
+
+    def test_position_lookups(self):
+        module = self.grammar.parse(path=self.path, cache=True,
+                                    cache_path=self.cache_path)
+        loaded = self._round_trip(module)
+        self.assertEqual(loaded.get_name_of_position((4, 5)).value, 'foo')
+        self.assertEqual(loaded.get_leaf_for_position((8, 11)).value, 'os')
+        self.assertEqual(sorted(loaded.get_used_names()),
+                         sorted(module.get_used_names()))
+
+    def test_indexed_module(self):
+        module = self.grammar.parse(CODE)
+        # Pickle a module whose leaf index is built already.
+        module.get_name_of_position((1, 7))
+        cache.save_module(self.grammar._hashed, self.path, module,
+                          parso.split_lines(CODE, keepends=True),
+                          cache_path=self.cache_path)
+        loaded = self._round_trip(module)
+        name = loaded.get_name_of_position((4, 8))
+        self.assertEqual(name.value, 'bar')
+        self.assertIs(name.get_root_node(), loaded)
+
+
+class ParseManyTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.paths = []
+        for i in range(3):
+            path = os.path.join(self.cache_path, 'module%s.py' % i)
+            with open(path, 'w') as f:
+                f.write(CODE)
+            self.paths.append(path)
+        self.grammar = parso.load_grammar()
+
+    def tearDown(self):
+        cache.parser_cache.clear()
+        shutil.rmtree(self.cache_path)
+
+    @unittest.skipIf(is_pypy, "pypy keeps the modules in RAM")
+    def test_in_process(self):
+        missing = os.path.join(self.cache_path, 'missing.py')
+        modules = self.grammar.parse_many(self.paths + [missing], workers=1,
+                                          cache_path=self.cache_path)
+        self.assertEqual(list(modules), self.paths)
+        # Nothing is kept in RAM until a module is accessed.
+        self.assertFalse(cache.parser_cache.get(self.grammar._hashed))
+        for path in self.paths:
+            self.assertTrue(cache.is_module_cached(
+                self.grammar._hashed, path, cache_path=self.cache_path))
+        self.assertEqual(modules[self.paths[0]].get_code(), CODE)
+        self.assertEqual(list(cache.parser_cache[self.grammar._hashed]),
+                         [self.paths[0]])
+
+
+class ContentCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_path = tempfile.mkdtemp()
+        self.grammar = parso.load_grammar()
+        self.lines = parso.split_lines(CODE, keepends=True)
+        self.cache_file = cache._get_content_hashed_path(
+            self.grammar._hashed, CODE, cache_path=self.cache_path)
+
+    def tearDown(self):
+        cache.parser_cache.clear()
+        shutil.rmtree(self.cache_path)
+
+    def _write(self, data):
+        with open(self.cache_file, 'wb') as f:
+            f.write(data)
+
+    def _load(self):
+        return cache.load_module_from_content(
+            self.grammar._hashed, None, CODE, self.lines,
+            cache_path=self.cache_path)
+
+    def test_round_trip(self):
+        self._write(cache._serialize_tree(self.grammar.parse(CODE), CODE))
+        self.assertEqual(self._load().get_code(), CODE)
+
+    def test_parse(self):
+        path = os.path.join(self.cache_path, 'module.py')
+        with open(path, 'w') as f:
+            f.write(CODE)
+        cache.content_addressed_cache = True
+        self.addCleanup(setattr, cache, 'content_addressed_cache', False)
+        self.grammar.parse(path=path, cache=True, cache_path=self.cache_path)
+        self.assertTrue(os.path.exists(self.cache_file))
+
+        cache.parser_cache.clear()
+        hits = cache.get_cache_statistics()['hits']
+        module = self.grammar.parse(path=path, cache=True, cache_path=self.cache_path)
+        self.assertEqual(module.get_code(), CODE)
+        self.assertEqual(cache.get_cache_statistics()['hits'], hits + 1)
+
+    def test_foreign_module(self):
+        data = cache._serialize_tree(self.grammar.parse(CODE), CODE)
+        # A module with a name as long as parso.python.tree, the descriptor
+        # size in the header stays right.
+        name = 'cache_test_module'
+        with open(os.path.join(self.cache_path, name + '.py'), 'w') as f:
+            f.write('Name = None\n')
+        sys.path.insert(0, self.cache_path)
+        self.addCleanup(sys.path.remove, self.cache_path)
+        self._write(data.replace(b'parso.python.tree', name.encode('ascii')))
+
+        self.assertIsNone(self._load())
+        self.assertNotIn(name, sys.modules)
+        self.assertFalse(os.path.exists(self.cache_file))
+
+    def test_removed_concurrently(self):
+        self._write(b'broken')
+        remove = os.remove
+
+        def remove_twice(path):
+            # Another process removes the file first.
+            remove(path)
+            remove(path)
+
+        os.remove = remove_twice
+        try:
+            self.assertIsNone(self._load())
+        finally:
+            os.remove = remove
+
+
+class LeastRecentlyUsedTest(unittest.TestCase):
+    def setUp(self):
+        self.max_modules = cache.cache_max_modules
+        self.grammar = parso.load_grammar()
+        cache.parser_cache.clear()
+
+    def tearDown(self):
+        cache.cache_max_modules = self.max_modules
+        cache.parser_cache.clear()
+
+    def _save(self, path):
+        cache.save_module(self.grammar._hashed, path, None, ['x = 1\n'],
+                          pickling=False)
+
+    def test_eviction(self):
+        cache.cache_max_modules = 10
+        for i in range(10):
+            self._save('/%s.py' % i)
+        cache.touch_module(self.grammar._hashed, '/0.py')
+        self._save('/10.py')
+        modules = cache.parser_cache[self.grammar._hashed]
+        # Evicted down to 90% of the limit, the least recently used first.
+        self.assertEqual(set(modules),
+                         set(['/0.py', '/10.py'] + ['/%s.py' % i for i in range(3, 10)]))
+
+    def test_statistics(self):
+        for i in range(5):
+            self._save('/%s.py' % i)
+        modules = cache.parser_cache[self.grammar._hashed]
+        modules.pop('/0.py')
+        del modules['/1.py']
+        statistics = cache.get_cache_statistics()
+        self.assertEqual(statistics['modules'], 3)
+        self.assertEqual(statistics['nodes'],
+                         sum(item.node_count for item in modules.values()))
+        cache.parser_cache.clear()
+        statistics = cache.get_cache_statistics()
+        self.assertEqual((statistics['modules'], statistics['nodes']), (0, 0))
+
+    def test_node_count(self):
+        module = self.grammar.parse('x = 1\n')
+        cache.save_module(self.grammar._hashed, '/a.py', module, ['x = 1\n', ''],
+                          pickling=False)
+        # The module, the simple statement, the expression statement with its
+        # three leaves, the newline and the end marker.
+        self.assertEqual(cache.parser_cache[self.grammar._hashed]['/a.py'].node_count, 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
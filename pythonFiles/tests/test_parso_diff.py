@@ -0,0 +1,98 @@
+import unittest
+
+import parso
+from parso.cache import parser_cache
+
+
+class UsedNamesTest(unittest.TestCase):
+    path = '/does/not/exist.py'
+
+    def setUp(self):
+        self.grammar = parso.load_grammar()
+
+    def tearDown(self):
+        parser_cache.clear()
+
+    def _check_used_names(self, module):
+        incremental = module._used_names
+        module._used_names = None
+        expected = module.get_used_names()
+        if incremental is not None:
+            self.assertEqual(
+                dict((k, [id(n) for n in v]) for k, v in incremental.items()),
+                dict((k, [id(n) for n in v]) for k, v in expected.items())
+            )
+
+    def _diff_parse(self, code, edits):
+        module = self.grammar.parse(code, path=self.path, diff_cache=True)
+        module.get_used_names()
+        for start, end, text in edits:
+            code = code[:start] + text + code[end:]
+            module = self.grammar.parse(code, path=self.path, diff_cache=True)
+            # The diff parser doesn't always create the right tree, the used
+            # names can only match if it did.
+            if module.get_code() == code:
+                self._check_used_names(module)
+        return module, code
+
+    def test_incremental(self):
+        code = 'import os\n\n\ndef foo(bar):\n    return os.path\n\n\nfoo(1)\n'
+        edits = [
+            (code.index('bar'), code.index('bar') + 3, 'baz'),
+            (0, 0, 'x = y\n'),
+            (len(code) + 6, len(code) + 6, 'class C:\n    bar = os\n'),
+        ]
+        module, code = self._diff_parse(code, edits)
+        self.assertEqual(module.get_code(), code)
+        self.assertIsNotNone(module._used_names)
+        self.assertEqual([n.start_pos for n in module.get_used_names()['os']],
+                         [(2, 7), (6, 11), (11, 10)])
+
+    def test_wrong_positions(self):
+        # The diff parser creates a module with wrong positions here. The
+        # removed names of the next diff are not in the used names, which are
+        # then calculated again instead of raising a KeyError.
+        code = (
+            "_ALLOW_SPACE = '*', '+', '-', '**', '/', '//', '@'\n"
+            "_BITWISE_OPERATOR = '<<', '>>', '|', '&', '^'\n"
+            "_NEEDS_SPACE = ('=', '%', '->',\n"
+            "                '<', '>', '==', '>=', '<=', '<>', '!=',\n"
+            "                '+=', '-=', '*=', '@=', '/=', '%=', '&=', '|=', '^=', '<<=',\n"
+            "                '>>=', '**=', '//=')\n"
+            "_NEEDS_SPACE += _BITWISE_OPERATOR\n"
+            "_IMPLICIT_INDENTATION_TYPES = ('dictorsetmaker', 'argument')\n"
+            "_POSSIBLE_SLICE_PARENTS = ('subscript', 'subscriptlist', 'sliceop')\n"
+            "\n"
+            "\n"
+            "class IndentationTypes(object):\n"
+            "    VERTICAL_BRACKET = object()\n"
+            "    HANGING_BRACKET = object()\n"
+            "    BACKSLASH = object()\n"
+            "    SUITE = object()\n"
+            "    IMPLICIT = object()\n"
+            "\n"
+            "\n"
+            "class IndentationNode(object):\n"
+            "    type = IndentationTypes.SUITE\n"
+            "\n"
+            "    def __init__(self, config, indentation, parent=None):\n"
+            "        self.bracket_indentation = self.indentation = indentation\n"
+            "        self.parent = parent\n"
+            "\n"
+            "    def __repr__(self):\n"
+            "        return '<%s>' % self.__class__.__name__\n"
+            "\n"
+            "    def get_latest_suite_node(self):\n"
+        )
+        edits = [
+            (151, 172, '    '),
+            (366, 371, ')'),
+            (595, 596, 'if x:\n    y\n'),
+            (542, 559, '    '),
+            (452, 459, ')'),
+        ]
+        self._diff_parse(code, edits)
+
+
+if __name__ == '__main__':
+    unittest.main()
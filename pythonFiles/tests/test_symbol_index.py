@@ -0,0 +1,114 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+import jedi
+from jedi import settings
+from jedi.evaluate import symbol_index
+from jedi.evaluate.symbol_index import SymbolIndex
+
+
+class SymbolIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.root = os.path.join(self.directory, 'project')
+        self.cache_path = os.path.join(self.directory, 'cache', 'index.pickle')
+
+    def _write(self, name, code):
+        path = os.path.join(self.root, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(code)
+        # Different from what was indexed before.
+        mtime = time.time() + len(code)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_project_walk(self):
+        a_path = self._write('a.py', 'def foo(): pass\n')
+        b_path = self._write(os.path.join('sub', 'b.py'), 'foo()\n')
+        self._write('c.py', 'bar = 1\n')
+        self._write(os.path.join('.hidden', 'd.py'), 'foo()\n')
+        self._write(os.path.join('venv', 'pyvenv.cfg'), '')
+        self._write(os.path.join('venv', 'e.py'), 'foo()\n')
+
+        index = SymbolIndex(self.root, self.cache_path)
+        index.refresh_project()
+        self.assertEqual(index.get_paths('foo'), set([a_path, b_path]))
+
+        os.remove(b_path)
+        # Not walked again yet.
+        index.refresh_project()
+        self.assertEqual(index.get_paths('foo'), set([a_path, b_path]))
+        index._walked -= settings.symbol_index_validity
+        index.refresh_project()
+        self.assertEqual(index.get_paths('foo'), set([a_path]))
+
+    def test_incremental_save(self):
+        a_path = self._write('a.py', 'def foo(): pass\n')
+        c_path = self._write('c.py', 'bar = 1\n')
+        for i in range(20):
+            self._write('x%s.py' % i, 'x = %s\n' % i)
+        index = SymbolIndex(self.root, self.cache_path)
+        index.refresh_project()
+        size = os.path.getsize(self.cache_path)
+
+        self._write('c.py', 'foo()\n')
+        index.refresh([c_path])
+        appended = os.path.getsize(self.cache_path) - size
+        self.assertTrue(0 < appended < size / 10)
+
+        loaded = SymbolIndex(self.root, self.cache_path)
+        self.assertEqual(loaded.get_paths('foo'), set([a_path, c_path]))
+        self.assertEqual(loaded.get_paths('bar'), set())
+
+    def test_interrupted_save(self):
+        a_path = self._write('a.py', 'def foo(): pass\n')
+        c_path = self._write('c.py', 'foo()\n')
+        index = SymbolIndex(self.root, self.cache_path)
+        index.refresh([a_path])
+        index.refresh([c_path])
+        with open(self.cache_path, 'rb+') as f:
+            f.truncate(os.path.getsize(self.cache_path) - 3)
+
+        loaded = SymbolIndex(self.root, self.cache_path)
+        self.assertEqual(loaded.get_paths('foo'), set([a_path]))
+        loaded.refresh([a_path, c_path])
+        self.assertEqual(SymbolIndex(self.root, self.cache_path).get_paths('foo'),
+                         set([a_path, c_path]))
+
+
+class SearchProjectTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for name, value in [('symbol_index', True),
+                            ('cache_directory', os.path.join(self.directory, 'cache'))]:
+            self.addCleanup(setattr, settings, name, getattr(settings, name))
+            setattr(settings, name, value)
+        self.addCleanup(symbol_index._indexes.clear)
+
+    def test_unvisited_file(self):
+        project = os.path.join(self.directory, 'project')
+        os.makedirs(os.path.join(project, 'sub'))
+        main_path = os.path.join(project, 'main.py')
+        with open(main_path, 'w') as f:
+            f.write('def foo():\n    pass\n')
+        other_path = os.path.join(project, 'sub', 'other.py')
+        with open(other_path, 'w') as f:
+            f.write('from main import foo\nfoo()\n')
+
+        # Makes it the root of the project.
+        open(os.path.join(project, 'setup.py'), 'w').close()
+
+        script = jedi.Script(path=main_path, line=1, column=5, sys_path=[project])
+        paths = set(usage.module_path for usage in script.usages())
+        self.assertIn(other_path, paths)
+
+
+if __name__ == '__main__':
+    unittest.main()
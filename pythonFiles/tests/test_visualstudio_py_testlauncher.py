@@ -0,0 +1,225 @@
+import json
+import optparse
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'PythonTools'))
+
+import visualstudio_py_testlauncher as testlauncher
+
+_SOURCE = '''\
+def used():
+    return 1
+
+def unused():
+    return 2
+
+used()
+'''
+
+
+class LineCoverageTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, 'module.py')
+
+    def _collect(self, *filenames):
+        line_cov = testlauncher._LineCoverage(lambda code: code.co_filename in filenames)
+        line_cov.start()
+        try:
+            for filename in filenames:
+                exec(compile(_SOURCE, filename, 'exec'), {})
+        finally:
+            line_cov.stop()
+        return line_cov
+
+    def test_collect(self):
+        data = self._collect(self.path).get_data()
+        self.assertEqual(data, {self.path: (set([1, 2, 4, 5, 7]), set([1, 2, 4, 7]))})
+
+    def test_frozen_module(self):
+        data = self._collect(self.path, '<frozen module>').get_data()
+        self.assertEqual(list(data), [self.path])
+
+    def test_file_format(self):
+        data = {
+            self.path: (set(range(1, 20)), set([1, 8, 9, 17])),
+            os.path.join(self.directory, u'\xe9.py'): (set([3]), set()),
+        }
+        filename = os.path.join(self.directory, 'coverage')
+        testlauncher.write_line_coverage(filename, data)
+        self.assertEqual(testlauncher.read_line_coverage(filename), data)
+
+    def test_not_a_coverage_file(self):
+        filename = os.path.join(self.directory, 'coverage')
+        with open(filename, 'wb') as f:
+            f.write(b'<coverage/>')
+        self.assertRaises(ValueError, testlauncher.read_line_coverage, filename)
+
+    def test_save_merges(self):
+        filename = os.path.join(self.directory, 'coverage')
+        other = os.path.join(self.directory, 'other.py')
+        testlauncher.write_line_coverage(filename, {
+            self.path: (set([1, 2, 4, 5, 7]), set([5])),
+            other: (set([1]), set([1])),
+        })
+        self._collect(self.path).save(filename)
+        self.assertEqual(testlauncher.read_line_coverage(filename), {
+            self.path: (set([1, 2, 4, 5, 7]), set([1, 2, 4, 5, 7])),
+            other: (set([1]), set([1])),
+        })
+
+    def test_format(self):
+        data = testlauncher.merge_line_coverage(
+            {'a.py': (set([1, 2]), set([1]))},
+            {'a.py': (set([3]), set()), 'b.py': (set(), set())},
+        )
+        self.assertEqual(testlauncher.format_line_coverage(data),
+                         'a.py 1/3 33%\nb.py 0/0 100%\nTOTAL 1/3 33%\n')
+
+
+class _ShardA(unittest.TestCase):
+    def test_1(self):
+        pass
+
+    def test_2(self):
+        pass
+
+
+class _ShardB(unittest.TestCase):
+    def test_1(self):
+        pass
+
+
+class _ShardC(unittest.TestCase):
+    def test_1(self):
+        pass
+
+
+class _Channel(object):
+    def __init__(self):
+        self.events = []
+
+    def send_event(self, name, **args):
+        self.events.append((name, args))
+
+
+def _event(name, **args):
+    content = json.dumps({'type': 'event', 'seq': 0, 'event': name, 'body': args}).encode('utf8')
+    return ('Content-Length: %d\n\n' % len(content)).encode('utf8') + content
+
+
+class WorkersTest(unittest.TestCase):
+    def setUp(self):
+        self.channel = _Channel()
+        self.addCleanup(setattr, testlauncher, '_channel', testlauncher._channel)
+        testlauncher._channel = self.channel
+
+    def _ids(self, suite):
+        return [test.id().split('.', 1)[1] for test in suite]
+
+    def test_shard(self):
+        loader = unittest.TestLoader()
+        tests = unittest.TestSuite([
+            unittest.TestSuite([loader.loadTestsFromTestCase(case)])
+            for case in (_ShardA, _ShardB, _ShardC)
+        ])
+        # Whole test classes go round-robin to the workers.
+        self.assertEqual(self._ids(testlauncher._get_test_shard(tests, 0, 2)),
+                         ['_ShardA.test_1', '_ShardA.test_2', '_ShardC.test_1'])
+        self.assertEqual(self._ids(testlauncher._get_test_shard(tests, 1, 2)),
+                         ['_ShardB.test_1'])
+        self.assertEqual(self._ids(testlauncher._get_test_shard(tests, 3, 4)), [])
+
+    def test_forward_events(self):
+        result = _event('result', outcome='passed', test='a', worker=1)
+        data = _event('start', test='a', worker=0) + _event('done', worker=0) + result[:5]
+        # The incomplete event is kept until the rest is received.
+        rest = testlauncher._forward_worker_events(data)
+        self.assertEqual(rest, result[:5])
+        rest = testlauncher._forward_worker_events(rest + result[5:-5])
+        self.assertEqual(rest, result[:-5])
+        self.assertEqual(testlauncher._forward_worker_events(rest + result[-5:]), b'')
+        # The done event is only sent once all the workers are done.
+        self.assertEqual(self.channel.events, [
+            ('start', {'test': 'a', 'worker': 0}),
+            ('result', {'outcome': 'passed', 'test': 'a', 'worker': 1}),
+        ])
+
+    def _run_workers(self, code):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with open(os.path.join(directory, 'test_workers.py'), 'w') as f:
+            f.write(code)
+        workers = []
+        popen = subprocess.Popen
+        devnull = open(os.devnull, 'w')
+        self.addCleanup(devnull.close)
+
+        class Popen(popen):
+            def __init__(self, *args, **kwargs):
+                # The workers echo their output, which isn't checked.
+                kwargs.update(stdout=devnull, stderr=devnull)
+                popen.__init__(self, *args, **kwargs)
+                workers.append(self)
+        self.addCleanup(setattr, subprocess, 'Popen', popen)
+        subprocess.Popen = Popen
+
+        opts = optparse.Values({'workers': 2, 'coverage': None})
+        argv = ['--us', directory, '--workers', '2']
+        return workers, lambda: testlauncher._run_workers(opts, argv)
+
+    def test_run(self):
+        workers, run = self._run_workers(
+            'import unittest\n'
+            'class A(unittest.TestCase):\n'
+            '    def test_a(self):\n'
+            '        pass\n'
+            'class B(unittest.TestCase):\n'
+            '    def test_b(self):\n'
+            '        self.fail()\n'
+        )
+        self.assertFalse(run())
+        self.assertEqual(len(workers), 2)
+        results = sorted((args['test'], args['outcome'], args['worker'])
+                         for name, args in self.channel.events if name == 'result')
+        self.assertEqual(results, [('test_workers.A.test_a', 'passed', 0),
+                                   ('test_workers.B.test_b', 'failed', 1)])
+
+    @unittest.skipIf(not hasattr(signal, 'SIGUSR1'), 'stopping the tests uses SIGUSR1')
+    def test_stop(self):
+        workers, run = self._run_workers(
+            'import time, unittest\n'
+            'class A(unittest.TestCase):\n'
+            '    def test_a(self):\n'
+            '        time.sleep(60)\n'
+        )
+        handler = signal.signal(signal.SIGUSR1, testlauncher.signal_handler)
+        self.addCleanup(signal.signal, signal.SIGUSR1, handler)
+
+        def stop():
+            # Stop once the test is running.
+            while not any(name == 'start' for name, args in self.channel.events):
+                time.sleep(0.05)
+            testlauncher.stopTests()
+        thread = threading.Thread(target=stop)
+        thread.daemon = True
+        started = time.time()
+        thread.start()
+        self.assertRaises(testlauncher.ExitCommand, run)
+        self.assertLess(time.time() - started, 30)
+        self.assertEqual(len(workers), 2)
+        for worker in workers:
+            self.assertIsNotNone(worker.poll())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import socket
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'PythonTools'))
+
+import visualstudio_py_util
+
+
+class ReadBytesTest(unittest.TestCase):
+    def setUp(self):
+        self.reader, self.writer = socket.socketpair()
+        self.addCleanup(self.reader.close)
+
+    def test_read(self):
+        self.writer.sendall(b'abcdef')
+        self.assertEqual(visualstudio_py_util.read_bytes(self.reader, 4), b'abcd')
+        self.assertEqual(visualstudio_py_util.read_bytes(self.reader, 2), b'ef')
+        self.writer.close()
+
+    def test_peer_closed(self):
+        self.writer.sendall(b'abc')
+        self.writer.close()
+        self.assertEqual(visualstudio_py_util.read_bytes(self.reader, 10), b'abc')
+        self.assertEqual(visualstudio_py_util.read_bytes(self.reader, 10), b'')
+
+    def test_without_recv_into(self):
+        class Connection(object):
+            def __init__(self, conn):
+                self.recv = conn.recv
+
+        self.writer.sendall(b'abc')
+        self.writer.close()
+        conn = Connection(self.reader)
+        self.assertEqual(visualstudio_py_util.read_bytes(conn, 10), b'abc')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -233,7 +233,12 @@ export class PythonSettings extends EventEmitter implements IPythonSettings {
             extraPaths: [],
             addBrackets: false,
             preloadModules: [],
-            showAdvancedMembers: false
+            showAdvancedMembers: false,
+            persistentEvaluator: true,
+            compiledIntrospectionCache: true,
+            backgroundIndexing: false,
+            symbolIndex: true,
+            contentAddressedCache: true
         };
 
         // tslint:disable-next-line:no-backbone-get-set-outside-model no-non-null-assertion
@@ -206,6 +206,11 @@ export interface IAutoCompleteSettings {
     readonly extraPaths: string[];
     readonly preloadModules: string[];
     readonly showAdvancedMembers: boolean;
+    readonly persistentEvaluator: boolean;
+    readonly compiledIntrospectionCache: boolean;
+    readonly backgroundIndexing: boolean;
+    readonly symbolIndex: boolean;
+    readonly contentAddressedCache: boolean;
 }
 export interface IWorkspaceSymbolSettings {
     readonly enabled: boolean;
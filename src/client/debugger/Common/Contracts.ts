@@ -40,7 +40,8 @@ export enum DebugOptions {
     Sudo = 'Sudo',
     Pyramid = 'Pyramid',
     FixFilePathCase = 'FixFilePathCase',
-    WindowsClient = 'WindowsClient'
+    WindowsClient = 'WindowsClient',
+    LazyFrameVariables = 'LazyFrameVariables'
 }
 
 export interface ExceptionHandling {
@@ -164,11 +165,14 @@ export interface IPythonProcess extends NodeJS.EventEmitter {
     SendClearStepping(threadId: number);
     ExecuteText(text: string, reprKind: any, stackFrame: IPythonStackFrame): Promise<IPythonEvaluationResult>;
     EnumChildren(text: string, stackFrame: IPythonStackFrame, timeout: number): Promise<IPythonEvaluationResult[]>;
+    GetFrameVariables(stackFrame: IPythonStackFrame, start: number, count: number): Promise<IFrameVariablesPage>;
     SetLineNumber(pythonStackFrame: IPythonStackFrame, lineNo: number);
     Threads: Map<number, IPythonThread>;
     ProgramDirectory: string;
     PendingChildEnumCommands: Map<number, IChildEnumCommand>;
+    PendingFrameVariablesCommands: Map<number, IFrameVariablesCommand>;
     PendingExecuteCommands: Map<number, IExecutionCommand>;
+    LazyFrameVariables: boolean;
     ProcessPendingExecuteCommands();
 }
 
@@ -212,6 +216,11 @@ export interface IPythonStackFrame {
     FrameId: number;
     Locals: IPythonEvaluationResult[];
     Parameters: IPythonEvaluationResult[];
+    // Locals and Parameters haven't been requested yet (see LaunchRequestArguments.debugOptions 'LazyFrameVariables').
+    VariablesPending?: boolean;
+    // Number of variables and of arguments of the frame, when only the first ones are in Parameters and Locals.
+    VariablesCount?: number;
+    ArgumentsCount?: number;
 }
 
 export interface IDjangoStackFrame extends IPythonStackFrame {
@@ -235,6 +244,17 @@ export interface IChildEnumCommand {
     PromiseResolve: (value: IPythonEvaluationResult[]) => void;
     PromiseReject: () => void;
 }
+export interface IFrameVariablesPage {
+    Total: number;
+    ArgCount: number;
+    Variables: IPythonEvaluationResult[];
+}
+export interface IFrameVariablesCommand {
+    Id: number;
+    Frame: IPythonStackFrame;
+    PromiseResolve: (value: IFrameVariablesPage) => void;
+    PromiseReject: () => void;
+}
 export interface IExecutionCommand {
     Id: number;
     Text: string;
@@ -53,6 +53,8 @@ export class LocalDebugClient extends DebugClient<LaunchRequestArguments> {
             this.debugServer = new LocalDebugServerV2(this.debugSession, this.args, serviceContainer!);
         } else {
             this.pythonProcess = pythonProcess!;
+            // buildDebugArguments asks for the variables to be requested per frame.
+            this.pythonProcess.LazyFrameVariables = true;
             this.debugServer = new LocalDebugServer(this.debugSession, this.pythonProcess!, this.args);
         }
         return this.debugServer;
@@ -165,7 +167,7 @@ export class LocalDebugClient extends DebugClient<LaunchRequestArguments> {
     // tslint:disable-next-line:member-ordering
     protected buildDebugArguments(cwd: string, debugPort: number): string[] {
         const ptVSToolsFilePath = this.launcherScriptProvider.getLauncherFilePath();
-        const vsDebugOptions: string[] = [DebugOptions.RedirectOutput];
+        const vsDebugOptions: string[] = [DebugOptions.RedirectOutput, DebugOptions.LazyFrameVariables];
         if (Array.isArray(this.args.debugOptions)) {
             this.args.debugOptions.filter(opt => VALID_DEBUG_OPTIONS.indexOf(opt) >= 0)
                 .forEach(item => vsDebugOptions.push(item));
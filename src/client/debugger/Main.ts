@@ -26,10 +26,13 @@ import { sendPerformanceTelemetry, capturePerformanceTelemetry, PerformanceTelem
 import { LogLevel } from "vscode-debugadapter/lib/logger";
 
 const CHILD_ENUMEARATION_TIMEOUT = 5000;
+const FRAME_VARIABLES_PAGE_SIZE = 100;
 
 interface IDebugVariable {
     variables: IPythonEvaluationResult[];
     evaluateChildren?: Boolean;
+    // Frame variables following 'variables' that haven't been requested yet, VS Code asks for them in pages.
+    pendingFrameVariables?: { frame: IPythonStackFrame, start: number, count: number };
 }
 
 export class PythonDebugger extends LoggingDebugSession {
@@ -562,66 +565,102 @@ export class PythonDebugger extends LoggingDebugSession {
                 };
                 return this.sendResponse(response);
             }
-
-            const scopes: Scope[] = [];
-            if (this.lastException && this.lastException!.Description.length > 0) {
-                const values: IDebugVariable = {
-                    variables: [{
-                        Frame: frame, Expression: 'Type',
-                        Flags: PythonEvaluationResultFlags.Raw,
-                        StringRepr: this.lastException!.TypeName,
-                        TypeName: 'string', IsExpandable: false, HexRepr: '',
-                        ChildName: '', ExceptionText: '', Length: 0, Process: undefined
-                    },
-                    {
-                        Frame: frame, Expression: 'Description',
-                        Flags: PythonEvaluationResultFlags.Raw,
-                        StringRepr: this.lastException!.Description,
-                        TypeName: 'string', IsExpandable: false, HexRepr: '',
-                        ChildName: '', ExceptionText: '', Length: 0, Process: undefined
-                    }],
-                    evaluateChildren: false
-                };
-                scopes.push(new Scope("Exception", this._variableHandles.create(values), false));
-                this.lastException = undefined;
-            }
-            if (Array.isArray(frame.Locals) && frame.Locals.length > 0) {
-                const values: IDebugVariable = { variables: frame.Locals };
-                scopes.push(new Scope("Local", this._variableHandles.create(values), false));
+            if (frame.VariablesPending) {
+                return this.loadFrameVariables(frame)
+                    .then(() => this.sendScopes(response, frame))
+                    .catch(error => this.sendErrorResponse(response, 2002, error));
             }
-            if (Array.isArray(frame.Parameters) && frame.Parameters.length > 0) {
-                const values: IDebugVariable = { variables: frame.Parameters };
-                scopes.push(new Scope("Arguments", this._variableHandles.create(values), false));
-            }
-            response.body = { scopes };
-            this.sendResponse(response);
+            this.sendScopes(response, frame);
         });
     }
+    // Only the first page is requested, the rest when VS Code asks for it (see variablesRequest).
+    private loadFrameVariables(frame: IPythonStackFrame): Promise<void> {
+        return this.pythonProcess!.GetFrameVariables(frame, 0, FRAME_VARIABLES_PAGE_SIZE).then(page => {
+            const variables = page.Variables;
+            frame.Parameters = variables.splice(0, page.ArgCount);
+            frame.Locals = variables;
+            frame.VariablesCount = page.Total;
+            frame.ArgumentsCount = page.ArgCount;
+            frame.VariablesPending = false;
+        });
+    }
+    private createFrameVariablesScope(name: string, frame: IPythonStackFrame, variables: IPythonEvaluationResult[], start: number, end: number): Scope | undefined {
+        const values: IDebugVariable = { variables };
+        const pending = end - start - variables.length;
+        if (pending > 0) {
+            values.pendingFrameVariables = { frame, start: start + variables.length, count: pending };
+        }
+        else if (variables.length === 0) {
+            return;
+        }
+        const scope: DebugProtocol.Scope = new Scope(name, this._variableHandles.create(values), false);
+        if (pending > 0) {
+            scope.namedVariables = variables.length;
+            scope.indexedVariables = pending;
+        }
+        return scope;
+    }
+    private sendScopes(response: DebugProtocol.ScopesResponse, frame: IPythonStackFrame) {
+        const scopes: Scope[] = [];
+        if (this.lastException && this.lastException!.Description.length > 0) {
+            const values: IDebugVariable = {
+                variables: [{
+                    Frame: frame, Expression: 'Type',
+                    Flags: PythonEvaluationResultFlags.Raw,
+                    StringRepr: this.lastException!.TypeName,
+                    TypeName: 'string', IsExpandable: false, HexRepr: '',
+                    ChildName: '', ExceptionText: '', Length: 0, Process: undefined
+                },
+                {
+                    Frame: frame, Expression: 'Description',
+                    Flags: PythonEvaluationResultFlags.Raw,
+                    StringRepr: this.lastException!.Description,
+                    TypeName: 'string', IsExpandable: false, HexRepr: '',
+                    ChildName: '', ExceptionText: '', Length: 0, Process: undefined
+                }],
+                evaluateChildren: false
+            };
+            scopes.push(new Scope("Exception", this._variableHandles.create(values), false));
+            this.lastException = undefined;
+        }
+        const locals = Array.isArray(frame.Locals) ? frame.Locals : [];
+        const parameters = Array.isArray(frame.Parameters) ? frame.Parameters : [];
+        const argumentsCount = typeof frame.ArgumentsCount === 'number' ? frame.ArgumentsCount : parameters.length;
+        const variablesCount = typeof frame.VariablesCount === 'number' ? frame.VariablesCount : argumentsCount + locals.length;
+        const localScope = this.createFrameVariablesScope("Local", frame, locals, argumentsCount, variablesCount);
+        if (localScope) {
+            scopes.push(localScope);
+        }
+        const argumentsScope = this.createFrameVariablesScope("Arguments", frame, parameters, 0, argumentsCount);
+        if (argumentsScope) {
+            scopes.push(argumentsScope);
+        }
+        response.body = { scopes };
+        this.sendResponse(response);
+    }
     protected variablesRequest(response: DebugProtocol.VariablesResponse, args: DebugProtocol.VariablesArguments): void {
         const varRef = this._variableHandles.get(args.variablesReference)!;
 
+        if (varRef.pendingFrameVariables && args.filter === 'indexed') {
+            // A page of the variables that weren't sent with the scopes.
+            const pending = varRef.pendingFrameVariables!;
+            const start = args.start || 0;
+            const count = Math.min(args.count || FRAME_VARIABLES_PAGE_SIZE, pending.count - start);
+            if (this.terminateEventSent || !this.pythonProcess || count <= 0) {
+                response.body = { variables: [] };
+                return this.sendResponse(response);
+            }
+            this.pythonProcess.GetFrameVariables(pending.frame, pending.start + start, count).then(page => {
+                response.body = {
+                    variables: this.createVariables(page.Variables)
+                };
+                this.sendResponse(response);
+            }).catch(error => this.sendErrorResponse(response, 2001, error));
+            return;
+        }
         if (varRef.evaluateChildren !== true) {
-            const variables: Variable[] = [];
-            varRef.variables.forEach(variable => {
-                let variablesReference = 0;
-                // If this value can be expanded, then create a vars ref for user to expand it
-                if (variable.IsExpandable) {
-                    const parentVariable: IDebugVariable = {
-                        variables: [variable],
-                        evaluateChildren: true
-                    };
-                    variablesReference = this._variableHandles.create(parentVariable);
-                }
-
-                variables.push({
-                    name: variable.Expression,
-                    value: variable.StringRepr,
-                    variablesReference: variablesReference
-                });
-            });
-
             response.body = {
-                variables: variables
+                variables: this.createVariables(varRef.variables)
             };
 
             return this.sendResponse(response);
@@ -660,6 +699,25 @@ export class PythonDebugger extends LoggingDebugSession {
             }).catch(error => this.sendErrorResponse(response, 2001, error));
         }
     }
+    private createVariables(results: IPythonEvaluationResult[]): Variable[] {
+        return results.map(variable => {
+            let variablesReference = 0;
+            // If this value can be expanded, then create a vars ref for user to expand it
+            if (variable.IsExpandable) {
+                const parentVariable: IDebugVariable = {
+                    variables: [variable],
+                    evaluateChildren: true
+                };
+                variablesReference = this._variableHandles.create(parentVariable);
+            }
+
+            return {
+                name: variable.Expression,
+                value: variable.StringRepr,
+                variablesReference: variablesReference
+            };
+        });
+    }
     protected pauseRequest(response: DebugProtocol.PauseResponse): void {
         this.pythonProcess!.Break();
         this.sendResponse(response);
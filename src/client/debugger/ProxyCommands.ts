@@ -21,6 +21,7 @@ export class Commands {
     public static ClearSteppingCommandBytes: Buffer = new Buffer("clst");
     public static SetLineNumberCommand: Buffer = new Buffer("setl");
     public static GetChildrenCommandBytes: Buffer = new Buffer("chld");
+    public static GetFrameVariablesCommandBytes: Buffer = new Buffer("frmv");
     public static DetachCommandBytes: Buffer = new Buffer("detc");
     public static SetExceptionInfoCommandBytes: Buffer = new Buffer("sexi");
     public static SetExceptionHandlerInfoCommandBytes: Buffer = new Buffer("sehi");
@@ -5,7 +5,7 @@ import * as net from "net";
 import { ChildProcess } from 'child_process';
 import { EventEmitter } from "events";
 import { IPythonProcess, IPythonThread, IPythonEvaluationResult, IPythonStackFrame } from "./Common/Contracts";
-import { IPythonBreakpoint, IBreakpointCommand, IChildEnumCommand } from "./Common/Contracts";
+import { IPythonBreakpoint, IBreakpointCommand, IChildEnumCommand, IFrameVariablesCommand, IFrameVariablesPage } from "./Common/Contracts";
 import { PythonEvaluationResultReprKind, IExecutionCommand, enum_EXCEPTION_STATE } from "./Common/Contracts";
 import { Commands } from "./ProxyCommands";
 import { IdDispenser } from "../common/idDispenser";
@@ -43,6 +43,7 @@ export class PythonProcess extends EventEmitter implements IPythonProcess {
     }
 
     public PendingChildEnumCommands: Map<number, IChildEnumCommand>;
+    public PendingFrameVariablesCommands: Map<number, IFrameVariablesCommand>;
     public PendingExecuteCommands: Map<number, IExecutionCommand>;
     private executeCommandsQueue: IExecutionCommand[];
     private callbackHandler: PythonProcessCallbackHandler;
@@ -51,6 +52,8 @@ export class PythonProcess extends EventEmitter implements IPythonProcess {
     public get ProgramDirectory(): string {
         return this.programDirectory;
     }
+    // Whether the debugger was started with 'LazyFrameVariables', i.e. sends frames without variables.
+    public LazyFrameVariables: boolean = false;
     constructor(id: number, guid: string, programDirectory: string) {
         super();
         this.id = id;
@@ -58,6 +61,7 @@ export class PythonProcess extends EventEmitter implements IPythonProcess {
         this._threads = new Map<number, IPythonThread>();
         this._idDispenser = new IdDispenser();
         this.PendingChildEnumCommands = new Map<number, IChildEnumCommand>();
+        this.PendingFrameVariablesCommands = new Map<number, IFrameVariablesCommand>();
         this.PendingExecuteCommands = new Map<number, IExecutionCommand>();
         this.programDirectory = programDirectory;
         this.executeCommandsQueue = [];
@@ -385,6 +389,26 @@ export class PythonProcess extends EventEmitter implements IPythonProcess {
             this.stream.WriteInt32(stackFrame.Kind);
         });
     }
+    public GetFrameVariables(stackFrame: IPythonStackFrame, start: number, count: number): Promise<IFrameVariablesPage> {
+        return new Promise<IFrameVariablesPage>((resolve, reject) => {
+            let executeId = this._idDispenser.Allocate();
+            let cmd: IFrameVariablesCommand = {
+                Id: executeId,
+                Frame: stackFrame,
+                PromiseResolve: resolve,
+                PromiseReject: reject
+            };
+            this.PendingFrameVariablesCommands.set(executeId, cmd);
+
+            this.stream.Write(Commands.GetFrameVariablesCommandBytes);
+            this.stream.WriteInt64(stackFrame.Thread.Id);
+            this.stream.WriteInt32(stackFrame.FrameId);
+            this.stream.WriteInt32(executeId);
+            this.stream.WriteInt32(stackFrame.Kind);
+            this.stream.WriteInt32(start);
+            this.stream.WriteInt32(count);
+        });
+    }
     public SetLineNumber(pythonStackFrame: IPythonStackFrame, lineNo: number) {
 
     }
@@ -2,7 +2,7 @@
 "use strict";
 
 import { FrameKind, IPythonProcess, IPythonThread, IPythonEvaluationResult, IPythonStackFrame } from "./Common/Contracts";
-import { IDjangoStackFrame, PythonEvaluationResultFlags, PythonLanguageVersion, IChildEnumCommand, IPythonException, IExecutionCommand } from "./Common/Contracts";
+import { IDjangoStackFrame, PythonEvaluationResultFlags, PythonLanguageVersion, IChildEnumCommand, IPythonException, IExecutionCommand, IFrameVariablesCommand } from "./Common/Contracts";
 import * as utils from "./Common/Utils";
 import { EventEmitter } from "events";
 import { Commands } from "./ProxyCommands";
@@ -41,6 +41,7 @@ export class PythonProcessCallbackHandler extends EventEmitter {
             case "NEWT": this.HandleThreadCreate(); break;
             case "EXTT": this.HandleThreadExit(); break;
             case "THRF": this.HandleThreadFrameList(); break;
+            case "THRD": this.HandleThreadFrameListChanges(); break;
             case "OUTP": this.HandleDebuggerOutput(); break;
             case "BRKS": this.HandleBreakPointSet(); break;
             case "BRKF": this.HandleBreakPointFailed(); break;
@@ -48,6 +49,7 @@ export class PythonProcessCallbackHandler extends EventEmitter {
             case "DETC": this.HandleDetach(); break; // detach, report process exit
             case "LAST": this.HandleLast(); break;
             case "CHLD": this.HandleEnumChildren(); break;
+            case "FRMV": this.HandleFrameVariables(); break;
             case "REQH": this.HandleRequestHandlers(); break;
             case "EXCP": this.HandleException(); break;
             case "EXC2": this.HandleRichException(); break;
@@ -367,6 +369,40 @@ export class PythonProcessCallbackHandler extends EventEmitter {
         }
         this.idDispenser.Free(execId);
     }
+    private HandleFrameVariables() {
+        let execId = this.stream.ReadInt32();
+        let total = this.stream.ReadInt32();
+        let argCount = this.stream.ReadInt32();
+        let varCount = this.stream.ReadInt32();
+        if (this.stream.HasInsufficientDataForReading) {
+            return;
+        }
+
+        let cmd: IFrameVariablesCommand | undefined;
+        if (this.process.PendingFrameVariablesCommands.has(execId)) {
+            cmd = this.process.PendingFrameVariablesCommands.get(execId)!;
+        }
+
+        const variables: IPythonEvaluationResult[] = [];
+        for (let i = 0; i < varCount; i += 1) {
+            const name = this.stream.ReadString();
+            if (this.stream.HasInsufficientDataForReading) {
+                return;
+            }
+
+            let obj = this.ReadPythonObject(name, name, cmd ? cmd!.Frame : null as any);
+            if (this.stream.HasInsufficientDataForReading) {
+                return;
+            }
+            variables.push(obj!);
+        }
+
+        if (cmd) {
+            cmd!.PromiseResolve({ Total: total, ArgCount: argCount, Variables: variables });
+            this.process.PendingFrameVariablesCommands.delete(execId);
+        }
+        this.idDispenser.Free(execId);
+    }
     private HandleThreadFrameList() {
         let frames: IPythonStackFrame[] = [];
         let threadId = this.stream.ReadInt64();
@@ -457,6 +493,7 @@ export class PythonProcessCallbackHandler extends EventEmitter {
             if (frame) {
                 frame!.Parameters = variables.splice(0, argCount);
                 frame!.Locals = variables;
+                frame!.VariablesPending = this.process.LazyFrameVariables;
                 frames.push(frame!);
             }
         }
@@ -469,6 +506,62 @@ export class PythonProcessCallbackHandler extends EventEmitter {
         }
     }
 
+    private HandleThreadFrameListChanges() {
+        // The frames of the thread are the same as in the last frame list, only some variables changed.
+        let threadId = this.stream.ReadInt64();
+        let frameCount = this.stream.ReadInt32();
+        if (this.stream.HasInsufficientDataForReading) {
+            return;
+        }
+
+        let frames: IPythonStackFrame[] = [];
+        if (this.process.Threads.has(threadId)) {
+            frames = this.process.Threads.get(threadId)!.Frames;
+        }
+
+        let changes: { frame: IPythonStackFrame, index: number, variable: IPythonEvaluationResult }[] = [];
+        for (let i = 0; i < frameCount; i += 1) {
+            let changeCount = this.stream.ReadInt32();
+            if (this.stream.HasInsufficientDataForReading) {
+                return;
+            }
+
+            let frame = frameCount === frames.length ? frames[i] : undefined;
+            for (let j = 0; j < changeCount; j += 1) {
+                let index = this.stream.ReadInt32();
+                let name = this.stream.ReadString();
+                if (this.stream.HasInsufficientDataForReading) {
+                    return;
+                }
+
+                let variableObj = this.ReadPythonObject(name, name, frame!);
+                if (this.stream.HasInsufficientDataForReading) {
+                    return;
+                }
+
+                if (frame) {
+                    changes.push({ frame: frame!, index: index, variable: variableObj! });
+                }
+            }
+        }
+
+        // Only change the frames once the whole message was read, it might be read again.
+        changes.forEach(change => {
+            let parameters = change.frame.Parameters;
+            if (change.index < parameters.length) {
+                parameters[change.index] = change.variable;
+            }
+            else {
+                change.frame.Locals[change.index - parameters.length] = change.variable;
+            }
+        });
+        if (frameCount === frames.length) {
+            frames.forEach(frame => {
+                frame.VariablesPending = this.process.LazyFrameVariables;
+            });
+        }
+    }
+
     private ReadPythonObject(expr: string, childName: string, frame: IPythonStackFrame): IPythonEvaluationResult | undefined {
         let objRepr = this.stream.ReadString();
         let hexRepr = this.stream.ReadString();
@@ -86,7 +86,8 @@ export class CompletionSource {
             fileName: filename,
             columnIndex: columnIndex,
             lineIndex: position.line,
-            source: source
+            source: source,
+            documentVersion: document.version
         };
 
         return this.jediFactory.getJediProxyHandler<proxy.ICompletionResult>(document.uri).sendCommand(cmd, token);
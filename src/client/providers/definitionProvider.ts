@@ -40,6 +40,7 @@ export class PythonDefinitionProvider implements vscode.DefinitionProvider {
         };
         if (document.isDirty) {
             cmd.source = document.getText();
+            cmd.documentVersion = document.version;
         }
         const possibleWord = document.getText(range);
         return this.jediFactory.getJediProxyHandler<proxy.IDefinitionResult>(document.uri).sendCommand(cmd, token).then(data => {
@@ -72,6 +72,7 @@ export class ItemInfoSource implements IItemInfoSource {
         };
         if (document.isDirty) {
             cmd.source = document.getText();
+            cmd.documentVersion = document.version;
         }
         return this.jediFactory.getJediProxyHandler<proxy.IHoverResult>(document.uri).sendCommand(cmd, token);
     }
@@ -6,7 +6,7 @@ import { ChildProcess } from 'child_process';
 import * as fs from 'fs-extra';
 import * as path from 'path';
 import * as pidusage from 'pidusage';
-import { CancellationToken, CancellationTokenSource, CompletionItemKind, Disposable, SymbolKind, Uri } from 'vscode';
+import { CancellationToken, CancellationTokenSource, CompletionItemKind, Disposable, SymbolKind, TextDocumentChangeEvent, Uri, workspace } from 'vscode';
 import { PythonSettings } from '../common/configSettings';
 import { debounce, swallowExceptions } from '../common/decorators';
 import '../common/extensions';
@@ -19,6 +19,8 @@ import { IServiceContainer } from '../ioc/types';
 import * as logger from './../common/logger';
 
 const IS_WINDOWS = /^win/.test(process.platform);
+// Beyond this many unsent changes of a document its whole source is sent again.
+const MAX_DOCUMENT_CHANGES = 1000;
 
 const pythonVSCodeTypeMappings = new Map<string, CompletionItemKind>();
 pythonVSCodeTypeMappings.set('none', CompletionItemKind.Value);
@@ -148,6 +150,8 @@ export class JediProxy implements Disposable {
     private pidUsageFailures = { timer: new StopWatch(), counter: 0 };
     private lastCmdIdProcessed?: number;
     private lastCmdIdProcessedForPidUsage?: number;
+    private documents = new Map<string, IDocumentState>();
+    private disposables: Disposable[] = [];
 
     public constructor(private extensionRootDir: string, workspacePath: string, private serviceContainer: IServiceContainer) {
         this.workspacePath = workspacePath;
@@ -155,6 +159,8 @@ export class JediProxy implements Disposable {
         this.lastKnownPythonInterpreter = this.pythonSettings.pythonPath;
         this.logger = serviceContainer.get<ILogger>(ILogger);
         this.pythonSettings.on('change', () => this.pythonSettingsChangeHandler());
+        this.disposables.push(workspace.onDidChangeTextDocument(e => this.onDidChangeTextDocument(e)));
+        this.disposables.push(workspace.onDidCloseTextDocument(document => this.documents.delete(document.fileName)));
         this.initialized = createDeferred<void>();
         this.startLanguageServer().then(() => this.initialized.resolve()).ignoreErrors();
 
@@ -166,6 +172,7 @@ export class JediProxy implements Disposable {
     }
 
     public dispose() {
+        this.disposables.forEach(disposable => disposable.dispose());
         this.killProcess();
     }
 
@@ -330,6 +337,8 @@ export class JediProxy implements Disposable {
             this.languageServerStarted.reject(new Error('Language Server not started.'));
         }
         this.languageServerStarted = createDeferred<void>();
+        // A new process doesn't know any document.
+        this.documents.clear();
         const pythonProcess = await this.serviceContainer.get<IPythonExecutionFactory>(IPythonExecutionFactory).create({ resource: Uri.file(this.workspacePath) });
         // Check if the python path is valid.
         if ((await pythonProcess.getExecutablePath().catch(() => '')).length === 0) {
@@ -403,6 +412,12 @@ export class JediProxy implements Disposable {
                         return;
                     }
                     this.lastCmdIdProcessed = cmd.id;
+                    if (JediProxy.getProperty<boolean>(response, 'resendSource')) {
+                        // The edits were made to a source the process doesn't have.
+                        this.documents.delete(cmd.fileName);
+                        this.resendCommand(cmd);
+                        return;
+                    }
                     if (JediProxy.getProperty<object>(response, 'arguments')) {
                         this.commandQueue.splice(this.commandQueue.indexOf(cmd.id), 1);
                         return;
@@ -607,9 +622,67 @@ export class JediProxy implements Disposable {
             delete payload.line;
         }
 
+        this.setPayloadSource(payload, cmd);
         return payload;
     }
 
+    // tslint:disable-next-line:no-any
+    private setPayloadSource<T extends ICommandResult>(payload: any, cmd: IExecutionCommand<T>) {
+        if (typeof cmd.source !== 'string') {
+            return;
+        }
+        if (typeof cmd.documentVersion !== 'number') {
+            // The process keeps this source, it isn't a version of the document.
+            this.documents.delete(cmd.fileName);
+            return;
+        }
+        // Only send the changes since the last request if they lead to the
+        // version of the command, otherwise the whole source.
+        const state = this.documents.get(cmd.fileName);
+        if (state && state.version === cmd.documentVersion) {
+            delete payload.source;
+            payload.edits = state.changes;
+            payload.baseVersion = state.sentVersion;
+        }
+        payload.version = cmd.documentVersion;
+        this.documents.set(cmd.fileName, { sentVersion: cmd.documentVersion, version: cmd.documentVersion, changes: [] });
+    }
+
+    private onDidChangeTextDocument(e: TextDocumentChangeEvent) {
+        const state = this.documents.get(e.document.fileName);
+        if (!state) {
+            return;
+        }
+        if (e.document.version !== state.version + 1 || state.changes.length >= MAX_DOCUMENT_CHANGES) {
+            // Changes were missed (or too many), send the whole source next time.
+            this.documents.delete(e.document.fileName);
+            return;
+        }
+        state.version = e.document.version;
+        e.contentChanges.forEach(change => {
+            state.changes.push({
+                range: {
+                    start: { line: change.range.start.line, character: change.range.start.character },
+                    end: { line: change.range.end.line, character: change.range.end.character }
+                },
+                text: change.text
+            });
+        });
+    }
+
+    private resendCommand<T extends ICommandResult>(cmd: IExecutionCommand<T>) {
+        try {
+            if (!this.proc) {
+                throw new Error('Python proc not initialized');
+            }
+            this.proc.stdin.write(`${JSON.stringify(this.createPayload(cmd))}\n`);
+        } catch (ex) {
+            this.handleError('resendCommand', ex.message);
+            this.commands.delete(cmd.id);
+            this.safeResolve(cmd, undefined);
+        }
+    }
+
     private async getPathFromPythonCommand(args: string[]): Promise<string> {
         try {
             const pythonProcess = await this.serviceContainer.get<IPythonExecutionFactory>(IPythonExecutionFactory).create({ resource: Uri.file(this.workspacePath) });
@@ -688,12 +761,18 @@ export class JediProxy implements Disposable {
             .filter(value => value.length > 0)
             .filter((value, index, self) => self.indexOf(value) === index);
 
+        const autoComplete = this.pythonSettings.autoComplete;
         return {
             extraPaths: distinctExtraPaths,
             useSnippets: false,
             caseInsensitiveCompletion: true,
             showDescriptions: true,
-            fuzzyMatcher: true
+            fuzzyMatcher: true,
+            persistentEvaluator: !autoComplete || autoComplete.persistentEvaluator !== false,
+            compiledIntrospectionCache: !autoComplete || autoComplete.compiledIntrospectionCache !== false,
+            backgroundIndexing: !!autoComplete && autoComplete.backgroundIndexing === true,
+            symbolIndex: !autoComplete || autoComplete.symbolIndex !== false,
+            contentAddressedCache: !autoComplete || autoComplete.contentAddressedCache !== false
         };
     }
 
@@ -711,11 +790,26 @@ export interface ICommand<T extends ICommandResult> {
     telemetryEvent?: string;
     command: CommandType;
     source?: string;
+    // Version of the document the source is of, lets the process apply only the changes since the previous command.
+    documentVersion?: number;
     fileName: string;
     lineIndex: number;
     columnIndex: number;
 }
 
+interface IDocumentChange {
+    range: { start: { line: number; character: number }; end: { line: number; character: number } };
+    text: string;
+}
+
+interface IDocumentState {
+    // Version of the document the process has the source of.
+    sentVersion: number;
+    // Version of the document after the changes.
+    version: number;
+    changes: IDocumentChange[];
+}
+
 interface IExecutionCommand<T extends ICommandResult> extends ICommand<T> {
     id: number;
     deferred?: Deferred<T>;
@@ -50,6 +50,7 @@ export class PythonReferenceProvider implements vscode.ReferenceProvider {
 
         if (document.isDirty) {
             cmd.source = document.getText();
+            cmd.documentVersion = document.version;
         }
 
         return this.jediFactory.getJediProxyHandler<proxy.IReferenceResult>(document.uri).sendCommand(cmd, token).then(data => {
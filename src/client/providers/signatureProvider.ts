@@ -116,7 +116,8 @@ export class PythonSignatureProvider implements SignatureHelpProvider {
             fileName: document.fileName,
             columnIndex: position.character,
             lineIndex: position.line,
-            source: document.getText()
+            source: document.getText(),
+            documentVersion: document.version
         };
         return this.jediFactory.getJediProxyHandler<proxy.IArgumentsResult>(document.uri).sendCommand(cmd, token).then(data => {
             return data ? PythonSignatureProvider.parseData(data) : new SignatureHelp();
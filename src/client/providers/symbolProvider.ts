@@ -41,6 +41,7 @@ export class PythonSymbolProvider implements DocumentSymbolProvider {
 
             if (document.isDirty) {
                 cmd.source = document.getText();
+                cmd.documentVersion = document.version;
             }
 
             this.jediFactory.getJediProxyHandler<proxy.ISymbolResult>(document.uri).sendCommand(cmd, token)
@@ -75,6 +76,7 @@ export class PythonSymbolProvider implements DocumentSymbolProvider {
 
         if (document.isDirty) {
             cmd.source = document.getText();
+            cmd.documentVersion = document.version;
         }
 
         return this.jediFactory.getJediProxyHandler<proxy.ISymbolResult>(document.uri).sendCommandNonCancellableCommand(cmd, token)